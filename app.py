@@ -1,16 +1,210 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify
+from flask import Response, stream_with_context, abort, make_response
 from werkzeug.security import generate_password_hash, check_password_hash
-from io import BytesIO
+from werkzeug.utils import secure_filename
+from urllib.parse import urlencode
+from itsdangerous import URLSafeSerializer, BadSignature
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from collections import OrderedDict
+from decimal import Decimal
+import click
 import logic
+import ledger_io
+import migrations
+import pdf_cache
+import export_jobs
+import statements
 import os
 import os
+import time
+import gzip
+import hashlib
+import threading
+from datetime import date, timezone
 # ...
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "replace-this-with-a-strong-secret-key")
 
+# Compiled templates are kept on disk so restarted workers skip recompiling;
+# without JINJA_CACHE_DIR Jinja uses a private per-user temp directory, which
+# every worker of the same user shares.
+if os.getenv("JINJA_CACHE_DIR"):
+    os.makedirs(os.getenv("JINJA_CACHE_DIR"), exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(os.getenv("JINJA_CACHE_DIR") or None)
+
 # Initialize DB
 logic.init_db()
 
+# Set QUERY_BUDGET (env or app.config) to fail any request that runs more SQL
+# statements than that; meant for tests and local profiling.
+app.config.setdefault("QUERY_BUDGET", int(os.getenv("QUERY_BUDGET", "0")) or None)
+
+
+@app.cli.command("import-ledger")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--client-id", type=int, required=True, help="Client whose ledger receives the rows.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None, help="Defaults to the file extension.")
+def import_ledger_cmd(path, client_id, fmt):
+    """Bulk-import ledger rows from a CSV or NDJSON file."""
+    with open(path, "rb") as fh:
+        report = ledger_io.import_file(client_id, fh, ledger_io.detect_format(path, fmt))
+    _print_import_report(report)
+
+
+@app.cli.command("import-legacy")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--owner-email", required=True, help="Account that will own the imported clients.")
+def import_legacy_cmd(path, owner_email):
+    """Import a Kivy ledger_data.json (clients keyed by mobile)."""
+    user = logic.get_user_by_email(owner_email.strip().lower())
+    if not user:
+        raise click.ClickException(f"No account with email {owner_email}")
+    with open(path, "rb") as fh:
+        report = ledger_io.import_legacy_file(user.id, fh)
+    _print_import_report(report)
+
+
+def _print_import_report(report):
+    for line, msg in report.errors:
+        click.echo(f"line {line}: {msg}", err=True)
+    click.echo(f"Imported {report.inserted} rows, {report.failed} rejected, {report.clients_created} clients created.")
+
+
+# ---------- Per-request DB session ----------
+@app.before_request
+def _open_db_session():
+    logic.begin_request_session()
+
+
+@app.after_request
+def _check_query_budget(response):
+    budget = app.config.get("QUERY_BUDGET")
+    if budget is not None:
+        n = logic.queries_so_far()
+        response.headers["X-Query-Count"] = str(n)
+        if n > budget:
+            raise AssertionError(f"{request.method} {request.path} ran {n} queries (budget {budget})")
+    return response
+
+
+@app.teardown_request
+def _close_db_session(exc):
+    logic.end_request_session()
+
+
+# ---------- Maintenance commands ----------
+@app.cli.command("db-upgrade")
+def db_upgrade():
+    """Apply pending schema migrations (run once per deploy)."""
+    migrations.upgrade()
+
+
+@app.cli.command("balances-recompute")
+def balances_recompute():
+    """Rebuild every client's running totals from its ledger entries."""
+    n = logic.recompute_client_balances()
+    print(f"Recomputed balances for {n} clients.")
+
+
+@app.cli.command("balances-verify")
+def balances_verify():
+    """Report clients whose stored totals drifted from their entries."""
+    drift = logic.verify_client_balances()
+    for d in drift:
+        print(f"client {d['client_id']}: stored={d['stored']} actual={d['actual']}")
+    print(f"{len(drift)} client(s) out of sync." if drift else "All client balances match their entries.")
+    if drift:
+        raise SystemExit(1)
+
+
+@app.cli.command("rollups-rebuild")
+def rollups_rebuild():
+    """Rebuild every client's monthly totals and closing balances from its ledger entries."""
+    n = logic.rebuild_monthly_rollups()
+    print(f"Rebuilt {n} client month(s).")
+
+
+# ---------- Password hashing / step-up re-auth ----------
+# Tune the cost with PASSWORD_HASH_METHOD (any werkzeug method string, e.g.
+# "pbkdf2:sha256:600000" or "scrypt:32768:8:1"); stored hashes are upgraded
+# the next time their owner logs in.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+# After one password confirmation, entry edits/deletes skip the (slow) hash
+# check for this many seconds.
+REAUTH_SECONDS = int(os.getenv("REAUTH_SECONDS", "300"))
+_hash_params = {}
+
+
+def _hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def _needs_rehash(password_hash):
+    """True when a stored hash was made with other method/cost settings than the current ones."""
+    if "params" not in _hash_params:
+        _hash_params["params"] = _hash_password("").split("$", 1)[0]
+    return password_hash.split("$", 1)[0] != _hash_params["params"]
+
+
+def _reauth_active():
+    """Inside the re-auth window opened by the last password confirmation of this login."""
+    return session.get("reauth_uid") == session.get("user_id") and time.time() < session.get("reauth_until", 0)
+
+
+def _confirm_password(current_password=None):
+    """
+    Step-up check for destructive actions: pass inside the re-auth window,
+    otherwise verify the posted current_password and open a new window.
+    """
+    if _reauth_active():
+        return True
+    if current_password is None:
+        current_password = request.form.get("current_password", "")
+    user = logic.get_user_by_id(session["user_id"])
+    if not user or not current_password or not check_password_hash(user.password_hash, current_password):
+        return False
+    session["reauth_uid"] = user.id
+    session["reauth_until"] = time.time() + REAUTH_SECONDS
+    return True
+
+
+@app.context_processor
+def _inject_reauth():
+    return {"reauth_active": _reauth_active()}
+
+
+# ---------- Conditional GET ----------
+# Part of every page ETag so a deploy that changes the templates is not answered with a 304
+_TEMPLATES_DIR = os.path.join(app.root_path, app.template_folder)
+_TEMPLATES_STAMP = max((os.path.getmtime(os.path.join(_TEMPLATES_DIR, n)) for n in os.listdir(_TEMPLATES_DIR)), default=0)
+
+
+def _conditional_page(version, render):
+    """
+    Answer a page GET from its data version stamp (a datetime bumped by every
+    logic.py mutation) before render() runs any further queries. The ETag also
+    covers whatever else shapes the HTML (user, URL, re-auth state), so a 304
+    only goes out when the page would be byte-identical. Pending flash messages
+    always get a full render.
+    """
+    if version is None or session.get("_flashes"):
+        return render()
+    etag = hashlib.sha256(
+        repr((version, session.get("user_id"), request.full_path, _reauth_active(), _TEMPLATES_STAMP)).encode()
+    ).hexdigest()[:32]
+    last_modified = version.replace(microsecond=0, tzinfo=timezone.utc)
+    if request.if_none_match:
+        fresh = etag in request.if_none_match
+    else:
+        fresh = request.if_modified_since is not None and request.if_modified_since >= last_modified
+    resp = app.response_class(status=304) if fresh else make_response(render())
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
 # ---------- Auth ----------
 @app.route("/", methods=["GET"])
 def home():
@@ -39,7 +233,7 @@ def signup():
             name=name,
             phone=phone,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=_hash_password(password),
             auto_verify=True,   # no OTP
         )
         flash("Sign up successful! Please log in.", "success")
@@ -57,6 +251,9 @@ def login():
     if not user or not check_password_hash(user.password_hash, password):
         flash("Invalid email or password.", "error")
         return redirect(url_for("home"))
+    if _needs_rehash(user.password_hash):
+        logic.update_password_hash(user.id, _hash_password(password))
+    session.pop("reauth_until", None)
     session["user_id"] = user.id
     session["user_name"] = user.name
     flash(f"Welcome back, {user.name}!", "success")
@@ -70,6 +267,32 @@ def logout():
     return redirect(url_for("home"))
 
 
+# ---------- Fragment cache ----------
+# Rendered table bodies, keyed on the data version they were drawn from, so
+# a repeat view of an unchanged ledger or client list skips the row loop.
+# Per worker; stale versions simply age out of the LRU.
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "256"))
+_fragments = OrderedDict()
+_fragments_lock = threading.Lock()
+
+
+def _cached_fragment(key, build):
+    with _fragments_lock:
+        if key in _fragments:
+            _fragments.move_to_end(key)
+            return _fragments[key]
+    value = build()
+    with _fragments_lock:
+        _fragments[key] = value
+        while len(_fragments) > FRAGMENT_CACHE_SIZE:
+            _fragments.popitem(last=False)
+    return value
+
+
+def _render_fragment(template, **context):
+    return Markup(render_template(template, **context).strip())
+
+
 # ---------- Dashboard (Page 2) ----------
 @app.get("/dashboard")
 def dashboard():
@@ -101,19 +324,177 @@ def search_clients():
     return render_template("index.html", view="search", query=q, results=results)
 
 
+@app.get("/clients/suggest")
+def suggest_clients():
+    """Type-ahead: top matches as JSON for the dashboard search box."""
+    resp = logic.require_auth(session)
+    if resp:
+        return jsonify([]), 401
+    q = request.args.get("q", "").strip()
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    results = logic.search_clients(owner_id=session["user_id"], query=q, limit=limit)
+    return jsonify([{"id": c.id, "name": c.name, "mobile": c.mobile} for c in results])
+
+
 @app.get("/clients")
 def list_clients():
-    logic.require_auth(session)
-    clients = logic.get_all_clients(owner_id=session["user_id"])
-    return render_template("index.html", view="list", clients=clients)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    owner_id = session["user_id"]
+    version = logic.get_owner_clients_version(owner_id)
+
+    def render():
+        client_rows = _cached_fragment(
+            ("clients", owner_id, str(version)),
+            lambda: _render_fragment("_client_rows.html", clients=logic.get_all_clients(owner_id=owner_id)),
+        )
+        return render_template("index.html", view="list", client_rows=client_rows)
+
+    return _conditional_page(version, render)
+
+
+# Ledgers with more entries than this are rendered page by page straight into the response
+PDF_STREAM_THRESHOLD = int(os.getenv("PDF_STREAM_THRESHOLD", "5000"))
+
+
+def _send_cached_pdf(key, render, download_name, stream=None):
+    """
+    Serve the PDF cached under `key`, rendering it with render() on a miss.
+    The key is the ETag: a matching If-None-Match gets a 304 without touching
+    the disk, a hit costs one stat() and is sent with sendfile. With `stream`
+    (a callable returning PDF byte chunks) a miss is streamed to the client
+    while the cache file is written.
+    """
+    if key in request.if_none_match:
+        resp = app.response_class(status=304)
+        resp.set_etag(key)
+    elif (path := pdf_cache.lookup(key)) is None and stream is not None:
+        resp = Response(pdf_cache.store_stream(key, stream()), mimetype="application/pdf")
+        resp.headers["Content-Disposition"] = f'attachment; filename="{secure_filename(download_name)}"'
+        resp.set_etag(key)
+    else:
+        path = path or pdf_cache.store(key, render())
+        resp = send_file(path, mimetype="application/pdf", as_attachment=True, download_name=download_name,
+                         etag=key, conditional=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 @app.get("/clients/pdf")
 def clients_pdf():
-    logic.require_auth(session)
-    clients = logic.get_all_clients(owner_id=session["user_id"])
-    pdf_bytes = logic.render_clients_pdf(clients)
-    return send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True, download_name="clients.pdf")
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    owner_id = session["user_id"]
+    key = export_jobs.clients_key(owner_id)
+    return _send_cached_pdf(
+        key, lambda: logic.render_clients_pdf(logic.get_all_clients(owner_id=owner_id)), "clients.pdf",
+    )
+
+
+# ---------- Export jobs ----------
+def _job_response(job_id, code=200):
+    job = export_jobs.status(session["user_id"], job_id)
+    if job is None:
+        return jsonify(error="Export not found."), 404
+    job["status_url"] = url_for("export_status", job_id=job_id)
+    if job["status"] == "done":
+        job["download_url"] = url_for("export_download", job_id=job_id)
+    resp = jsonify(job)
+    resp.status_code = code
+    if code == 202:
+        resp.headers["Location"] = job["status_url"]
+    return resp
+
+
+@app.post("/clients/pdf/prepare")
+def prepare_clients_pdf():
+    resp = logic.require_auth(session)
+    if resp:
+        return jsonify(error="Login required."), 401
+    job_id = export_jobs.submit(session["user_id"], "clients", download_name="clients.pdf")
+    return _job_response(job_id, 202)
+
+
+@app.post("/ledger/<int:client_id>/pdf/prepare")
+def prepare_ledger_pdf(client_id):
+    resp = logic.require_auth(session)
+    if resp:
+        return jsonify(error="Login required."), 401
+    client = logic.get_client(session["user_id"], client_id)
+    if not client:
+        return jsonify(error="Client not found."), 404
+    job_id = export_jobs.submit(session["user_id"], "ledger", client_id, download_name=f"ledger_{client.name}.pdf")
+    return _job_response(job_id, 202)
+
+
+@app.get("/exports/<job_id>")
+def export_status(job_id):
+    resp = logic.require_auth(session)
+    if resp:
+        return jsonify(error="Login required."), 401
+    return _job_response(job_id)
+
+
+@app.get("/exports/<job_id>/download")
+def export_download(job_id):
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    job = logic.get_export_job(session["user_id"], job_id)
+    if job is None:
+        abort(404)
+    if job.status != "done":
+        return jsonify(error=f"Export is {job.status}."), 409
+    # evicted from the cache since it finished: the client has to prepare it again
+    return _send_cached_pdf(job.cache_key, lambda: abort(410), job.download_name)
+
+
+def _date_range():
+    """(date_from, date_to) from ?from=&to= (YYYY-MM-DD or DD-MM-YYYY); unreadable or missing ends are None."""
+    return logic.parse_date(request.args.get("from")), logic.parse_date(request.args.get("to"))
+
+
+def _range_args():
+    """The ?from=&to= arguments of this request, normalised, for links that keep the period."""
+    return {k: d.isoformat() for k, d in zip(("from", "to"), _date_range()) if d is not None}
+
+
+def _export_response(fmt, download_name, client_id=None):
+    date_from, date_to = _date_range()
+    chunks = ledger_io.export_chunks(session["user_id"], fmt, client_id, date_from, date_to)
+    download_name = "_".join([download_name] + list(_range_args().values()))
+    return Response(
+        stream_with_context(chunks),
+        mimetype=ledger_io.EXPORT_FORMATS[fmt][1],
+        headers={"Content-Disposition": f'attachment; filename="{secure_filename(download_name) or "ledger"}.{fmt}"'},
+    )
+
+
+@app.get("/clients/export.<any(csv, ndjson):fmt>")
+def export_book(fmt):
+    """Every entry of every client of the logged-in owner, streamed."""
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    return _export_response(fmt, "ledger_book")
+
+
+@app.get("/clients/statements.<any(zip, pdf):fmt>")
+def export_statements(fmt):
+    """Month-end run: every client's ledger statement, as a ZIP of PDFs or one merged PDF (?from=&to= for a period)."""
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    owner_id = session["user_id"]
+    date_from, date_to = _date_range()
+    if fmt == "zip":
+        chunks, mimetype = statements.zip_chunks(owner_id, date_from=date_from, date_to=date_to), "application/zip"
+    else:
+        chunks, mimetype = statements.merged_chunks(owner_id, date_from, date_to), "application/pdf"
+    name = "_".join(["statements", time.strftime("%Y-%m-%d")] + list(_range_args().values())) + f".{fmt}"
+    return Response(chunks, mimetype=mimetype, headers={"Content-Disposition": f'attachment; filename="{name}"'})
 
 
 # ---- Client edit/delete ----
@@ -148,54 +529,235 @@ def delete_client(client_id):
     return redirect(url_for("list_clients"))
 
 
+# ---------- Receivables ----------
+RECEIVABLES_PAGE_SIZE = 50
+
+
+def _receivables_args():
+    sort = request.args.get("sort", "pending")
+    if sort not in logic.RECEIVABLE_SORTS:
+        sort = "pending"
+    descending = request.args.get("dir", "asc") == "desc"
+    page = max(request.args.get("page", 1, type=int), 1)
+    return sort, descending, page
+
+
+@app.get("/receivables")
+def receivables():
+    """Every client's totals, sortable and paged, with the top debtors and the grand total."""
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    owner_id = session["user_id"]
+    sort, descending, page = _receivables_args()
+
+    def render():
+        data = logic.get_receivables(
+            owner_id, sort, descending, offset=(page - 1) * RECEIVABLES_PAGE_SIZE, limit=RECEIVABLES_PAGE_SIZE,
+        )
+        pages = max((data["client_count"] + RECEIVABLES_PAGE_SIZE - 1) // RECEIVABLES_PAGE_SIZE, 1)
+        return render_template(
+            "index.html", view="receivables", data=data, sort=sort, descending=descending, page=page, pages=pages,
+            first_serial=(page - 1) * RECEIVABLES_PAGE_SIZE + 1,
+        )
+
+    return _conditional_page(logic.get_receivables_version(owner_id), render)
+
+
 # ---------- Ledger (Page 3) ----------
+# Page cursors carry the opening balance and serial number forward, so the next
+# page never re-sums earlier entries. They are signed, and tied to the client's
+# balance timestamp so any change to the ledger falls back to a fresh sum.
+# Positions are (date, id) keys, sent as [YYYY-MM-DD, id].
+_cursor_signer = URLSafeSerializer(app.secret_key, salt="ledger-page")
+
+
+def _cursor_key(value):
+    try:
+        return date.fromisoformat(value[0]), int(value[1])
+    except (TypeError, ValueError, IndexError, KeyError):
+        return None
+
+
+def _dump_key(key):
+    return [key[0].isoformat(), key[1]]
+
+
+def _ledger_page(client_id, totals, limit=logic.LEDGER_PAGE_SIZE):
+    date_from, date_to = _date_range()
+    if request.args.get("page") == "last":
+        return logic.get_ledger_page(client_id, last=True, limit=limit, date_from=date_from, date_to=date_to)
+    state = {}
+    token = request.args.get("cursor")
+    if token:
+        try:
+            state = _cursor_signer.loads(token)
+        except BadSignature:
+            state = {}
+    carried = state.get("v") == str(totals["updated_at"])
+    return logic.get_ledger_page(
+        client_id,
+        after=_cursor_key(state.get("after")),
+        before=_cursor_key(state.get("before")),
+        opening=Decimal(state["o"]) if carried else None,
+        start=state["s"] if carried else None,
+        limit=limit,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+
+def _page_cursors(page, totals):
+    """Signed cursors for the pages before and after `page` (None at either end)."""
+    v = str(totals["updated_at"])
+    prev_cursor = next_cursor = None
+    if page["has_prev"]:
+        prev_cursor = _cursor_signer.dumps(
+            {"before": _dump_key(page["first_key"]), "o": str(page["opening"]), "s": page["start"], "v": v})
+    if page["has_next"]:
+        next_cursor = _cursor_signer.dumps({
+            "after": _dump_key(page["last_key"]), "o": str(page["closing"]), "s": page["start"] + len(page["rows"]),
+            "v": v,
+        })
+    return prev_cursor, next_cursor
+
+
+def _pager(client_id, page, totals):
+    """URLs for the first/previous/next/last page links under the entries table."""
+    prev_cursor, next_cursor = _page_cursors(page, totals)
+    period = _range_args()
+    links = {"first": None, "prev": None, "next": None, "last": None}
+    if prev_cursor:
+        links["first"] = url_for("ledger", client_id=client_id, **period)
+        links["prev"] = url_for("ledger", client_id=client_id, cursor=prev_cursor, **period)
+    if next_cursor:
+        links["next"] = url_for("ledger", client_id=client_id, cursor=next_cursor, **period)
+        links["last"] = url_for("ledger", client_id=client_id, page="last", **period)
+    return links
+
+
+def _ledger_table(client_id, totals):
+    """
+    (rendered <tbody> rows, page summary, pager links) for the page in the
+    query string; cached per data version, so a hit runs no entry query.
+    """
+    def build():
+        page = _ledger_page(client_id, totals)
+        summary = {k: page[k] for k in ("start", "opening", "closing", "has_prev", "has_next")}
+        summary["count"] = len(page["rows"])
+        # a period view opens with the balance brought into it
+        brought_forward = page["has_prev"] or "from" in period
+        rows = _render_fragment("_ledger_rows.html", client_id=client_id, page=page, brought_forward=brought_forward)
+        return rows, summary, _pager(client_id, page, totals)
+
+    period = _range_args()
+    key = (
+        "ledger", client_id, str(totals["updated_at"]), request.args.get("cursor"), request.args.get("page"),
+        period.get("from"), period.get("to"),
+    )
+    return _cached_fragment(key, build)
+
+
+def _back_to_ledger(client_id):
+    """Redirect to the ledger page the user was on (cursor and period kept in the query string)."""
+    keep = {k: request.args[k] for k in ("cursor", "page", "from", "to") if request.args.get(k)}
+    return redirect(url_for("ledger", client_id=client_id, **keep))
+
+
+def _ledger_context(client_id):
+    """Totals and the period links shared by the ledger view and its edit form."""
+    date_from, date_to = _date_range()
+    period = _range_args()
+    return {
+        "totals": logic.get_period_totals(client_id, date_from, date_to),
+        "period": period,
+        "period_qs": ("?" + urlencode(period)) if period else "",
+    }
+
+
 @app.get("/ledger/<int:client_id>")
 def ledger(client_id):
-    logic.require_auth(session)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
     client = logic.get_client(session["user_id"], client_id)
     if not client:
         flash("Client not found.", "error")
         return redirect(url_for("dashboard"))
-    entries = logic.get_ledger_entries(client_id)
-    totals = logic.compute_totals(entries)
-    return render_template("ledger.html", client=client, entries=entries, totals=totals)
+
+    def render():
+        # period totals and the page are only worked out when the ETag does not match
+        context = _ledger_context(client_id)
+        rows, page, pager = _ledger_table(client_id, context["totals"])
+        return render_template("ledger.html", client=client, ledger_rows=rows, page=page, pager=pager, **context)
+
+    return _conditional_page(logic.get_client_totals(client_id)["updated_at"], render)
 
 
 @app.get("/ledger/<int:client_id>/entry/<int:entry_id>/edit")
 def edit_entry_view(client_id, entry_id):
-    logic.require_auth(session)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
     client = logic.get_client(session["user_id"], client_id)
     if not client:
         flash("Client not found.", "error")
         return redirect(url_for("dashboard"))
 
-    edit_entry = logic.get_ledger_entry(entry_id)
+    edit_entry = logic.get_client_entry(session["user_id"], client_id, entry_id)
     # Ownership & client match check
-    if not edit_entry or edit_entry.client_id != client_id or client.owner_id != session["user_id"]:
+    if not edit_entry:
         flash("Entry not found.", "error")
-        return redirect(url_for("ledger", client_id=client_id))
+        return _back_to_ledger(client_id)
 
-    entries = logic.get_ledger_entries(client_id)
-    totals = logic.compute_totals(entries)
-    return render_template("ledger.html", client=client, entries=entries, totals=totals, edit_entry=edit_entry)
+    context = _ledger_context(client_id)
+    rows, page, pager = _ledger_table(client_id, context["totals"])
+    return render_template(
+        "ledger.html", client=client, ledger_rows=rows, page=page, pager=pager, edit_entry=edit_entry, **context,
+    )
 
 
 @app.get("/ledger/<int:client_id>/pdf")
 def ledger_pdf(client_id):
-    logic.require_auth(session)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    client = logic.get_client(session["user_id"], client_id)
+    if not client:
+        flash("Client not found.", "error")
+        return redirect(url_for("dashboard"))
+    date_from, date_to = _date_range()
+    totals = logic.get_period_totals(client_id, date_from, date_to)
+    key = export_jobs.ledger_key(client_id, totals, date_from, date_to)
+    big = totals["entry_count"] > PDF_STREAM_THRESHOLD
+    return _send_cached_pdf(
+        key,
+        lambda: logic.render_ledger_pdf(
+            client, logic.get_ledger_entries(client_id, date_from, date_to), totals,
+            logic.period_label(date_from, date_to),
+        ),
+        "_".join([f"ledger_{client.name}"] + list(_range_args().values())) + ".pdf",
+        stream=(lambda: logic.stream_ledger_pdf(client, totals, date_from=date_from, date_to=date_to)) if big else None,
+    )
+
+
+@app.get("/ledger/<int:client_id>/export.<any(csv, ndjson):fmt>")
+def export_ledger(client_id, fmt):
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
     client = logic.get_client(session["user_id"], client_id)
     if not client:
         flash("Client not found.", "error")
         return redirect(url_for("dashboard"))
-    entries = logic.get_ledger_entries(client_id)
-    totals = logic.compute_totals(entries)
-    pdf_bytes = logic.render_ledger_pdf(client, entries, totals)
-    return send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True, download_name=f"ledger_{client.name}.pdf")
+    return _export_response(fmt, f"ledger_{client.name}", client_id)
 
 
 @app.post("/ledger/<int:client_id>/add")
 def add_ledger_row(client_id):
-    logic.require_auth(session)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
     client = logic.get_client(session["user_id"], client_id)
     if not client:
         flash("Client not found.", "error")
@@ -205,63 +767,503 @@ def add_ledger_row(client_id):
     amt_per_hour = request.form.get("amount_per_hour", "0").strip()
     deposit = request.form.get("deposit", "0").strip()
     try:
-        logic.add_ledger_entry(client_id, date_str, details, amt_per_hour, deposit)
-        flash("Entry added.", "success")
+        entry = logic.add_ledger_entry(client_id, date_str, details, amt_per_hour, deposit)
     except ValueError as e:
         flash(str(e), "error")
-    return redirect(url_for("ledger", client_id=client_id))
+        return redirect(url_for("ledger", client_id=client_id, page="last"))
+    flash("Entry added.", "success")
+    # Show the page ending with the new entry; a back-dated one lands mid-ledger.
+    cursor = _cursor_signer.dumps({"before": _dump_key((entry.date, entry.id + 1))})
+    return redirect(url_for("ledger", client_id=client_id, cursor=cursor))
+
+
+def _import_response(report, redirect_to):
+    """JSON report for API callers; flash a summary for the browser form."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(report.to_dict())
+    flash(f"Imported {report.inserted} rows, {report.failed} rejected.", "success" if not report.failed else "error")
+    for line, msg in report.errors[:5]:
+        flash(f"Line {line}: {msg}", "error")
+    return redirect(redirect_to)
+
+
+@app.post("/ledger/<int:client_id>/import")
+def import_ledger(client_id):
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    client = logic.get_client(session["user_id"], client_id)
+    if not client:
+        flash("Client not found.", "error")
+        return redirect(url_for("dashboard"))
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV or NDJSON file to import.", "error")
+        return redirect(url_for("ledger", client_id=client_id))
+    fmt = ledger_io.detect_format(upload.filename, request.form.get("format"))
+    if fmt == "legacy":
+        flash("Upload ledger_data.json files from the dashboard.", "error")
+        return redirect(url_for("ledger", client_id=client_id))
+    report = ledger_io.import_file(client_id, upload.stream, fmt)
+    return _import_response(report, url_for("ledger", client_id=client_id, page="last"))
+
+
+@app.post("/import/legacy")
+def import_legacy():
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a ledger_data.json file to import.", "error")
+        return redirect(url_for("dashboard"))
+    try:
+        report = ledger_io.import_legacy_file(session["user_id"], upload.stream)
+    except ValueError:
+        flash("That file is not valid JSON.", "error")
+        return redirect(url_for("dashboard"))
+    flash(f"{report.clients_created} clients created.", "info")
+    return _import_response(report, url_for("list_clients"))
 
 
 @app.post("/ledger/<int:client_id>/entry/<int:entry_id>/edit")
 def edit_entry(client_id, entry_id):
-    logic.require_auth(session)
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
     details = request.form.get("details", "").strip()
     date_str = request.form.get("date", "").strip()
     amt_per_hour = request.form.get("amount_per_hour", "0").strip()
     deposit = request.form.get("deposit", "0").strip()
-    current_password = request.form.get("current_password", "")
 
-    user = logic.get_user_by_id(session["user_id"])
-    if not user or not current_password or not check_password_hash(user.password_hash, current_password):
+    if not _confirm_password():
         flash("Incorrect account password.", "error")
-        return redirect(url_for("ledger", client_id=client_id))
+        return _back_to_ledger(client_id)
 
     # Ownership & client match check BEFORE update
-    entry = logic.get_ledger_entry(entry_id)
-    client = logic.get_client(session["user_id"], client_id)
-    if not entry or not client or entry.client_id != client_id or client.owner_id != session["user_id"]:
+    if not logic.get_client_entry(session["user_id"], client_id, entry_id):
         flash("Entry not found.", "error")
-        return redirect(url_for("ledger", client_id=client_id))
+        return _back_to_ledger(client_id)
 
     try:
         logic.update_ledger_entry(entry_id, date_str, details, amt_per_hour, deposit)
         flash("Entry updated.", "success")
     except ValueError as e:
         flash(str(e), "error")
-    return redirect(url_for("ledger", client_id=client_id))
+    return _back_to_ledger(client_id)
 
 
 @app.post("/ledger/<int:client_id>/entry/<int:entry_id>/delete")
 def delete_entry(client_id, entry_id):
-    logic.require_auth(session)
-    current_password = request.form.get("current_password", "")
+    resp = logic.require_auth(session)
+    if resp:
+        return resp
 
-    user = logic.get_user_by_id(session["user_id"])
-    if not user or not current_password or not check_password_hash(user.password_hash, current_password):
+    if not _confirm_password():
         flash("Incorrect account password.", "error")
-        return redirect(url_for("ledger", client_id=client_id))
+        return _back_to_ledger(client_id)
 
     # Ownership & client match check BEFORE delete
-    entry = logic.get_ledger_entry(entry_id)
-    client = logic.get_client(session["user_id"], client_id)
-    if not entry or not client or entry.client_id != client_id or client.owner_id != session["user_id"]:
+    if not logic.get_client_entry(session["user_id"], client_id, entry_id):
         flash("Entry not found.", "error")
-        return redirect(url_for("ledger", client_id=client_id))
+        return _back_to_ledger(client_id)
 
     ok = logic.delete_ledger_entry(entry_id)
     flash("Entry deleted." if ok else "Entry not found.", "success" if ok else "error")
-    return redirect(url_for("ledger", client_id=client_id))
+    return _back_to_ledger(client_id)
+
+
+# ---------- JSON API (v1) ----------
+# For the mobile client and integrations: the same logic calls as the pages
+# above, answered as JSON without templates. Lists are compact, {"fields": [...],
+# "rows": [[...]], "next": cursor}, amounts are decimal strings, and bodies
+# over API_GZIP_MIN_BYTES are gzipped for clients that accept it. Auth is the
+# normal login session (POST /api/v1/login); edits and deletes take the same
+# step-up password check as the forms, as "current_password" in the JSON body.
+API_PAGE_MAX = 500
+API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1024"))
+ENTRY_FIELDS = ["id", "date", "details", "amount_per_hour", "deposit", "pending"]
+_client_cursor_signer = URLSafeSerializer(app.secret_key, salt="api-clients")
+
+
+def _api_error(message, status):
+    return jsonify({"error": message}), status
+
+
+def _money(value):
+    return f"{(value or 0):.2f}"
+
+
+def _entry_row(e):
+    return [e.id, e.date.isoformat(), e.details, _money(e.amount_per_hour), _money(e.deposit), _money(e.pending)]
+
+
+def _totals_json(totals):
+    return {
+        "amount_per_hour": _money(totals["amount_per_hour"]),
+        "deposit": _money(totals["deposit"]),
+        "pending": _money(totals["pending"]),
+        "entry_count": totals["entry_count"],
+        "updated_at": totals["updated_at"].isoformat() if totals["updated_at"] else None,
+        **({"opening": _money(totals["opening"])} if "opening" in totals else {}),
+    }
+
+
+def _api_date(value):
+    """ISO date from a JSON body; today when missing (as in the form)."""
+    if not value:
+        return date.today().isoformat()
+    try:
+        return date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise ValueError("Dates must be YYYY-MM-DD.")
+
+
+def _api_limit(default):
+    return max(1, min(request.args.get("limit", default, type=int), API_PAGE_MAX))
+
+
+def _api_client(client_id):
+    """The caller's client, or None (answered as 404)."""
+    return logic.get_client(session["user_id"], client_id)
+
+
+@app.after_request
+def _gzip_api_response(response):
+    if (
+        not request.path.startswith("/api/")
+        or response.direct_passthrough
+        or "gzip" not in request.headers.get("Accept-Encoding", "")
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) >= API_GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(data, compresslevel=5))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@app.post("/api/v1/login")
+def api_login():
+    body = request.get_json(silent=True) or {}
+    email = str(body.get("email", "")).strip().lower()
+    password = str(body.get("password", ""))
+    user = logic.get_user_by_email(email)
+    if not user or not check_password_hash(user.password_hash, password):
+        return _api_error("Invalid email or password.", 401)
+    if _needs_rehash(user.password_hash):
+        logic.update_password_hash(user.id, _hash_password(password))
+    session.pop("reauth_until", None)
+    session["user_id"] = user.id
+    session["user_name"] = user.name
+    return jsonify({"user": {"id": user.id, "name": user.name, "email": user.email}})
+
+
+@app.get("/api/v1/clients")
+def api_clients():
+    """All clients in name order, a page at a time; with ?q= the search matches instead."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    limit = _api_limit(100)
+    q = request.args.get("q", "").strip()
+    if q:
+        found = logic.search_clients(owner_id=session["user_id"], query=q, limit=limit)
+        return jsonify({"fields": ["id", "name", "mobile"], "rows": [[c.id, c.name, c.mobile] for c in found], "next": None})
+    after = None
+    token = request.args.get("cursor")
+    if token:
+        try:
+            after = tuple(_client_cursor_signer.loads(token))
+        except (BadSignature, TypeError):
+            return _api_error("Invalid cursor.", 400)
+    rows = logic.get_clients_page(session["user_id"], after=after, limit=limit)
+    next_cursor = _client_cursor_signer.dumps([rows[-1][1], rows[-1][0]]) if len(rows) == limit else None
+    return jsonify({"fields": ["id", "name", "mobile"], "rows": rows, "next": next_cursor})
+
+
+@app.get("/api/v1/receivables")
+def api_receivables():
+    """The receivables dashboard as compact rows; same sort/dir/page arguments as /receivables."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    sort, descending, page = _receivables_args()
+    limit = _api_limit(RECEIVABLES_PAGE_SIZE)
+    data = logic.get_receivables(session["user_id"], sort, descending, offset=(page - 1) * limit, limit=limit)
+
+    def encode(rows):
+        return [[cid, name, mobile, _money(aph), _money(dep), _money(pend), n] for cid, name, mobile, aph, dep, pend, n in rows]
+
+    grand = data["grand"]
+    return jsonify({
+        "fields": ["id", "name", "mobile", "amount_per_hour", "deposit", "pending", "entries"],
+        "rows": encode(data["rows"]),
+        "debtors": encode(data["debtors"]),
+        "client_count": data["client_count"],
+        "grand": {
+            "amount_per_hour": _money(grand["amount_per_hour"]), "deposit": _money(grand["deposit"]),
+            "pending": _money(grand["pending"]), "entry_count": grand["entry_count"],
+        },
+        "page": page,
+    })
+
+
+@app.get("/api/v1/clients/<int:client_id>")
+def api_client(client_id):
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    client = _api_client(client_id)
+    if not client:
+        return _api_error("Client not found.", 404)
+    return jsonify({
+        "client": {"id": client.id, "name": client.name, "mobile": client.mobile},
+        "totals": _totals_json(logic.get_client_totals(client_id)),
+    })
+
+
+@app.get("/api/v1/clients/<int:client_id>/totals")
+def api_client_totals(client_id):
+    """Whole-ledger totals; with from=/to= the period's totals and the opening balance brought into it."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    if not _api_client(client_id):
+        return _api_error("Client not found.", 404)
+    return jsonify(_totals_json(logic.get_period_totals(client_id, *_date_range())))
+
+
+def _trend_json(months):
+    return {
+        "fields": logic.TREND_FIELDS,
+        "rows": [[m.isoformat(), _money(aph), _money(dep), _money(pend), n, _money(closing)]
+                 for m, aph, dep, pend, n, closing in months],
+    }
+
+
+@app.get("/api/v1/clients/<int:client_id>/months")
+def api_client_months(client_id):
+    """Monthly totals and closing balance (from the rollups), for trend charts; from=/to= pick the months."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    if not _api_client(client_id):
+        return _api_error("Client not found.", 404)
+    return jsonify(_trend_json(logic.get_client_trend(client_id, *_date_range())))
+
+
+@app.get("/api/v1/months")
+def api_months():
+    """The same monthly trend summed over all of the caller's clients."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    return jsonify(_trend_json(logic.get_owner_trend(session["user_id"], *_date_range())))
+
+
+@app.get("/api/v1/clients/<int:client_id>/entries")
+def api_entries(client_id):
+    """
+    Entries in ledger (date) order with their running balance; follow
+    "next"/"prev" (cursor=...) to page, or ask for page=last to start at the
+    end. from=/to= limit them to a period; send them with every page.
+    """
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    if not _api_client(client_id):
+        return _api_error("Client not found.", 404)
+    totals = logic.get_client_totals(client_id)
+    page = _ledger_page(client_id, totals, limit=_api_limit(logic.LEDGER_PAGE_SIZE))
+    prev_cursor, next_cursor = _page_cursors(page, totals)
+    return jsonify({
+        "fields": ENTRY_FIELDS + ["balance"],
+        "rows": [_entry_row(e) + [_money(balance)] for e, balance in page["rows"]],
+        "start": page["start"],
+        "opening": _money(page["opening"]),
+        "closing": _money(page["closing"]),
+        "prev": prev_cursor,
+        "next": next_cursor,
+    })
+
+
+@app.post("/api/v1/clients/<int:client_id>/entries")
+def api_add_entry(client_id):
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    if not _api_client(client_id):
+        return _api_error("Client not found.", 404)
+    body = request.get_json(silent=True) or {}
+    try:
+        entry = logic.add_ledger_entry(
+            client_id, _api_date(body.get("date")), str(body.get("details") or "").strip(),
+            body.get("amount_per_hour", "0"), body.get("deposit", "0"),
+        )
+    except ValueError as e:
+        return _api_error(str(e), 400)
+    return jsonify({
+        "fields": ENTRY_FIELDS, "entry": _entry_row(entry),
+        "totals": _totals_json(logic.get_client_totals(client_id)),
+    }), 201
+
+
+@app.patch("/api/v1/clients/<int:client_id>/entries/<int:entry_id>")
+def api_update_entry(client_id, entry_id):
+    """Change some fields of an entry; the ones left out keep their values."""
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    body = request.get_json(silent=True) or {}
+    if not _confirm_password(str(body.get("current_password", ""))):
+        return _api_error("Incorrect account password.", 403)
+    entry = logic.get_client_entry(session["user_id"], client_id, entry_id)
+    if not entry:
+        return _api_error("Entry not found.", 404)
+    try:
+        logic.update_ledger_entry(
+            entry_id,
+            _api_date(body.get("date") or entry.date),
+            str(body.get("details", entry.details) or "").strip(),
+            body.get("amount_per_hour", entry.amount_per_hour),
+            body.get("deposit", entry.deposit),
+        )
+    except ValueError as e:
+        return _api_error(str(e), 400)
+    return jsonify({
+        "fields": ENTRY_FIELDS, "entry": _entry_row(logic.get_ledger_entry(entry_id)),
+        "totals": _totals_json(logic.get_client_totals(client_id)),
+    })
+
+
+@app.delete("/api/v1/clients/<int:client_id>/entries/<int:entry_id>")
+def api_delete_entry(client_id, entry_id):
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    body = request.get_json(silent=True) or {}
+    if not _confirm_password(str(body.get("current_password", ""))):
+        return _api_error("Incorrect account password.", 403)
+    if not logic.get_client_entry(session["user_id"], client_id, entry_id):
+        return _api_error("Entry not found.", 404)
+    logic.delete_ledger_entry(entry_id)
+    return jsonify({"totals": _totals_json(logic.get_client_totals(client_id))})
+
+
+# ---------- Sync (offline clients) ----------
+# The Kivy app works offline and syncs in deltas: GET /api/v1/sync?since=<cursor>
+# returns what changed after that journal position (start at 0 for the whole
+# book), POST /api/v1/sync applies a batch of queued edits. Every op carries a
+# client-made "op_id"; a retried op answers with its first result instead of
+# being applied again. Edits win in the order the server receives them.
+SYNC_MAX_OPS = 500
+SYNC_OPS = ("client.add", "client.update", "client.delete", "entry.add", "entry.update", "entry.delete")
+
+
+@app.get("/api/v1/sync")
+def api_sync_changes():
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    since = max(0, request.args.get("since", 0, type=int))
+    changes = logic.get_changes(session["user_id"], since, limit=_api_limit(logic.SYNC_PAGE_SIZE))
+    return jsonify({
+        "cursor": changes["cursor"],
+        "more": changes["more"],
+        "clients": {"fields": ["id", "name", "mobile"], "rows": [list(c) for c in changes["clients"]]},
+        "entries": {
+            "fields": ["client_id"] + ENTRY_FIELDS,
+            "rows": [[e.client_id] + _entry_row(e) for e in changes["entries"]],
+        },
+        "deleted": {"clients": changes["deleted_clients"], "entries": changes["deleted_entries"]},
+    })
+
+
+def _invalid_sync_op(op):
+    """Why a queued op cannot be applied as sent (retrying will not help), or None."""
+    if not isinstance(op, dict) or op.get("op") not in SYNC_OPS or not op.get("op_id"):
+        return f"Each op needs an op_id and one of {', '.join(SYNC_OPS)}."
+    if op["op"].endswith((".update", ".delete")) and type(op.get("id")) is not int:  # bool is not an id either
+        return f"{op['op']} needs the integer id of what it changes."
+    return None
+
+
+def _sync_client_id(owner_id, op):
+    """client_id of an entry op, or the id created by an earlier client.add op named in "client_op"."""
+    if op.get("client_op"):
+        done = logic.get_sync_op(owner_id, str(op["client_op"]))
+        return done.entity_id if done else None
+    return op.get("client_id")
+
+
+def _apply_sync_op(owner_id, op):
+    """Apply one queued edit; returns (status, id). Raises ValueError/UniqueConstraintError for bad input."""
+    kind, op_id = op["op"], op["op_id"]
+    if kind == "client.add":
+        client = logic.create_client(owner_id, str(op.get("name") or "").strip(), str(op.get("mobile") or "").strip(),
+                                     op_id=op_id)
+        return "ok", client.id
+    if kind == "client.update":
+        ok = logic.update_client(owner_id, op.get("id"), str(op.get("name") or "").strip(),
+                                 str(op.get("mobile") or "").strip(), op_id=op_id)
+        return ("ok" if ok else "not_found"), op.get("id")
+    if kind == "client.delete":
+        return ("ok" if logic.delete_client(owner_id, op.get("id"), op_id=op_id) else "not_found"), op.get("id")
+    client_id = _sync_client_id(owner_id, op)
+    if not client_id or not logic.get_client(owner_id, client_id):
+        return "not_found", None
+    if kind == "entry.add":
+        entry = logic.add_ledger_entry(
+            client_id, _api_date(op.get("date")), str(op.get("details") or "").strip(),
+            op.get("amount_per_hour", "0"), op.get("deposit", "0"), op_id=op_id,
+        )
+        return "ok", entry.id
+    entry = logic.get_client_entry(owner_id, client_id, op.get("id"))
+    if not entry:
+        return "not_found", op.get("id")
+    if kind == "entry.update":
+        logic.update_ledger_entry(
+            entry.id, _api_date(op.get("date") or entry.date), str(op.get("details", entry.details) or "").strip(),
+            op.get("amount_per_hour", entry.amount_per_hour), op.get("deposit", entry.deposit), op_id=op_id,
+        )
+    else:
+        logic.delete_ledger_entry(entry.id, op_id=op_id)
+    return "ok", entry.id
+
+
+@app.post("/api/v1/sync")
+def api_sync_apply():
+    """
+    {"ops": [{"op_id", "op", ...fields}], "current_password"?} -> one result
+    per op, in order. Entry edits and deletes need the step-up password like
+    the other API calls; an op that fails does not stop the ones after it.
+    """
+    if logic.require_auth(session):
+        return _api_error("Login required.", 401)
+    owner_id = session["user_id"]
+    body = request.get_json(silent=True) or {}
+    ops = body.get("ops")
+    if not isinstance(ops, list) or len(ops) > SYNC_MAX_OPS:
+        return _api_error(f"Send up to {SYNC_MAX_OPS} ops as a list.", 400)
+    if any(isinstance(op, dict) and op.get("op") in ("entry.update", "entry.delete") for op in ops):
+        if not _confirm_password(str(body.get("current_password", ""))):
+            return _api_error("Incorrect account password.", 403)
+    results = []
+    for op in ops:
+        problem = _invalid_sync_op(op)
+        if problem:
+            results.append({"op_id": op.get("op_id") if isinstance(op, dict) else None, "status": "invalid",
+                            "error": problem})
+            continue
+        op = dict(op, op_id=str(op["op_id"])[:64])
+        done = logic.get_sync_op(owner_id, op["op_id"])
+        if done is None:
+            try:
+                status, entity_id = _apply_sync_op(owner_id, op)
+            except logic.DuplicateOpError:
+                done = logic.get_sync_op(owner_id, op["op_id"])
+            except (logic.UniqueConstraintError, ValueError, TypeError) as e:
+                results.append({"op_id": op["op_id"], "status": "error", "error": str(e)})
+                continue
+        if done is not None:
+            status, entity_id = "duplicate", done.entity_id
+        results.append({"op_id": op["op_id"], "status": status, "id": entity_id})
+    # no cursor here: the caller pulls from its own, which also covers edits made elsewhere meanwhile
+    return jsonify({"results": results})
 
 
 if __name__ == "__main__":
+    migrations.upgrade()
     app.run(host="0.0.0.0", port=5000, debug=True)
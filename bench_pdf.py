@@ -0,0 +1,71 @@
+# bench_pdf.py
+"""
+Render time and output size of each pdf_render backend on synthetic ledgers.
+
+    python bench_pdf.py                              # 1k, 10k, 100k rows, all backends
+    python bench_pdf.py --rows 1000 --backends stream fpdf
+
+Backends whose library is not installed are reported as skipped. Peak
+memory is measured with tracemalloc in a second, untimed pass (--memory).
+"""
+import argparse
+import time
+import tracemalloc
+
+import pdf_render
+
+
+def sample_rows(n: int):
+    return [
+        (f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"Work item {i} " + "site visit " * (i % 5),
+         (i % 40) * 2.5, (i % 30) * 3.0, (i % 30) * 3.0 - (i % 40) * 2.5)
+        for i in range(n)
+    ]
+
+
+def _spec(rows):
+    totals = {
+        "amount_per_hour": sum(r[2] for r in rows),
+        "deposit": sum(r[3] for r in rows),
+        "pending": sum(r[4] for r in rows),
+    }
+    return pdf_render.ledger_spec("Benchmark Client", "03000000000", rows, totals)
+
+
+def run(backend: str, rows, memory: bool = False) -> dict:
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in pdf_render.iter_pdf(_spec(rows), backend))
+    result = {"seconds": time.perf_counter() - start, "bytes": size}
+    if memory:
+        tracemalloc.start()
+        for _ in pdf_render.iter_pdf(_spec(rows), backend):
+            pass
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=list(pdf_render.BACKENDS), choices=list(pdf_render.BACKENDS))
+    parser.add_argument("--memory", action="store_true", help="also report peak Python memory")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8}  {'backend':<9} {'seconds':>9} {'KB':>9} {'rows/s':>9}" + ("  peak MB" if args.memory else ""))
+    for n in args.rows:
+        rows = sample_rows(n)
+        for backend in args.backends:
+            try:
+                r = run(backend, rows, args.memory)
+            except ImportError as e:
+                print(f"{n:>8}  {backend:<9} skipped ({e.name} not installed)")
+                continue
+            line = f"{n:>8}  {backend:<9} {r['seconds']:>9.2f} {r['bytes'] / 1024:>9.0f} {n / r['seconds']:>9.0f}"
+            if args.memory:
+                line += f"  {r['peak_mb']:>7.1f}"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# export_jobs.py
+"""
+Background PDF exports.
+
+A job is a row in `export_jobs` (so any gunicorn worker can report its
+status) plus a render task in a process pool owned by the worker that took
+the request. The finished PDF is written into the shared PDF cache and the
+job records its cache key; downloading it is then an ordinary cache hit.
+
+Settings (env):
+    EXPORT_WORKERS (2)        processes in the render pool
+    EXPORT_JOBS_INLINE (off)  render inside the request instead (tests, tiny deployments)
+    EXPORT_JOB_TIMEOUT (900)  seconds before an unfinished job is reported as failed
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import logic
+import pdf_cache
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+INLINE = os.getenv("EXPORT_JOBS_INLINE", "").lower() in ("1", "true", "yes")
+JOB_TIMEOUT = int(os.getenv("EXPORT_JOB_TIMEOUT", "900"))
+KINDS = ("ledger", "clients")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: children start clean instead of inheriting the worker's DB connections and threads
+        _executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+# -------------------- Cache keys ------------------
+def ledger_key(client_id: int, totals: dict, date_from: Optional[date] = None, date_to: Optional[date] = None) -> str:
+    version = totals["updated_at"]
+    if date_from is not None or date_to is not None:
+        version = f"{version}:{date_from}:{date_to}"
+    return pdf_cache.cache_key("ledger", client_id, version)
+
+
+def clients_key(owner_id: int) -> str:
+    return pdf_cache.cache_key("clients", owner_id, logic.get_owner_clients_version(owner_id))
+
+
+# -------------------- Rendering -------------------
+def render_to_cache(owner_id: int, kind: str, client_id: Optional[int] = None) -> str:
+    """Render an export into the PDF cache unless it is already there; returns its cache key."""
+    if kind == "ledger":
+        client = logic.get_client(owner_id, client_id)
+        if not client:
+            raise ValueError("Client not found")
+        totals = logic.get_client_totals(client_id)
+        key = ledger_key(client_id, totals)
+        if pdf_cache.lookup(key) is None:
+            for _ in pdf_cache.store_stream(key, logic.stream_ledger_pdf(client, totals)):
+                pass
+        return key
+    key = clients_key(owner_id)
+    if pdf_cache.lookup(key) is None:
+        pdf_cache.store(key, logic.render_clients_pdf(logic.get_all_clients(owner_id=owner_id)))
+    return key
+
+
+def run_job(job_id: str, owner_id: int, kind: str, client_id: Optional[int]) -> None:
+    """Job body; runs in a pool process (or inline). Records its own outcome."""
+    logic.update_export_job(job_id, status="running")
+    try:
+        key = render_to_cache(owner_id, kind, client_id)
+    except Exception as e:
+        logic.update_export_job(job_id, status="failed", error=str(e) or e.__class__.__name__)
+        return
+    logic.update_export_job(job_id, status="done", cache_key=key)
+
+
+def _on_done(job_id: str, future) -> None:
+    # run_job records ordinary errors itself; this catches a pool process dying mid-job
+    error = future.exception()
+    if error is not None:
+        logic.update_export_job(job_id, status="failed", error=str(error) or error.__class__.__name__)
+
+
+# -------------------- Public API ------------------
+def submit(owner_id: int, kind: str, client_id: Optional[int] = None, download_name: str = "export.pdf") -> str:
+    """Queue an export and return the job id."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind {kind!r}")
+    job = logic.create_export_job(owner_id, kind, client_id, download_name)
+    args = (job.id, owner_id, kind, client_id)
+    if INLINE:
+        run_job(*args)
+    else:
+        future = _pool().submit(run_job, *args)
+        future.add_done_callback(lambda f, job_id=job.id: _on_done(job_id, f))
+    return job.id
+
+
+def status(owner_id: int, job_id: str) -> Optional[dict]:
+    job = logic.get_export_job(owner_id, job_id)
+    if job is None:
+        return None
+    if job.status in ("queued", "running") and datetime.utcnow() - job.created_at > timedelta(seconds=JOB_TIMEOUT):
+        # the worker that owned the pool was restarted or the render hung
+        logic.update_export_job(job.id, status="failed", error="Timed out")
+        job = logic.get_export_job(owner_id, job_id)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "client_id": job.client_id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,267 @@
+# ledger_io.py
+"""
+Bulk ledger import and streaming export.
+
+Rows are read from CSV or NDJSON as a stream, checked with the same rules as
+the add-entry form (logic.parse_date / logic._parse_amount) and written
+in large batches through logic.add_ledger_entries_bulk. Bad rows are skipped
+and reported by line number; good rows are still imported.
+
+The legacy Kivy `ledger_data.json` shape is also accepted:
+    {"<mobile>": {"name": ..., "ledger": [{"date", "detail", "amount_hour", "amount_deposit", ...}, ...]}}
+Ledger rows may also be the Kivy in-memory lists [sr, date, detail, hour, deposit, pending].
+
+Exports (CSV / NDJSON, one client or an owner's whole book) read entries through
+a server-side cursor in batches and yield text chunks, so memory stays flat
+and the first bytes go out before the query has finished.
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+import logic
+from logic import Client, LedgerEntry
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FIELDS = [
+    "client_id", "client_name", "client_mobile", "entry_id",
+    "date", "details", "amount_per_hour", "deposit", "pending",
+]
+
+# Accepted header/key spellings -> entry field
+_FIELD_ALIASES = {
+    "date": "date",
+    "details": "details",
+    "detail": "details",
+    "amount_per_hour": "amount_per_hour",
+    "amount_hour": "amount_per_hour",
+    "amount/hour": "amount_per_hour",
+    "deposit": "deposit",
+    "amount_deposit": "deposit",
+    "amount deposited": "deposit",
+}
+
+
+class ImportReport:
+    """Counts plus the first MAX_REPORTED_ERRORS row errors as (line, message)."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.clients_created = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def to_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "clients_created": self.clients_created,
+            "errors": [{"line": line, "error": msg} for line, msg in self.errors],
+        }
+
+
+# -------------------- Parsing ---------------------
+def detect_format(filename: str, declared: Optional[str] = None) -> str:
+    fmt = (declared or "").lower() or (filename or "").rsplit(".", 1)[-1].lower()
+    if fmt in ("ndjson", "jsonl"):
+        return "ndjson"
+    if fmt == "json":
+        return "legacy"
+    return "csv"
+
+
+def _text_stream(stream) -> io.TextIOBase:
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def iter_records(stream, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (line_number, raw_record) from a CSV or NDJSON byte/text stream."""
+    text_stream = _text_stream(stream)
+    if fmt == "ndjson":
+        for line_no, line in enumerate(text_stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                yield line_no, {"_error": f"Invalid JSON: {e.msg}"}
+                continue
+            yield line_no, rec if isinstance(rec, dict) else {"_error": "Expected a JSON object"}
+        return
+    reader = csv.DictReader(text_stream)
+    for rec in reader:
+        # line_num is the physical line the record ended on (header is line 1)
+        yield reader.line_num, rec
+
+
+def to_entry(rec, strict_dates: bool = True) -> dict:
+    """
+    Validate one raw record (dict or legacy list) into add_ledger_entries_bulk
+    form; ValueError if bad. With strict_dates=False an unrecognised date is
+    replaced by today, exactly like the add-entry form does.
+    """
+    if isinstance(rec, (list, tuple)):
+        rec = dict(zip(["sr", "date", "details", "amount_per_hour", "deposit"], rec))
+    if "_error" in rec:
+        raise ValueError(rec["_error"])
+    fields = {}
+    for key, value in rec.items():
+        field = _FIELD_ALIASES.get(str(key or "").strip().lower())
+        if field:
+            fields[field] = value
+    raw_date = str(fields.get("date") or "").strip()
+    entry_date = logic.parse_date(raw_date)
+    if strict_dates and raw_date and entry_date is None:
+        raise ValueError(f"Unrecognised date {raw_date!r} (expected YYYY-MM-DD or DD-MM-YYYY)")
+    return {
+        "date": entry_date or date.today(),
+        "details": str(fields.get("details") or "").strip(),
+        "amount_per_hour": logic._parse_amount(fields.get("amount_per_hour")),
+        "deposit": logic._parse_amount(fields.get("deposit")),
+    }
+
+
+# -------------------- Import ----------------------
+def import_records(client_id: int, records: Iterable[Tuple[int, object]], report: Optional[ImportReport] = None,
+                   batch_size: int = BATCH_SIZE, strict_dates: bool = True) -> ImportReport:
+    report = report or ImportReport()
+    batch = []
+    for line_no, rec in records:
+        try:
+            batch.append(to_entry(rec, strict_dates))
+        except ValueError as e:
+            report.error(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            report.inserted += logic.add_ledger_entries_bulk(client_id, batch)
+            batch = []
+    report.inserted += logic.add_ledger_entries_bulk(client_id, batch)
+    return report
+
+
+def import_file(client_id: int, stream, fmt: str) -> ImportReport:
+    """Import a CSV/NDJSON stream into one client's ledger."""
+    return import_records(client_id, iter_records(stream, fmt))
+
+
+def import_legacy(owner_id: int, data: dict) -> ImportReport:
+    """
+    Import a legacy Kivy ledger_data.json dict. Clients are matched by mobile
+    and created when missing. The Kivy app never validated dates, so these
+    are normalized leniently. Error "lines" are 1-based row numbers within
+    each client's ledger, prefixed by the mobile in the message.
+    """
+    report = ImportReport()
+    existing = {c.mobile: c for c in logic.get_all_clients(owner_id)}
+    for mobile, info in (data or {}).items():
+        info = info or {}
+        client = existing.get(mobile)
+        if client is None:
+            try:
+                client = logic.create_client(owner_id, str(info.get("name") or mobile), mobile)
+            except logic.UniqueConstraintError as e:
+                report.error(0, f"{mobile}: {e}")
+                continue
+            existing[mobile] = client
+            report.clients_created += 1
+        rows = info.get("ledger") or []
+        sub = ImportReport()
+        import_records(client.id, enumerate(rows, start=1), sub, strict_dates=False)
+        report.inserted += sub.inserted
+        for line, msg in sub.errors:
+            report.error(line, f"{mobile}: {msg}")
+        report.failed += sub.failed - len(sub.errors)
+    return report
+
+
+def import_legacy_file(owner_id: int, stream) -> ImportReport:
+    return import_legacy(owner_id, json.load(_text_stream(stream)))
+
+
+# -------------------- Export ----------------------
+def iter_export_rows(owner_id: int, client_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE,
+                     date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    Yield plain row tuples (EXPORT_FIELDS order) for an owner's book, or one
+    of its clients, ordered by client then ledger order, optionally only the
+    entries dated date_from..date_to. Uses its own session because the
+    response body is produced after the request has returned.
+    """
+    q = (
+        select(
+            Client.id, Client.name, Client.mobile, LedgerEntry.id, LedgerEntry.date, LedgerEntry.details,
+            LedgerEntry.amount_per_hour, LedgerEntry.deposit, LedgerEntry.pending,
+        )
+        .join(Client, Client.id == LedgerEntry.client_id)
+        .where(Client.owner_id == owner_id)
+        .order_by(LedgerEntry.client_id, LedgerEntry.date, LedgerEntry.id)
+    )
+    if client_id is not None:
+        q = q.where(LedgerEntry.client_id == client_id)
+    q = logic._in_period(q, date_from, date_to)
+    db = logic.SessionLocal()
+    try:
+        for row in db.execute(q.execution_options(yield_per=batch_size)):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+def csv_chunks(rows: Iterable[tuple], rows_per_chunk: int = 500) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_FIELDS)
+    yield buf.getvalue()  # first byte goes out before the query runs
+    buf.seek(0)
+    buf.truncate()
+    pending = 0
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if pending:
+        yield buf.getvalue()
+
+
+def ndjson_chunks(rows: Iterable[tuple], rows_per_chunk: int = 500) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        rec = dict(zip(EXPORT_FIELDS, row))
+        for key in ("amount_per_hour", "deposit", "pending"):
+            rec[key] = str(rec[key])  # keep cents exact
+        lines.append(json.dumps(rec, ensure_ascii=False, default=str))
+        if len(lines) >= rows_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (csv_chunks, "text/csv"),
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+}
+
+
+def export_chunks(owner_id: int, fmt: str, client_id: Optional[int] = None, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> Iterator[str]:
+    chunks, _ = EXPORT_FORMATS[fmt]
+    return chunks(iter_export_rows(owner_id, client_id, date_from=date_from, date_to=date_to))
@@ -51,6 +51,16 @@ class RemovePopup(Popup):
             self.pin.hint_text = "Wrong Password!"
             return
 
+        # With local_store, only the removed row is written; SR numbers are row positions
+        store = getattr(self.page2.main_app, "store", None)
+        if store is not None:
+            removed = store.remove_entry(self.page2.client_mobile, self.entry_index)
+            if removed is not None:
+                print(f"Removed entry: {removed}")
+                self.page2.show_table()
+            self.dismiss()
+            return
+
         # Remove the entry
         ledger = self.page2.main_app.clients[self.page2.client_mobile]["ledger"]
         if 0 <= self.entry_index < len(ledger):
@@ -16,6 +16,8 @@ from kivy.properties import NumericProperty
 from kivy.effects.scroll import ScrollEffect
 from kivy.core.window import Window
 
+import text_measure
+
 # ---------------- Styled Button ----------------
 def styled_button(text, height=50):
     return Button(
@@ -78,7 +80,7 @@ class BorderedCell(Label):
 
 # ---------------- ScrollableTable ----------------
 class ScrollableTable(ScrollView):
-    def __init__(self, cols=6, headers=None, **kwargs):
+    def __init__(self, cols=6, headers=None, col_widths=None, **kwargs):
         super().__init__(**kwargs)
         self.do_scroll_x = False
         self.do_scroll_y = True
@@ -88,31 +90,25 @@ class ScrollableTable(ScrollView):
         self.effect_y = ScrollEffect()
 
         self.cols = cols
+        self.col_widths = col_widths if col_widths else [100]*cols
         self.layout = GridLayout(cols=cols, spacing=2, size_hint_y=None)
         self.layout.bind(minimum_height=self.layout.setter('height'))
         self.add_widget(self.layout)
 
         if headers:
-            for h in headers:
-                self.layout.add_widget(BorderedCell(text=h, bold=True, col_width=100, is_header=True))
+            for i,h in enumerate(headers):
+                w = self.col_widths[i] if i < len(self.col_widths) else 100
+                self.layout.add_widget(BorderedCell(text=h, bold=True, col_width=w, is_header=True))
 
         Window.bind(on_key_down=self._on_key_down)
 
     def add_row(self, row_data):
-        print(f"Adding row: {row_data}")  # ✅ debug print
-        max_height = 40
-
-        # Determine max height for the row
-        for item in row_data:
-            lbl = Label(text=str(item), text_size=(100-10, None))
-            lbl.texture_update()
-            h = lbl.texture_size[1]+20
-            if h > max_height:
-                max_height = h
+        # Determine max height for the row (cached; numeric cells are not rasterised)
+        max_height = text_measure.row_height([str(item) for item in row_data], self.col_widths)
 
         # Add actual BorderedCell widgets
-        for item in row_data:
-            cell = BorderedCell(text=str(item), col_width=100, row_height=max_height)
+        for i, item in enumerate(row_data):
+            cell = BorderedCell(text=str(item), col_width=self.col_widths[i], row_height=max_height)
             self.layout.add_widget(cell)
 
         # Update total layout height
@@ -132,7 +128,7 @@ class TestApp(App):
         root = BoxLayout(orientation='vertical')
 
         headers = ["Name", "Mobile", "Detail", "Amount/hour", "Amount deposited", "Pending"]
-        self.table = ScrollableTable(cols=6, headers=headers)
+        self.table = ScrollableTable(cols=6, headers=headers, col_widths=[90, 100, 160, 80, 80, 70])
         root.add_widget(self.table)
 
         # Add some test rows
@@ -0,0 +1,269 @@
+# local_store.py
+"""
+SQLite storage for the Kivy app, in place of rewriting ledger_data.json.
+
+`store.clients` looks like the old in-memory dict,
+{mobile: {"name": ..., "ledger": [[sr, date, detail, hour, deposit, pending], ...]}},
+but only client names are read at startup; a client's ledger is loaded the
+first time it is opened. Changes go through the store methods, which write
+just the rows involved and keep the loaded lists in step. SR is a row's
+position in its ledger, so removing an entry renumbers nothing on disk.
+
+    store = open_store(app_private_path())   # migrates ledger_data.json once
+    store.add_entry(mobile, [date, detail, hour, deposit])
+    store.remove_entry(mobile, index)
+
+Plain sqlite3, no Kivy imports: the same file can be inspected on a PC.
+"""
+import json
+import os
+import sqlite3
+from collections.abc import MutableMapping
+
+DB_NAME = "ledger_data.db"
+JSON_NAME = "ledger_data.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    mobile TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    mobile TEXT NOT NULL REFERENCES clients (mobile) ON DELETE CASCADE,
+    date TEXT NOT NULL DEFAULT '',
+    detail TEXT NOT NULL DEFAULT '',
+    hour REAL NOT NULL DEFAULT 0,
+    deposit REAL NOT NULL DEFAULT 0,
+    pending REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_entries_mobile ON entries (mobile, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _float(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _entry_values(row):
+    """
+    (date, detail, hour, deposit, pending) from a Kivy row list [sr?, date,
+    detail, hour, deposit, ...] or a JSON row dict. Pending is recomputed as
+    deposit - hour, as Page2 and the PDFs show it (older JSON files stored
+    the opposite sign).
+    """
+    if isinstance(row, dict):
+        hour, deposit = _float(row.get("amount_hour")), _float(row.get("amount_deposit"))
+        return str(row.get("date", "")), str(row.get("detail", "")), hour, deposit, deposit - hour
+    row = list(row)
+    if len(row) == 4:  # no SR yet
+        row = [""] + row
+    date = str(row[1]) if len(row) > 1 else ""
+    detail = str(row[2]) if len(row) > 2 else ""
+    hour = _float(row[3]) if len(row) > 3 else 0.0
+    deposit = _float(row[4]) if len(row) > 4 else 0.0
+    return date, detail, hour, deposit, deposit - hour
+
+
+# ---------------- Client record ----------------
+class LocalClient(dict):
+    """{"name": ..., "ledger": [...]} whose ledger is read from the store on first use."""
+
+    def __init__(self, store, mobile, name):
+        super().__init__(name=name)
+        self._store = store
+        self.mobile = mobile
+        self.entry_ids = []  # row ids, parallel to self["ledger"]
+
+    def __missing__(self, key):
+        if key != "ledger":
+            raise KeyError(key)
+        ledger, self.entry_ids = self._store._load_ledger(self.mobile)
+        self["ledger"] = ledger
+        return ledger
+
+    def get(self, key, default=None):
+        if key == "ledger":
+            return self["ledger"]
+        return super().get(key, default)
+
+    @property
+    def loaded(self):
+        return dict.__contains__(self, "ledger")
+
+
+class ClientsMapping(MutableMapping):
+    """The app's `clients` dict on top of the store: names up front, ledgers lazily, writes go to disk."""
+
+    def __init__(self, store, names):
+        self._store = store
+        self._clients = {mobile: LocalClient(store, mobile, name) for mobile, name in names}
+
+    def __getitem__(self, mobile):
+        return self._clients[mobile]
+
+    def __setitem__(self, mobile, value):
+        value = value or {}
+        self._store.save_client(mobile, value.get("name", ""), value.get("ledger"))
+
+    def __delitem__(self, mobile):
+        if mobile not in self._clients:
+            raise KeyError(mobile)
+        self._store.delete_client(mobile)
+
+    def __iter__(self):
+        return iter(self._clients)
+
+    def __len__(self):
+        return len(self._clients)
+
+
+# ---------------- Store ----------------
+class LocalStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        names = self.conn.execute("SELECT mobile, name FROM clients ORDER BY rowid").fetchall()
+        self.clients = ClientsMapping(self, names)
+
+    def close(self):
+        self.conn.close()
+
+    # -- reads --
+    def _load_ledger(self, mobile):
+        rows = self.conn.execute(
+            "SELECT id, date, detail, hour, deposit, pending FROM entries WHERE mobile = ? ORDER BY id", (mobile,)
+        ).fetchall()
+        ledger = [[str(i), date, detail, hour, deposit, pending]
+                  for i, (_, date, detail, hour, deposit, pending) in enumerate(rows, start=1)]
+        return ledger, [r[0] for r in rows]
+
+    def totals(self, mobile):
+        """(total_hour, total_deposit, total_pending) summed in SQL, without loading the ledger."""
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(hour), 0), COALESCE(SUM(deposit), 0), COALESCE(SUM(pending), 0) "
+            "FROM entries WHERE mobile = ?", (mobile,)
+        ).fetchone()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # -- clients --
+    def save_client(self, mobile, name, ledger=None):
+        """Add a client or rename one; with `ledger`, its entries are replaced by those rows."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO clients (mobile, name) VALUES (?, ?) ON CONFLICT (mobile) DO UPDATE SET name = excluded.name",
+                (mobile, name),
+            )
+            if ledger is not None:
+                self.conn.execute("DELETE FROM entries WHERE mobile = ?", (mobile,))
+                self.conn.executemany(
+                    "INSERT INTO entries (mobile, date, detail, hour, deposit, pending) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(mobile,) + _entry_values(row) for row in ledger],
+                )
+        client = self.clients._clients.get(mobile)
+        if client is None:
+            self.clients._clients[mobile] = LocalClient(self, mobile, name)
+        else:
+            client["name"] = name
+            if ledger is not None and client.loaded:
+                del client["ledger"]  # re-read on next use, with fresh ids and SR numbers
+
+    def delete_client(self, mobile):
+        with self.conn:
+            self.conn.execute("DELETE FROM entries WHERE mobile = ?", (mobile,))
+            self.conn.execute("DELETE FROM clients WHERE mobile = ?", (mobile,))
+        self.clients._clients.pop(mobile, None)
+
+    # -- entries --
+    def add_entry(self, mobile, row):
+        """Append a row ([date, detail, hour, deposit] or a full Kivy row); returns it as stored in the ledger."""
+        client = self.clients[mobile]
+        ledger = client["ledger"]  # load before inserting, or the new row would be read back and appended twice
+        values = _entry_values(row)
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO entries (mobile, date, detail, hour, deposit, pending) VALUES (?, ?, ?, ?, ?, ?)",
+                (mobile,) + values,
+            )
+        stored = [str(len(ledger) + 1)] + list(values)
+        ledger.append(stored)
+        client.entry_ids.append(cur.lastrowid)
+        return stored
+
+    def update_entry(self, mobile, index, row):
+        client = self.clients[mobile]
+        ledger = client["ledger"]
+        values = _entry_values(row)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE entries SET date = ?, detail = ?, hour = ?, deposit = ?, pending = ? WHERE id = ?",
+                values + (client.entry_ids[index],),
+            )
+        ledger[index] = [ledger[index][0]] + list(values)
+        return ledger[index]
+
+    def remove_entry(self, mobile, index):
+        """Delete the entry at `index` (0-based); returns the removed row, or None if there is none."""
+        client = self.clients[mobile]
+        ledger = client["ledger"]
+        if not 0 <= index < len(ledger):
+            return None
+        with self.conn:
+            self.conn.execute("DELETE FROM entries WHERE id = ?", (client.entry_ids[index],))
+        del client.entry_ids[index]
+        removed = ledger.pop(index)
+        for i in range(index, len(ledger)):
+            ledger[i][0] = str(i + 1)
+        return removed
+
+    # -- migration --
+    def import_json(self, json_path):
+        """
+        One-time move of a ledger_data.json book into the store (one
+        transaction). The file is kept, renamed to *.migrated. Returns the
+        number of entries imported; 0 if already done or there is no file.
+        """
+        if self.get_meta("json_migrated") or not os.path.exists(json_path):
+            return 0
+        with open(json_path, encoding="utf-8") as fh:
+            book = json.load(fh)
+        clients, entries = [], []
+        for mobile, data in (book or {}).items():
+            data = data or {}
+            clients.append((str(mobile), str(data.get("name", ""))))
+            entries.extend((str(mobile),) + _entry_values(row) for row in data.get("ledger") or [])
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO clients (mobile, name) VALUES (?, ?)", clients)
+            self.conn.executemany(
+                "INSERT INTO entries (mobile, date, detail, hour, deposit, pending) VALUES (?, ?, ?, ?, ?, ?)", entries,
+            )
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+        os.replace(json_path, json_path + ".migrated")
+        for mobile, name in clients:
+            self.clients._clients.setdefault(mobile, LocalClient(self, mobile, name))
+        return len(entries)
+
+
+def open_store(directory):
+    """The app's store in `directory` (app_private_path() on the phone), importing ledger_data.json there once."""
+    store = LocalStore(os.path.join(directory, DB_NAME))
+    store.import_json(os.path.join(directory, JSON_NAME))
+    return store
@@ -1,23 +1,167 @@
 # at the very top
 import os
+import uuid
 # ...
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///ledger.db")
-from typing import List, Tuple, Optional
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, UniqueConstraint, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from io import BytesIO
-from datetime import date as _date
+from typing import Iterator, List, Tuple, Optional
+from sqlalchemy import create_engine, Column, BigInteger, Integer, String, ForeignKey, UniqueConstraint, Boolean, Index, DateTime, Date
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy import select, insert, update, delete, func, literal, text, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, validates
+import pdf_render
+from datetime import date as _date, datetime, timedelta as _timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 # -------------------- DB setup --------------------
-DATABASE_URL = "sqlite:///ledger.db"
-engine = create_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine)
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, "") or default)
+
+
+def _normalize_url(url: str) -> str:
+    # Heroku/Render hand out postgres://, which SQLAlchemy 2 no longer accepts
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    """
+    Per-connection SQLite tuning. WAL lets readers run while a writer commits
+    (the gunicorn workers share one file); busy_timeout makes a writer wait
+    for the lock instead of failing with "database is locked".
+    """
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+    cur.execute(f"PRAGMA cache_size=-{_env_int('SQLITE_CACHE_KB', 20000)}")
+    cur.execute(f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_MB', 256) * 1024 * 1024}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+
+def make_engine(url: str):
+    """Engine for `url` with the pool/pragma settings that suit its backend."""
+    url = _normalize_url(url)
+    if url.startswith("sqlite"):
+        eng = create_engine(
+            url, echo=False, future=True,
+            connect_args={"timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000},
+        )
+        event.listen(eng, "connect", _sqlite_pragmas)
+        return eng
+    return create_engine(
+        url, echo=False, future=True,
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=True,
+    )
+
+
+engine = make_engine(DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 Base = declarative_base()
 
+# One unit-of-work session per web request (see begin_request_session); the
+# helpers below share it instead of opening a session each.
+_request_session = ContextVar("request_session", default=None)
+_query_count = ContextVar("query_count", default=None)
+
+
+@contextmanager
+def _db():
+    db = _request_session.get()
+    if db is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    try:
+        yield db
+    except Exception:
+        db.rollback()  # keep the shared session usable after a failed write
+        raise
+
+
+def begin_request_session():
+    """Open the session every helper uses until end_request_session(); also starts query counting."""
+    _request_session.set(SessionLocal())
+    _query_count.set([0])
+
+
+def end_request_session() -> int:
+    """Close the request session and return how many SQL statements it ran."""
+    db = _request_session.get()
+    if db is not None:
+        db.close()
+    _request_session.set(None)
+    counter = _query_count.get()
+    _query_count.set(None)
+    return counter[0] if counter else 0
+
+
+def queries_so_far() -> int:
+    counter = _query_count.get()
+    return counter[0] if counter else 0
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """
+    Test helper: fail if the block runs more than `max_queries` statements.
+        with logic.query_budget(3):
+            client.post(...)
+    """
+    outer = _query_count.get()
+    counter = [0]
+    _query_count.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_count.set(outer)
+        if outer is not None:
+            outer[0] += counter[0]
+    assert counter[0] <= max_queries, f"ran {counter[0]} queries, budget was {max_queries}"
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
 
 # -------------------- Models ----------------------
+CENT = Decimal("0.01")
+
+
+class Money(TypeDecorator):
+    """
+    Exact money column: stored as an integer number of minor units (cents)
+    so SUM() runs in SQL without float drift; read back as a Decimal.
+    BIGINT: a 32-bit column tops out at 21,474,836.47, below a large client total.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return (Decimal(int(value)) / 100).quantize(CENT)
+
+
 class UniqueConstraintError(Exception):
     ...
 
@@ -32,6 +176,8 @@ class User(Base):
     email_verified = Column(Boolean, default=True)  # default True so no OTP needed
     otp_code = Column(String, default="")
     otp_expires = Column(Integer, default=0)
+    clients_updated_at = Column(DateTime, nullable=True)  # bumped by any client create/update/delete
+    change_seq = Column(Integer, nullable=False, default=0)  # last change_log seq handed out for this owner
 
     clients = relationship("Client", back_populates="owner", cascade="all, delete-orphan")
 
@@ -41,43 +187,132 @@ class Client(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     mobile = Column(String, nullable=False)
+    mobile_rev = Column(String, nullable=False, default="")  # mobile digits reversed, for suffix search
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     owner = relationship("User", back_populates="clients")
     ledger_entries = relationship("LedgerEntry", back_populates="client", cascade="all, delete-orphan")
+    balance = relationship("ClientBalance", uselist=False, cascade="all, delete-orphan")
+    months = relationship("ClientMonth", cascade="all, delete-orphan")
 
     __table_args__ = (
         UniqueConstraint("owner_id", "mobile", name="uq_owner_mobile"),
+        Index("ix_clients_owner_name", "owner_id", "name"),
+        Index("ix_clients_owner_mobile_rev", "owner_id", "mobile_rev"),
     )
 
+    @validates("mobile")
+    def _set_mobile_rev(self, key, value):
+        self.mobile_rev = _reversed_digits(value)
+        return value
+
 
 class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
     id = Column(Integer, primary_key=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
-    date = Column(String, default="")   # YYYY-MM-DD
+    date = Column("entry_date", Date, nullable=False, default=_date.today)
     details = Column(String, default="")
-    amount_per_hour = Column(Float, default=0.0)
-    deposit = Column(Float, default=0.0)
-    pending = Column(Float, default=0.0)  # deposit - amount_per_hour
+    amount_per_hour = Column("amount_per_hour_cents", Money, nullable=False, default=0)
+    deposit = Column("deposit_cents", Money, nullable=False, default=0)
+    pending = Column("pending_cents", Money, nullable=False, default=0)  # deposit - amount_per_hour
 
     client = relationship("Client", back_populates="ledger_entries")
 
+    # Keep in sync with migrations.py (existing databases get these from there)
+    __table_args__ = (
+        Index("ix_ledger_entries_client_id", "client_id", "id"),
+        Index("ix_ledger_entries_client_date", "client_id", "entry_date", "id"),
+    )
+
+
+class ClientBalance(Base):
+    """
+    Per-client running totals, updated by the ledger helpers in the same
+    transaction as the entry change. Rebuild with `recompute_client_balances`.
+    """
+    __tablename__ = "client_balances"
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    amount_per_hour = Column("amount_per_hour_cents", Money, nullable=False, default=0)
+    deposit = Column("deposit_cents", Money, nullable=False, default=0)
+    pending = Column("pending_cents", Money, nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ClientMonth(Base):
+    """
+    Per-client monthly rollup: totals of the entries dated in `month` (its
+    first day) and the client's balance at the end of it. Kept in step with
+    the entries like client_balances; rebuild with `rebuild_monthly_rollups`.
+    """
+    __tablename__ = "client_months"
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    amount_per_hour = Column("amount_per_hour_cents", Money, nullable=False, default=0)
+    deposit = Column("deposit_cents", Money, nullable=False, default=0)
+    pending = Column("pending_cents", Money, nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    closing = Column("closing_cents", Money, nullable=False, default=0)
+
+
+class ChangeLog(Base):
+    """
+    Append-only journal of client and entry changes, numbered per owner.
+    A row only names what changed; sync reads the current state (or its
+    absence, for deletes) when it is asked for.
+    """
+    __tablename__ = "change_log"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # "client" | "entry"
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SyncOp(Base):
+    """A mutation sent by a sync client, recorded with its effect so a retried op_id is not applied twice."""
+    __tablename__ = "sync_ops"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    op_id = Column(String(64), primary_key=True)
+    entity_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class DuplicateOpError(Exception):
+    """The op_id was already applied (by a concurrent request); nothing was changed."""
+
+
+class ExportJob(Base):
+    """A PDF export rendered in the background; the file itself lives in the PDF cache under `cache_key`."""
+    __tablename__ = "export_jobs"
+    id = Column(String(32), primary_key=True)  # random hex, used in URLs
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # "ledger" | "clients"
+    client_id = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued | running | done | failed
+    cache_key = Column(String, nullable=True)
+    download_name = Column(String, nullable=False, default="export.pdf")
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_export_jobs_owner_created", "owner_id", "created_at"),)
+
 
 def init_db():
+    """
+    Create missing tables on a fresh database. Changes to tables that already
+    exist (new indexes/columns) are applied by `migrations.upgrade()`, which
+    runs once per deploy: `flask --app app db-upgrade`.
+    """
     Base.metadata.create_all(engine)
 
 
 # -------------------- Auth helpers ----------------
 def create_user(name: str, phone: str, email: str, password_hash: str, auto_verify: bool = True) -> User:
-    db = SessionLocal()
-    try:
-        # uniqueness check
-        if db.query(User).filter((User.email == email) | (User.phone == phone)).first():
-            if db.query(User).filter(User.email == email).first():
-                raise UniqueConstraintError("Email already registered.")
-            else:
-                raise UniqueConstraintError("Phone already registered.")
+    with _db() as db:
         user = User(
             name=name,
             phone=phone,
@@ -88,27 +323,35 @@ def create_user(name: str, phone: str, email: str, password_hash: str, auto_veri
             otp_expires=0,
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # the unique constraints did the check; find out which one for the message
+            db.rollback()
+            if db.query(User.id).filter(User.email == email).first():
+                raise UniqueConstraintError("Email already registered.")
+            raise UniqueConstraintError("Phone already registered.")
         return user
-    finally:
-        db.close()
 
 
 def get_user_by_email(email: str) -> Optional[User]:
-    db = SessionLocal()
-    try:
+    with _db() as db:
         return db.query(User).filter(User.email == email).first()
-    finally:
-        db.close()
 
 
 def get_user_by_id(uid: int) -> Optional[User]:
-    db = SessionLocal()
-    try:
-        return db.query(User).filter(User.id == uid).first()
-    finally:
-        db.close()
+    with _db() as db:
+        return db.get(User, uid)
+
+
+def update_password_hash(uid: int, password_hash: str) -> bool:
+    with _db() as db:
+        user = db.get(User, uid)
+        if not user:
+            return False
+        user.password_hash = password_hash
+        db.commit()
+        return True
 
 
 def require_auth(session):
@@ -124,96 +367,237 @@ def require_auth(session):
 
 
 # -------------------- Clients ---------------------
-def create_client(owner_id: int, name: str, mobile: str) -> Client:
-    db = SessionLocal()
-    try:
-        if db.query(Client).filter(Client.owner_id == owner_id, Client.mobile == mobile).first():
-            raise UniqueConstraintError("Client mobile must be unique.")
-        c = Client(name=name, mobile=mobile, owner_id=owner_id)
+def create_client(owner_id: int, name: str, mobile: str, op_id: Optional[str] = None) -> Client:
+    with _db() as db:
+        c = Client(name=name, mobile=mobile, owner_id=owner_id, balance=ClientBalance())
         db.add(c)
-        db.commit()
-        db.refresh(c)
+        try:
+            db.flush()
+            _touch_owner(db, owner_id)
+            _journal(db, owner_id, "client", [c.id], op_id=op_id)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise UniqueConstraintError("Client mobile must be unique.")
         return c
-    finally:
-        db.close()
 
 
-def update_client(owner_id: int, client_id: int, name: str, mobile: str) -> bool:
-    db = SessionLocal()
-    try:
-        c = db.query(Client).filter(Client.owner_id == owner_id, Client.id == client_id).first()
-        if not c:
+def update_client(owner_id: int, client_id: int, name: str, mobile: str, op_id: Optional[str] = None) -> bool:
+    with _db() as db:
+        c = db.get(Client, client_id)
+        if not c or c.owner_id != owner_id:
             return False
         if mobile and mobile != c.mobile:
-            if db.query(Client).filter(Client.owner_id == owner_id, Client.mobile == mobile).first():
-                raise UniqueConstraintError("Client mobile must be unique.")
             c.mobile = mobile
-        if name:
+        if name and name != c.name:
             c.name = name
-        db.commit()
+        try:
+            # only a real change is journaled and bumps the versions (a same-value save is not)
+            if db.is_modified(c):
+                db.flush()
+                _touch_owner(db, owner_id)
+                _touch_client(db, client_id)  # name/mobile are printed on the ledger PDF
+                _journal(db, owner_id, "client", [client_id], op_id=op_id)
+            elif op_id:
+                _journal(db, owner_id, "client", [], op_id=op_id, entity_id=client_id)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise UniqueConstraintError("Client mobile must be unique.")
         return True
-    finally:
-        db.close()
 
 
-def delete_client(owner_id: int, client_id: int) -> bool:
-    db = SessionLocal()
-    try:
-        c = db.query(Client).filter(Client.owner_id == owner_id, Client.id == client_id).first()
-        if not c:
+def delete_client(owner_id: int, client_id: int, op_id: Optional[str] = None) -> bool:
+    with _db() as db:
+        c = db.get(Client, client_id)
+        if not c or c.owner_id != owner_id:
             return False
         db.delete(c)
+        _touch_owner(db, owner_id)
+        # the client's entries go with it; sync clients drop them on the client's delete
+        _journal(db, owner_id, "client", [client_id], deleted=True, op_id=op_id)
         db.commit()
         return True
-    finally:
-        db.close()
 
 
-def search_clients(owner_id: int, query: str) -> List[Client]:
-    db = SessionLocal()
-    try:
-        if not query:
-            return []
-        q = f"%{query}%"
-        return (
-            db.query(Client)
-            .filter(Client.owner_id == owner_id)
-            .filter((Client.name.ilike(q)) | (Client.mobile.ilike(q)))
-            .order_by(Client.name.asc())
-            .all()
-        )
-    finally:
-        db.close()
+def get_owner_clients_version(owner_id: int) -> Optional[datetime]:
+    """When the owner's client list last changed (None: no such user). One primary-key read."""
+    with _db() as db:
+        user = db.get(User, owner_id)
+        if user is None:
+            return None
+        if user.clients_updated_at is None:
+            # not changed since versions were tracked: start the clock now
+            _touch_owner(db, owner_id)
+            db.commit()
+        return user.clients_updated_at
+
+
+def _touch_owner(db, owner_id: int) -> None:
+    db.execute(update(User).where(User.id == owner_id).values(clients_updated_at=datetime.utcnow()))
+
+
+def _reversed_digits(value: str) -> str:
+    return "".join(ch for ch in (value or "") if ch.isdigit())[::-1]
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest digit string above every string starting with `prefix` (None if unbounded)."""
+    digits = prefix.rstrip("9")
+    if not digits:
+        return None
+    return digits[:-1] + str(int(digits[-1]) + 1)
+
+
+_fts_state = {}
+
+
+def _client_fts_enabled(db) -> bool:
+    """
+    True when migrations built the SQLite FTS5 trigram index (clients_fts).
+    Only a yes is cached: a worker that searched before db-upgrade ran picks
+    the index up on a later search instead of keeping the fallback.
+    """
+    if _fts_state.get("enabled"):
+        return True
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    enabled = bool(db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'")).first())
+    if enabled:
+        _fts_state["enabled"] = True
+    return enabled
+
+
+def search_clients(owner_id: int, query: str, limit: Optional[int] = None) -> List[Client]:
+    """
+    Clients whose name or mobile contains `query`. Digit queries also match
+    the end of the mobile (people type the last 4 digits); those hits come
+    first. Served by indexes: (owner_id, mobile_rev) for suffixes, FTS5
+    trigram on SQLite and pg_trgm on Postgres for substrings.
+    """
+    query = (query or "").strip()
+    if not query:
+        return []
+    with _db() as db:
+        found = []
+
+        compact = query.replace(" ", "").replace("-", "").lstrip("+")
+        if compact.isdigit():
+            digits = compact[::-1]
+            upper = _prefix_upper_bound(digits)
+            q = db.query(Client).filter(Client.owner_id == owner_id, Client.mobile_rev >= digits)
+            if upper is not None:
+                q = q.filter(Client.mobile_rev < upper)
+            found.extend(q.order_by(Client.mobile_rev.asc()).limit(limit).all())
+
+        q = db.query(Client).filter(Client.owner_id == owner_id)
+        if _client_fts_enabled(db) and len(query) >= 3:
+            # trigram FTS matches substrings case-insensitively; quote to disable FTS syntax
+            match = '"' + query.replace('"', '""') + '"'
+            hits = text("SELECT rowid FROM clients_fts WHERE clients_fts MATCH :match").bindparams(match=match)
+            q = q.filter(Client.id.in_(hits.columns(Client.id)))
+        else:
+            pattern = f"%{query}%"
+            q = q.filter((Client.name.ilike(pattern)) | (Client.mobile.ilike(pattern)))
+        seen = {c.id for c in found}
+        for c in q.order_by(Client.name.asc()).limit(limit).all():
+            if c.id not in seen:
+                found.append(c)
+        return found[:limit] if limit else found
 
 
 def get_all_clients(owner_id: int) -> List[Client]:
-    db = SessionLocal()
-    try:
+    with _db() as db:
         return db.query(Client).filter(Client.owner_id == owner_id).order_by(Client.name.asc()).all()
-    finally:
-        db.close()
+
+
+def get_clients_page(owner_id: int, after: Optional[Tuple[str, int]] = None, limit: int = 100) -> List[tuple]:
+    """
+    Up to `limit` clients as (id, name, mobile) rows in name order, seeking
+    past `after` = (name, id) of the last row already sent.
+    """
+    with _db() as db:
+        q = db.query(Client.id, Client.name, Client.mobile).filter(Client.owner_id == owner_id)
+        if after is not None:
+            name, client_id = after
+            q = q.filter((Client.name > name) | ((Client.name == name) & (Client.id > client_id)))
+        return [tuple(r) for r in q.order_by(Client.name.asc(), Client.id.asc()).limit(limit)]
 
 
 def get_client(owner_id: int, client_id: int) -> Optional[Client]:
-    db = SessionLocal()
-    try:
-        return db.query(Client).filter(Client.owner_id == owner_id, Client.id == client_id).first()
-    finally:
-        db.close()
+    with _db() as db:
+        c = db.get(Client, client_id)
+        return c if c is not None and c.owner_id == owner_id else None
 
 
 # -------------------- Ledger ----------------------
-def _normalize_date(date_str: str) -> str:
-    """Return YYYY-MM-DD; fallback to today."""
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%Y", "%d.%m.%Y")
+
+
+def parse_date(value) -> Optional[_date]:
+    """
+    A date from a date/datetime or a YYYY-MM-DD / DD-MM-YYYY string (also
+    with / or . separators, time part ignored); None if unrecognised.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, _date):
+        return value
+    raw = str(value or "").strip().split(" ")[0].split("T")[0]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _normalize_date(value) -> _date:
+    """Entry date from form/API input; fallback to today."""
+    return parse_date(value) or _date.today()
+
+
+def _looks_like_date(value) -> bool:
+    return isinstance(value, _date) or (isinstance(value, str) and parse_date(value) is not None)
+
+
+# Ledgers are kept in (date, id) order; pages seek on that key, which the
+# (client_id, entry_date, id) index serves directly.
+def entry_key(entry) -> Tuple[_date, int]:
+    return entry.date, entry.id
+
+
+def _key_after(key: Tuple[_date, int]):
+    d, entry_id = key
+    return (LedgerEntry.date > d) | ((LedgerEntry.date == d) & (LedgerEntry.id > entry_id))
+
+
+def _key_before(key: Tuple[_date, int]):
+    d, entry_id = key
+    return (LedgerEntry.date < d) | ((LedgerEntry.date == d) & (LedgerEntry.id < entry_id))
+
+
+def _in_period(q, date_from: Optional[_date], date_to: Optional[_date]):
+    """Limit an entries query/select to date_from..date_to (inclusive; either may be None)."""
+    if date_from is not None:
+        q = q.where(LedgerEntry.date >= date_from)
+    if date_to is not None:
+        q = q.where(LedgerEntry.date <= date_to)
+    return q
+
+
+def _parse_amount(value) -> Decimal:
+    """Parse a form/API amount into a Decimal rounded to cents."""
     try:
-        if date_str and len(date_str.split("-")[0]) == 4:
-            return date_str
-        return _date.today().isoformat()
-    except Exception:
-        return _date.today().isoformat()
+        amount = Decimal(str(value if value not in (None, "") else 0).strip())
+    except InvalidOperation:
+        raise ValueError("Amounts must be numbers.")
+    if not amount.is_finite():
+        raise ValueError("Amounts must be numbers.")
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
 
 
-def add_ledger_entry(client_id: int, *args) -> LedgerEntry:
+def add_ledger_entry(client_id: int, *args, op_id: Optional[str] = None) -> LedgerEntry:
     """
     Compatibility:
       NEW form: add_ledger_entry(client_id, date_str, details, amount_per_hour, deposit)
@@ -222,8 +606,7 @@ def add_ledger_entry(client_id: int, *args) -> LedgerEntry:
     # Unpack flexible args
     if len(args) == 4:
         # Could be (date, details, aph, dep) OR (details, aph, dep, pending) — detect by date pattern
-        maybe_date = args[0]
-        if isinstance(maybe_date, str) and len(maybe_date) >= 8 and maybe_date[:4].isdigit() and "-" in maybe_date:
+        if _looks_like_date(args[0]):
             date_str, details, amount_per_hour, deposit = args  # NEW
         else:
             # OLD (no date sent)
@@ -234,61 +617,154 @@ def add_ledger_entry(client_id: int, *args) -> LedgerEntry:
     else:
         raise TypeError("add_ledger_entry expects 4 or 5 arguments after client_id")
 
-    try:
-        aph = float(amount_per_hour or 0)
-        dep = float(deposit or 0)
-    except ValueError:
-        raise ValueError("Amounts must be numbers.")
+    aph = _parse_amount(amount_per_hour)
+    dep = _parse_amount(deposit)
 
     pend = dep - aph
-    db = SessionLocal()
-    try:
+    with _db() as db:
         entry = LedgerEntry(
             client_id=client_id,
-            date=_normalize_date(date_str or ""),
+            date=_normalize_date(date_str),
             details=details or "",
             amount_per_hour=aph,
             deposit=dep,
             pending=pend,
         )
         db.add(entry)
+        db.flush()
+        _apply_balance_delta(db, client_id, aph, dep, pend, 1)
+        _apply_month_delta(db, client_id, entry.date, aph, dep, pend, 1)
+        _journal(db, _owner_of(db, client_id), "entry", [entry.id], op_id=op_id)
         db.commit()
-        db.refresh(entry)
         return entry
-    finally:
-        db.close()
 
 
-def get_ledger_entries(client_id: int) -> List[LedgerEntry]:
+def get_ledger_entries(client_id: int, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> List[LedgerEntry]:
+    with _db() as db:
+        q = db.query(LedgerEntry).filter(LedgerEntry.client_id == client_id)
+        return _in_period(q, date_from, date_to).order_by(LedgerEntry.date, LedgerEntry.id).all()
+
+
+def iter_ledger_rows(client_id: int, batch_size: int = 2000, date_from: Optional[_date] = None,
+                     date_to: Optional[_date] = None):
+    """
+    Yield a client's entries as light rows (date, details, amount_per_hour,
+    deposit, pending) in ledger order, fetched in batches from a server-side
+    cursor. Uses its own session so it can feed a streamed response.
+    """
+    q = _in_period(
+        select(LedgerEntry.date, LedgerEntry.details, LedgerEntry.amount_per_hour, LedgerEntry.deposit, LedgerEntry.pending)
+        .where(LedgerEntry.client_id == client_id),
+        date_from, date_to,
+    ).order_by(LedgerEntry.date, LedgerEntry.id).execution_options(yield_per=batch_size)
     db = SessionLocal()
     try:
-        return (
-            db.query(LedgerEntry)
-            .filter(LedgerEntry.client_id == client_id)
-            .order_by(LedgerEntry.id.asc())
-            .all()
-        )
+        yield from db.execute(q)
     finally:
         db.close()
 
 
+LEDGER_PAGE_SIZE = 100
+
+
+def get_ledger_page(
+    client_id: int,
+    after: Optional[Tuple[_date, int]] = None,
+    before: Optional[Tuple[_date, int]] = None,
+    last: bool = False,
+    opening: Optional[Decimal] = None,
+    start: Optional[int] = None,
+    limit: int = LEDGER_PAGE_SIZE,
+    date_from: Optional[_date] = None,
+    date_to: Optional[_date] = None,
+) -> dict:
+    """
+    One page of a client's entries in (date, id) order, seeking on the
+    (client_id, entry_date, id) index so the cost does not grow with the
+    length of the ledger. Keys are (date, id) as returned by entry_key.
+
+      first page: no cursor          next page: after=<key of last row shown>
+      last page:  last=True          previous page: before=<key of first row shown>
+
+    date_from/date_to (inclusive) restrict the rows to a period; balances
+    and serial numbers still count everything before it.
+
+    `opening`/`start` are the opening balance and serial number carried over
+    from the page the caller came from (for before: the values of that
+    page). When omitted they come from the monthly rollups plus at most one
+    month of entries (_entries_before).
+
+    Returns {"rows": [(entry, running_balance)], "opening", "closing",
+    "start", "first_key", "last_key", "has_prev", "has_next"}.
+    """
+    with _db() as db:
+        q = _in_period(db.query(LedgerEntry).filter(LedgerEntry.client_id == client_id), date_from, date_to)
+        backward = last or before is not None
+        if backward:
+            page_q = q.filter(_key_before(before)) if before is not None else q
+            entries = page_q.order_by(LedgerEntry.date.desc(), LedgerEntry.id.desc()).limit(limit + 1).all()
+            has_prev = len(entries) > limit
+            entries = entries[:limit][::-1]
+            has_next = not last and db.query(q.filter(~_key_before(before)).exists()).scalar()
+        else:
+            page_q = q.filter(_key_after(after)) if after is not None else q
+            entries = page_q.order_by(LedgerEntry.date.asc(), LedgerEntry.id.asc()).limit(limit + 1).all()
+            has_next = len(entries) > limit
+            entries = entries[:limit]
+            has_prev = after is not None
+
+        page_sum = sum((e.pending or 0 for e in entries), Decimal(0))
+        if backward and opening is not None and start is not None:
+            opening, start = opening - page_sum, start - len(entries)
+        elif backward:
+            opening = start = None
+
+        if entries and (opening is None or start is None):
+            opening, earlier_count = _entries_before(db, client_id, entry_key(entries[0]))
+            start = earlier_count + 1
+        opening = Decimal(0) if opening is None else opening
+        start = 1 if start is None else start
+
+        rows, running = [], opening
+        for e in entries:
+            running += e.pending or 0
+            rows.append((e, running))
+        return {
+            "rows": rows,
+            "opening": opening,
+            "closing": running,
+            "start": start,
+            "first_key": entry_key(entries[0]) if entries else None,
+            "last_key": entry_key(entries[-1]) if entries else None,
+            "has_prev": has_prev and bool(entries),
+            "has_next": has_next and bool(entries),
+        }
+
+
 def get_ledger_entry(entry_id: int) -> Optional[LedgerEntry]:
-    db = SessionLocal()
-    try:
-        return db.query(LedgerEntry).filter(LedgerEntry.id == entry_id).first()
-    finally:
-        db.close()
+    with _db() as db:
+        return db.get(LedgerEntry, entry_id)
 
 
-def update_ledger_entry(entry_id: int, *args) -> bool:
+def get_client_entry(owner_id: int, client_id: int, entry_id: int) -> Optional[LedgerEntry]:
+    """The entry, only if it belongs to that client of that owner (one query)."""
+    with _db() as db:
+        return (
+            db.query(LedgerEntry)
+            .join(Client, Client.id == LedgerEntry.client_id)
+            .filter(LedgerEntry.id == entry_id, LedgerEntry.client_id == client_id, Client.owner_id == owner_id)
+            .first()
+        )
+
+
+def update_ledger_entry(entry_id: int, *args, op_id: Optional[str] = None) -> bool:
     """
     Compatibility:
       NEW: update_ledger_entry(entry_id, date_str, details, amount_per_hour, deposit)
       OLD: update_ledger_entry(entry_id, details, amount_per_hour, deposit, pending)
     """
     if len(args) == 4:
-        maybe_date = args[0]
-        if isinstance(maybe_date, str) and len(maybe_date) >= 8 and maybe_date[:4].isdigit() and "-" in maybe_date:
+        if _looks_like_date(args[0]):
             date_str, details, amount_per_hour, deposit = args
         else:
             details, amount_per_hour, deposit, _pending = args
@@ -298,136 +774,643 @@ def update_ledger_entry(entry_id: int, *args) -> bool:
     else:
         raise TypeError("update_ledger_entry expects 4 or 5 arguments after entry_id")
 
-    try:
-        aph = float(amount_per_hour or 0)
-        dep = float(deposit or 0)
-    except ValueError:
-        raise ValueError("Amounts must be numbers.")
+    aph = _parse_amount(amount_per_hour)
+    dep = _parse_amount(deposit)
     pend = dep - aph
 
-    db = SessionLocal()
-    try:
-        entry = db.query(LedgerEntry).filter(LedgerEntry.id == entry_id).first()
+    with _db() as db:
+        entry = db.get(LedgerEntry, entry_id)
         if not entry:
             return False
-        entry.date = _normalize_date(date_str or entry.date or "")
+        old_aph, old_dep, old_pend, old_date = entry.amount_per_hour or 0, entry.deposit or 0, entry.pending or 0, entry.date
+        entry.date = _normalize_date(date_str or entry.date)
         entry.details = details or ""
         entry.amount_per_hour = aph
         entry.deposit = dep
         entry.pending = pend
+        db.flush()
+        _apply_balance_delta(db, entry.client_id, aph - old_aph, dep - old_dep, pend - old_pend, 0)
+        _apply_month_delta(db, entry.client_id, old_date, -old_aph, -old_dep, -old_pend, -1)
+        _apply_month_delta(db, entry.client_id, entry.date, aph, dep, pend, 1)
+        _journal(db, _owner_of(db, entry.client_id), "entry", [entry_id], op_id=op_id)
         db.commit()
         return True
-    finally:
-        db.close()
 
 
-def delete_ledger_entry(entry_id: int) -> bool:
-    db = SessionLocal()
-    try:
-        entry = db.query(LedgerEntry).filter(LedgerEntry.id == entry_id).first()
+def delete_ledger_entry(entry_id: int, op_id: Optional[str] = None) -> bool:
+    with _db() as db:
+        entry = db.get(LedgerEntry, entry_id)
         if not entry:
             return False
         db.delete(entry)
+        db.flush()
+        _apply_balance_delta(
+            db, entry.client_id,
+            -(entry.amount_per_hour or 0), -(entry.deposit or 0), -(entry.pending or 0), -1,
+        )
+        _apply_month_delta(
+            db, entry.client_id, entry.date,
+            -(entry.amount_per_hour or 0), -(entry.deposit or 0), -(entry.pending or 0), -1,
+        )
+        _journal(db, _owner_of(db, entry.client_id), "entry", [entry_id], deleted=True, op_id=op_id)
         db.commit()
         return True
-    finally:
-        db.close()
+
+
+def add_ledger_entries_bulk(client_id: int, rows: List[dict]) -> int:
+    """
+    Insert many entries in one transaction (one batched flush plus one
+    balance update and one batch of journal rows). Rows are dicts with date, details, amount_per_hour and
+    deposit that the caller already validated (see ledger_io).
+    """
+    if not rows:
+        return 0
+    payload, aph, dep = [], Decimal(0), Decimal(0)
+    months = {}  # first of month -> [aph, dep, count]
+    for r in rows:
+        entry_date = _normalize_date(r["date"])
+        payload.append({
+            "client_id": client_id,
+            "date": entry_date,
+            "details": r["details"],
+            "amount_per_hour": r["amount_per_hour"],
+            "deposit": r["deposit"],
+            "pending": r["deposit"] - r["amount_per_hour"],
+        })
+        aph += r["amount_per_hour"]
+        dep += r["deposit"]
+        m = months.setdefault(entry_date.replace(day=1), [Decimal(0), Decimal(0), 0])
+        m[0] += r["amount_per_hour"]
+        m[1] += r["deposit"]
+        m[2] += 1
+    with _db() as db:
+        # a flush hands back the new ids on any SQLite (RETURNING where available, else lastrowid)
+        entries = [LedgerEntry(**p) for p in payload]
+        db.add_all(entries)
+        db.flush()
+        _journal(db, _owner_of(db, client_id), "entry", [e.id for e in entries])
+        _apply_balance_delta(db, client_id, aph, dep, dep - aph, len(payload))
+        for month, (m_aph, m_dep, m_count) in sorted(months.items()):
+            _apply_month_delta(db, client_id, month, m_aph, m_dep, m_dep - m_aph, m_count)
+        db.commit()
+    return len(payload)
 
 
 def compute_totals(entries: List[LedgerEntry]) -> dict:
-    total_aph = sum((e.amount_per_hour or 0) for e in entries)
-    total_dep = sum((e.deposit or 0) for e in entries)
-    total_pen = total_dep - total_aph
+    """Totals of an already loaded list; prefer get_client_totals for a whole ledger."""
+    total_aph = sum((e.amount_per_hour or 0 for e in entries), Decimal(0))
+    total_dep = sum((e.deposit or 0 for e in entries), Decimal(0))
+    return {
+        "amount_per_hour": total_aph.quantize(CENT),
+        "deposit": total_dep.quantize(CENT),
+        "pending": (total_dep - total_aph).quantize(CENT),
+    }
+
+
+# -------------------- Balances --------------------
+def _apply_balance_delta(db, client_id: int, aph: Decimal, dep: Decimal, pend: Decimal, count: int) -> None:
+    """Shift a client's running totals inside the caller's transaction."""
+    updated = db.execute(
+        update(ClientBalance)
+        .where(ClientBalance.client_id == client_id)
+        .values(
+            amount_per_hour=ClientBalance.amount_per_hour + aph,
+            deposit=ClientBalance.deposit + dep,
+            pending=ClientBalance.pending + pend,
+            entry_count=ClientBalance.entry_count + count,
+            updated_at=datetime.utcnow(),
+        )
+    ).rowcount
+    if not updated:
+        # No row yet (e.g. written before client_balances existed): rebuild it
+        # from the entries, which already include the caller's flushed change.
+        _recompute_balances(db, [client_id])
+
+
+def _touch_client(db, client_id: int) -> None:
+    """Mark a client's ledger as changed without changing its totals."""
+    db.execute(update(ClientBalance).where(ClientBalance.client_id == client_id).values(updated_at=datetime.utcnow()))
+
+
+def _apply_month_delta(db, client_id: int, day: _date, aph: Decimal, dep: Decimal, pend: Decimal, count: int) -> None:
+    """Add an entry change to the client's rollup for the month of `day` and to every later closing balance."""
+    month = day.replace(day=1)
+    updated = db.execute(
+        update(ClientMonth)
+        .where(ClientMonth.client_id == client_id, ClientMonth.month == month)
+        .values(
+            amount_per_hour=ClientMonth.amount_per_hour + aph,
+            deposit=ClientMonth.deposit + dep,
+            pending=ClientMonth.pending + pend,
+            entry_count=ClientMonth.entry_count + count,
+        )
+    ).rowcount
+    if not updated:
+        # first entry of that month: open it at the previous month's closing balance
+        opening = db.execute(
+            select(ClientMonth.closing)
+            .where(ClientMonth.client_id == client_id, ClientMonth.month < month)
+            .order_by(ClientMonth.month.desc())
+            .limit(1)
+        ).scalar()
+        db.execute(insert(ClientMonth).values(
+            client_id=client_id, month=month, amount_per_hour=aph, deposit=dep, pending=pend, entry_count=count,
+            closing=opening or 0,
+        ))
+    if pend:
+        db.execute(
+            update(ClientMonth)
+            .where(ClientMonth.client_id == client_id, ClientMonth.month >= month)
+            .values(closing=ClientMonth.closing + pend)
+        )
+    if count < 0:
+        # the month's last entry moved out or was deleted: a rebuild would not have the row either
+        db.execute(
+            delete(ClientMonth)
+            .where(ClientMonth.client_id == client_id, ClientMonth.month == month, ClientMonth.entry_count <= 0)
+        )
+
+
+def _rebuild_months(db, client_ids=None) -> int:
+    """Rewrite client_months from ledger_entries in one ordered pass; returns the number of month rows."""
+    q = select(
+        LedgerEntry.client_id, LedgerEntry.date, LedgerEntry.amount_per_hour, LedgerEntry.deposit, LedgerEntry.pending,
+    ).order_by(LedgerEntry.client_id, LedgerEntry.date)
+    wipe = delete(ClientMonth)
+    if client_ids is not None:
+        q = q.where(LedgerEntry.client_id.in_(client_ids))
+        wipe = wipe.where(ClientMonth.client_id.in_(client_ids))
+    db.execute(wipe)
+    rows, current, closing, written = [], None, Decimal(0), 0
+    for client_id, day, aph, dep, pend in db.execute(q.execution_options(yield_per=5000)):
+        month = day.replace(day=1)
+        if current is None or current["client_id"] != client_id or current["month"] != month:
+            if current is None or current["client_id"] != client_id:
+                closing = Decimal(0)
+            # keyed by column name: the insert below is Core, so it runs on a migration's Connection too
+            current = {"client_id": client_id, "month": month, "amount_per_hour_cents": Decimal(0),
+                       "deposit_cents": Decimal(0), "pending_cents": Decimal(0), "entry_count": 0,
+                       "closing_cents": closing}
+            rows.append(current)
+        current["amount_per_hour_cents"] += aph or 0
+        current["deposit_cents"] += dep or 0
+        current["pending_cents"] += pend or 0
+        current["entry_count"] += 1
+        closing += pend or 0
+        current["closing_cents"] = closing
+    for i in range(0, len(rows), 5000):
+        db.execute(ClientMonth.__table__.insert(), rows[i:i + 5000])
+        written += len(rows[i:i + 5000])
+    return written
+
+
+def rebuild_monthly_rollups(client_ids: Optional[List[int]] = None) -> int:
+    with _db() as db:
+        n = _rebuild_months(db, client_ids)
+        db.commit()
+        return n
+
+
+def _entries_before(db, client_id: int, key: Tuple[_date, int]) -> Tuple[Decimal, int]:
+    """
+    (sum of pending, count) of a client's entries before ledger key `key`:
+    whole months from client_months, the rest of key's own month from the
+    entries index. Costs at most one month of entries, whatever the history.
+    """
+    month = key[0].replace(day=1)
+    whole = db.query(
+        func.coalesce(func.sum(ClientMonth.pending), 0), func.coalesce(func.sum(ClientMonth.entry_count), 0)
+    ).filter(ClientMonth.client_id == client_id, ClientMonth.month < month).one()
+    part = db.query(
+        func.coalesce(func.sum(LedgerEntry.pending), 0), func.count(LedgerEntry.id)
+    ).filter(LedgerEntry.client_id == client_id, LedgerEntry.date >= month, _key_before(key)).one()
+    return whole[0] + part[0], int(whole[1]) + part[1]
+
+
+def _entry_sums(client_ids=None):
+    q = select(
+        LedgerEntry.client_id.label("client_id"),
+        func.coalesce(func.sum(LedgerEntry.amount_per_hour), 0).label("amount_per_hour"),
+        func.coalesce(func.sum(LedgerEntry.deposit), 0).label("deposit"),
+        func.coalesce(func.sum(LedgerEntry.pending), 0).label("pending"),
+        func.count(LedgerEntry.id).label("entry_count"),
+    ).group_by(LedgerEntry.client_id)
+    if client_ids is not None:
+        q = q.where(LedgerEntry.client_id.in_(client_ids))
+    return q.subquery()
+
+
+def _recompute_balances(db, client_ids=None) -> int:
+    """Rewrite client_balances from ledger_entries (all clients when client_ids is None)."""
+    sums = _entry_sums(client_ids)
+    rows = (
+        select(
+            Client.id,
+            func.coalesce(sums.c.amount_per_hour, 0),
+            func.coalesce(sums.c.deposit, 0),
+            func.coalesce(sums.c.pending, 0),
+            func.coalesce(sums.c.entry_count, 0),
+            literal(datetime.utcnow(), DateTime),
+        )
+        .select_from(Client)
+        .outerjoin(sums, sums.c.client_id == Client.id)
+    )
+    wipe = delete(ClientBalance)
+    if client_ids is not None:
+        rows = rows.where(Client.id.in_(client_ids))
+        wipe = wipe.where(ClientBalance.client_id.in_(client_ids))
+    db.execute(wipe)
+    return db.execute(
+        insert(ClientBalance).from_select(
+            [
+                ClientBalance.client_id, ClientBalance.amount_per_hour, ClientBalance.deposit,
+                ClientBalance.pending, ClientBalance.entry_count, ClientBalance.updated_at,
+            ],
+            rows,
+        )
+    ).rowcount
+
+
+def recompute_client_balances(client_ids: Optional[List[int]] = None) -> int:
+    with _db() as db:
+        n = _recompute_balances(db, client_ids)
+        db.commit()
+        return n
+
+
+def verify_client_balances() -> List[dict]:
+    """Return one dict per client whose stored totals differ from its entries."""
+    sums = _entry_sums()
+    with _db() as db:
+        rows = db.execute(
+            select(
+                Client.id,
+                ClientBalance.amount_per_hour, ClientBalance.deposit, ClientBalance.pending, ClientBalance.entry_count,
+                func.coalesce(sums.c.amount_per_hour, 0), func.coalesce(sums.c.deposit, 0),
+                func.coalesce(sums.c.pending, 0), func.coalesce(sums.c.entry_count, 0),
+            )
+            .select_from(Client)
+            .outerjoin(ClientBalance, ClientBalance.client_id == Client.id)
+            .outerjoin(sums, sums.c.client_id == Client.id)
+        ).all()
+
+    drift = []
+    for cid, s_aph, s_dep, s_pen, s_n, aph, dep, pen, n in rows:
+        stored = None if s_n is None else (s_aph, s_dep, s_pen, s_n)
+        actual = (aph, dep, pen, n)
+        if stored != actual:
+            drift.append({"client_id": cid, "stored": stored, "actual": actual})
+    return drift
+
+
+def get_client_totals(client_id: int) -> dict:
+    """Totals for one client from client_balances (same shape as compute_totals)."""
+    with _db() as db:
+        bal = db.get(ClientBalance, client_id)
+        if bal is None:
+            _recompute_balances(db, [client_id])
+            db.commit()
+            bal = db.get(ClientBalance, client_id)
+        return {
+            "amount_per_hour": bal.amount_per_hour,
+            "deposit": bal.deposit,
+            "pending": bal.pending,
+            "entry_count": bal.entry_count or 0,
+            "updated_at": bal.updated_at,
+        }
+
+
+def get_period_totals(client_id: int, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> dict:
+    """
+    get_client_totals for the entries dated date_from..date_to, summed over an
+    index range scan, plus the "opening" balance brought into the period
+    (from the monthly rollups). `updated_at` is the client's stamp, so it
+    still works as a cache version.
+    """
+    if date_from is None and date_to is None:
+        return get_client_totals(client_id)
+    stamp = get_client_totals(client_id)["updated_at"]
+    with _db() as db:
+        q = db.query(
+            func.coalesce(func.sum(LedgerEntry.amount_per_hour), 0), func.coalesce(func.sum(LedgerEntry.deposit), 0),
+            func.coalesce(func.sum(LedgerEntry.pending), 0), func.count(LedgerEntry.id),
+        ).filter(LedgerEntry.client_id == client_id)
+        aph, dep, pend, n = _in_period(q, date_from, date_to).one()
+        opening = _entries_before(db, client_id, (date_from, 0))[0] if date_from is not None else Decimal(0)
     return {
-        "amount_per_hour": round(total_aph, 2),
-        "deposit": round(total_dep, 2),
-        "pending": round(total_pen, 2),
+        "amount_per_hour": aph, "deposit": dep, "pending": pend, "entry_count": n, "updated_at": stamp,
+        "opening": opening,
     }
 
 
+def get_opening_balances(owner_id: int, day: _date) -> dict:
+    """{client_id: balance before `day`} for an owner's clients with any earlier entries (two grouped queries)."""
+    month = day.replace(day=1)
+    with _db() as db:
+        whole = db.execute(
+            select(ClientMonth.client_id, func.sum(ClientMonth.pending))
+            .join(Client, Client.id == ClientMonth.client_id)
+            .where(Client.owner_id == owner_id, ClientMonth.month < month)
+            .group_by(ClientMonth.client_id)
+        ).all()
+        part = db.execute(
+            select(LedgerEntry.client_id, func.sum(LedgerEntry.pending))
+            .join(Client, Client.id == LedgerEntry.client_id)
+            .where(Client.owner_id == owner_id, LedgerEntry.date >= month, LedgerEntry.date < day)
+            .group_by(LedgerEntry.client_id)
+        ).all()
+    balances = {cid: pend for cid, pend in whole}
+    for cid, pend in part:
+        balances[cid] = balances.get(cid, Decimal(0)) + pend
+    return balances
+
+
+# -------------------- Monthly trend ---------------
+TREND_FIELDS = ["month", "amount_per_hour", "deposit", "pending", "entries", "closing"]
+
+
+def _fill_months(rows, opening: Decimal) -> List[tuple]:
+    """(month, aph, dep, pend, count) rows in month order -> TREND_FIELDS tuples, empty months filled in."""
+    out, closing, month = [], opening, None
+    for m, aph, dep, pend, count in rows:
+        while month is not None and month < m:
+            out.append((month, Decimal(0), Decimal(0), Decimal(0), 0, closing))
+            month = (month.replace(day=28) + _timedelta(days=4)).replace(day=1)
+        closing += pend
+        out.append((m, aph, dep, pend, int(count), closing))
+        month = (m.replace(day=28) + _timedelta(days=4)).replace(day=1)
+    return out
+
+
+def get_client_trend(client_id: int, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> List[tuple]:
+    """A client's months (TREND_FIELDS) between the months of date_from and date_to, read from client_months only."""
+    with _db() as db:
+        q = select(
+            ClientMonth.month, ClientMonth.amount_per_hour, ClientMonth.deposit, ClientMonth.pending,
+            ClientMonth.entry_count, ClientMonth.closing,
+        ).where(ClientMonth.client_id == client_id).order_by(ClientMonth.month)
+        if date_from is not None:
+            q = q.where(ClientMonth.month >= date_from.replace(day=1))
+        if date_to is not None:
+            q = q.where(ClientMonth.month <= date_to)
+        rows = db.execute(q).all()
+    if not rows:
+        return []
+    first = rows[0]
+    return _fill_months([r[:5] for r in rows], first.closing - first.pending)
+
+
+def get_owner_trend(owner_id: int, date_from: Optional[_date] = None, date_to: Optional[_date] = None) -> List[tuple]:
+    """Every client of an owner added up per month (TREND_FIELDS); closing is the owner's total balance."""
+    owned = (ClientMonth.client_id == Client.id) & (Client.owner_id == owner_id)
+    with _db() as db:
+        q = select(
+            ClientMonth.month, func.sum(ClientMonth.amount_per_hour), func.sum(ClientMonth.deposit),
+            func.sum(ClientMonth.pending), func.sum(ClientMonth.entry_count),
+        ).where(owned).group_by(ClientMonth.month).order_by(ClientMonth.month)
+        opening = Decimal(0)
+        if date_from is not None:
+            month = date_from.replace(day=1)
+            q = q.where(ClientMonth.month >= month)
+            opening = db.execute(
+                select(func.coalesce(func.sum(ClientMonth.pending), 0)).where(owned, ClientMonth.month < month)
+            ).scalar()
+        if date_to is not None:
+            q = q.where(ClientMonth.month <= date_to)
+        rows = db.execute(q).all()
+    return _fill_months(rows, opening)
+
+
+# -------------------- Change journal --------------
+SYNC_PAGE_SIZE = 500
+
+
+def _owner_of(db, client_id: int) -> int:
+    return db.execute(select(Client.owner_id).where(Client.id == client_id)).scalar_one()
+
+
+def _journal(db, owner_id: int, kind: str, entity_ids: List[int], deleted: bool = False,
+             op_id: Optional[str] = None, entity_id: Optional[int] = None) -> None:
+    """
+    Append one change_log row per id under the owner's next sequence numbers,
+    in the caller's transaction. With op_id, also record the sync op (with
+    `entity_id`, default the first id); DuplicateOpError if it was already
+    recorded, after rolling the caller's changes back.
+    """
+    if op_id:
+        db.add(SyncOp(owner_id=owner_id, op_id=op_id, entity_id=entity_id or (entity_ids[0] if entity_ids else None)))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            raise DuplicateOpError(op_id)
+    if not entity_ids:
+        return
+    # the row lock on users serialises writers, so each owner's seqs are gapless and in commit order
+    # (UPDATE then SELECT rather than RETURNING, which SQLite only has from 3.35)
+    db.execute(update(User).where(User.id == owner_id).values(change_seq=User.change_seq + len(entity_ids)))
+    last = db.execute(select(User.change_seq).where(User.id == owner_id)).scalar_one()
+    now = datetime.utcnow()
+    db.execute(ChangeLog.__table__.insert(), [
+        {"owner_id": owner_id, "seq": last - len(entity_ids) + i + 1, "kind": kind, "entity_id": eid,
+         "deleted": deleted, "created_at": now}
+        for i, eid in enumerate(entity_ids)
+    ])
+
+
+def get_sync_op(owner_id: int, op_id: str) -> Optional[SyncOp]:
+    with _db() as db:
+        return db.get(SyncOp, (owner_id, op_id))
+
+
+def get_changes(owner_id: int, since: int = 0, limit: int = SYNC_PAGE_SIZE) -> dict:
+    """
+    Changes after journal seq `since`, at most `limit` journal rows: the
+    current state of every client and entry touched (each once, however often
+    it changed) and the ids of those deleted. Resume from "cursor" while
+    "more" is true.
+    """
+    with _db() as db:
+        log = db.execute(
+            select(ChangeLog.seq, ChangeLog.kind, ChangeLog.entity_id)
+            .where(ChangeLog.owner_id == owner_id, ChangeLog.seq > since)
+            .order_by(ChangeLog.seq)
+            .limit(limit)
+        ).all()
+        client_ids = {eid for _, kind, eid in log if kind == "client"}
+        entry_ids = {eid for _, kind, eid in log if kind == "entry"}
+        clients = db.execute(
+            select(Client.id, Client.name, Client.mobile)
+            .where(Client.owner_id == owner_id, Client.id.in_(client_ids)).order_by(Client.id)
+        ).all() if client_ids else []
+        entries = db.execute(
+            select(LedgerEntry)
+            .join(Client, Client.id == LedgerEntry.client_id)
+            .where(Client.owner_id == owner_id, LedgerEntry.id.in_(entry_ids))
+            .order_by(LedgerEntry.id)
+        ).scalars().all() if entry_ids else []
+    return {
+        "cursor": log[-1].seq if log else since,
+        "more": len(log) == limit,
+        "clients": clients,
+        "entries": entries,
+        "deleted_clients": sorted(client_ids - {c.id for c in clients}),
+        "deleted_entries": sorted(entry_ids - {e.id for e in entries}),
+    }
+
+
+def _seed_journal(db) -> int:
+    """Journal every existing client and entry once, so a first sync from seq 0 gets the whole book."""
+    n = 0
+    for (owner_id,) in db.execute(select(User.id).order_by(User.id)).all():
+        client_ids = db.execute(select(Client.id).where(Client.owner_id == owner_id).order_by(Client.id)).scalars().all()
+        _journal(db, owner_id, "client", client_ids)
+        entry_ids = db.execute(
+            select(LedgerEntry.id).join(Client, Client.id == LedgerEntry.client_id)
+            .where(Client.owner_id == owner_id).order_by(LedgerEntry.id)
+        ).scalars().all()
+        for i in range(0, len(entry_ids), 5000):
+            _journal(db, owner_id, "entry", entry_ids[i:i + 5000])
+        n += len(client_ids) + len(entry_ids)
+    return n
+
+
+# -------------------- Receivables -----------------
+RECEIVABLE_SORTS = {
+    "name": Client.name,
+    "mobile": Client.mobile,
+    "amount_per_hour": ClientBalance.amount_per_hour,
+    "deposit": ClientBalance.deposit,
+    "pending": ClientBalance.pending,
+    "entries": ClientBalance.entry_count,
+}
+TOP_DEBTORS = 10
+
+
+def get_receivables_version(owner_id: int) -> Optional[datetime]:
+    """Latest change to any of the owner's clients or their balances (for conditional GETs)."""
+    clients_version = get_owner_clients_version(owner_id)
+    with _db() as db:
+        balances_version = db.execute(
+            select(func.max(ClientBalance.updated_at))
+            .join(Client, Client.id == ClientBalance.client_id)
+            .where(Client.owner_id == owner_id)
+        ).scalar()
+    return max((v for v in (clients_version, balances_version) if v is not None), default=None)
+
+
+def get_receivables(owner_id: int, sort: str = "pending", descending: bool = False, offset: int = 0,
+                    limit: int = 50) -> dict:
+    """
+    Receivables dashboard, read from client_balances (never from the entries):
+    one sorted page of (id, name, mobile, amount_per_hour, deposit, pending,
+    entry_count), the owner's grand total and the top debtors (most negative
+    pending first). Three queries however many clients the owner has.
+    """
+    if sort not in RECEIVABLE_SORTS:
+        raise ValueError(f"Unknown sort {sort!r}")
+    columns = (
+        Client.id, Client.name, Client.mobile,
+        func.coalesce(ClientBalance.amount_per_hour, 0), func.coalesce(ClientBalance.deposit, 0),
+        func.coalesce(ClientBalance.pending, 0), func.coalesce(ClientBalance.entry_count, 0),
+    )
+    base = (
+        select(*columns)
+        .select_from(Client)
+        .outerjoin(ClientBalance, ClientBalance.client_id == Client.id)
+        .where(Client.owner_id == owner_id)
+    )
+    key = RECEIVABLE_SORTS[sort]
+    order = [key.desc() if descending else key.asc(), Client.id.asc()]
+    with _db() as db:
+        rows = db.execute(base.order_by(*order).offset(offset).limit(limit)).all()
+        debtors = db.execute(
+            base.where(ClientBalance.pending < 0).order_by(ClientBalance.pending.asc(), Client.id.asc()).limit(TOP_DEBTORS)
+        ).all()
+        count, aph, dep, pend, entries = db.execute(
+            select(
+                func.count(Client.id),
+                func.coalesce(func.sum(ClientBalance.amount_per_hour), 0),
+                func.coalesce(func.sum(ClientBalance.deposit), 0),
+                func.coalesce(func.sum(ClientBalance.pending), 0),
+                func.coalesce(func.sum(ClientBalance.entry_count), 0),
+            )
+            .select_from(Client)
+            .outerjoin(ClientBalance, ClientBalance.client_id == Client.id)
+            .where(Client.owner_id == owner_id)
+        ).one()
+    return {
+        "rows": [tuple(r) for r in rows],
+        "debtors": [tuple(r) for r in debtors],
+        "client_count": count,
+        "grand": {"amount_per_hour": aph, "deposit": dep, "pending": pend, "entry_count": entries},
+    }
+
+
+# -------------------- Export jobs -----------------
+EXPORT_JOB_FIELDS = ("status", "cache_key", "error", "finished_at")
+
+
+def create_export_job(owner_id: int, kind: str, client_id: Optional[int], download_name: str) -> ExportJob:
+    with _db() as db:
+        job = ExportJob(
+            id=uuid.uuid4().hex, owner_id=owner_id, kind=kind, client_id=client_id, download_name=download_name,
+        )
+        db.add(job)
+        db.commit()
+        return job
+
+
+def get_export_job(owner_id: int, job_id: str) -> Optional[ExportJob]:
+    with _db() as db:
+        job = db.get(ExportJob, job_id)
+        return job if job and job.owner_id == owner_id else None
+
+
+def update_export_job(job_id: str, **fields) -> None:
+    unknown = set(fields) - set(EXPORT_JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown export job fields: {sorted(unknown)}")
+    if fields.get("status") in ("done", "failed"):
+        fields.setdefault("finished_at", datetime.utcnow())
+    with _db() as db:
+        db.execute(update(ExportJob).where(ExportJob.id == job_id).values(**fields))
+        db.commit()
+
+
 # -------------------- PDFs ------------------------
+# Layout and backends live in pdf_render (shared with the Kivy app).
 def render_clients_pdf(clients: List[Client]) -> bytes:
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, height - 50, "Registered Clients")
-
-    y = height - 90
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(40, y, "#")
-    c.drawString(70, y, "Name")
-    c.drawString(260, y, "Mobile")
-
-    c.setFont("Helvetica", 11)
-    y -= 20
-    for idx, cl in enumerate(clients, start=1):
-        if y < 50:
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica", 11)
-        c.drawString(40, y, str(idx))
-        c.drawString(70, y, cl.name)
-        c.drawString(260, y, cl.mobile)
-        y -= 18
-
-    c.showPage()
-    c.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
-
-
-def render_ledger_pdf(client: Client, entries: List[LedgerEntry], totals: dict) -> bytes:
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, height - 50, f"{client.name} ({client.mobile})")
-
-    y = height - 90
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(40, y, "S#")
-    c.drawString(70, y, "Date")
-    c.drawString(140, y, "Details")
-    c.drawRightString(400, y, "Amt/hr")
-    c.drawRightString(480, y, "Deposit")
-    c.drawRightString(560, y, "Pending")
-
-    c.setFont("Helvetica", 11)
-    y -= 20
-    for idx, e in enumerate(entries, start=1):
-        if y < 80:
-            # print the running totals at the bottom before page break
-            c.setFont("Helvetica-Bold", 11)
-            c.drawRightString(400, 50, f"{totals['amount_per_hour']:.2f}")
-            c.drawRightString(480, 50, f"{totals['deposit']:.2f}")
-            c.drawRightString(560, 50, f"{totals['pending']:.2f}")
-            c.showPage()
-            c.setFont("Helvetica", 11)
-            y = height - 50
-
-        c.drawString(40, y, str(idx))
-        c.drawString(70, y, (e.date or "")[:10])
-        c.drawString(140, y, (e.details or "")[:36])
-        c.drawRightString(400, y, f"{(e.amount_per_hour or 0):.2f}")
-        c.drawRightString(480, y, f"{(e.deposit or 0):.2f}")
-        c.drawRightString(560, y, f"{(e.pending or 0):.2f}")
-        y -= 18
-
-    # Totals box
-    c.setFont("Helvetica-Bold", 12)
-    c.line(40, y, 560, y)
-    y -= 14
-    c.drawString(280, y, "TOTAL")
-    c.drawRightString(400, y, f"{totals['amount_per_hour']:.2f}")
-    c.drawRightString(480, y, f"{totals['deposit']:.2f}")
-    c.drawRightString(560, y, f"{totals['pending']:.2f}")
-
-    c.showPage()
-    c.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    return pdf_render.render_pdf(pdf_render.clients_spec((c.name, c.mobile) for c in clients))
+
+
+def period_label(date_from: Optional[_date], date_to: Optional[_date]) -> Optional[str]:
+    if date_from is None and date_to is None:
+        return None
+    return f"{date_from.isoformat() if date_from else '…'} to {date_to.isoformat() if date_to else '…'}"
+
+
+def ledger_pdf_spec(client, entries, totals: dict, period: Optional[str] = None) -> pdf_render.TableSpec:
+    """Statement spec for `client`; entries are LedgerEntry objects or rows with the same attribute names."""
+    return pdf_render.ledger_spec(
+        client.name, client.mobile,
+        ((e.date, e.details, e.amount_per_hour, e.deposit, e.pending) for e in entries),
+        totals, period, totals.get("opening"),
+    )
+
+
+def render_ledger_pdf(client: Client, entries: List[LedgerEntry], totals: dict, period: Optional[str] = None) -> bytes:
+    return pdf_render.render_pdf(ledger_pdf_spec(client, entries, totals, period))
+
+
+def stream_ledger_pdf(client: Client, totals: dict, rows=None, date_from: Optional[_date] = None,
+                      date_to: Optional[_date] = None) -> Iterator[bytes]:
+    """
+    Same statement as render_ledger_pdf, but rows come from iter_ledger_rows
+    (unless given) and each finished page is yielded as PDF bytes, so memory
+    stays flat however long the ledger is.
+    """
+    if rows is None:
+        rows = iter_ledger_rows(client.id, date_from=date_from, date_to=date_to)
+    spec = ledger_pdf_spec(client, rows, totals, period_label(date_from, date_to))
+    return pdf_render.iter_pdf(spec, backend="stream")
@@ -0,0 +1,357 @@
+# ---------------- main.py ----------------
+from kivy.config import Config
+Config.set('graphics', 'orientation', 'portrait')
+Config.set('graphics', 'width', '400')
+Config.set('graphics', 'height', '700')
+
+from kivy.app import App
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.popup import Popup
+from kivy.graphics import Color, Rectangle, RoundedRectangle
+from functools import partial
+from datetime import datetime
+
+from save_page2_pdf import save_page2_table_as_pdf, app_private_path
+from save_clients_pdf import save_clients_as_pdf
+from link2 import ScrollableTable, styled_button, SafeTextInput
+from link1 import RemovePopup
+from local_store import open_store
+from recycle_table import RecycleTable
+
+# ---------------- Title Widget ----------------
+class TitleWithShadow(BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(orientation="vertical", **kwargs)
+
+        with self.canvas.before:
+            Color(0.4, 0.2, 0.2, 0.6)  # background shadow
+            self.rect = Rectangle(size=self.size, pos=self.pos)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+
+        self.add_widget(Label(
+            text="LEDg3R\nbY\nz.A.BhaYa...!",
+            font_name="Suissnord.otf",  # must exist in folder
+            font_size="50sp",
+            halign="center",
+            valign="middle",
+            color=(.9, 0.84, 0.4, 0.8),  # golden
+            size_hint=(1, None),
+            height=225
+        ))
+
+    def _update_rect(self, *args):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
+
+
+# ---------------- Page1 ----------------
+class Page1(BoxLayout):
+    def __init__(self, main_app, **kwargs):
+        super().__init__(orientation='vertical', padding=8, spacing=8, **kwargs)
+        self.main_app = main_app
+        self.clients = main_app.clients
+
+        # Background
+        with self.canvas.before:
+            Color(0.9, 0.7, 0.9, 0.7)
+            self.bg_rect = Rectangle(size=self.size, pos=self.pos)
+        self.bind(size=self._update_bg, pos=self._update_bg)
+
+        # Header
+        header = BoxLayout(orientation='vertical',
+                           padding=[10, 15],
+                           spacing=8,
+                           size_hint_y=None,
+                           height=300)
+        with header.canvas.before:
+            Color(0.15, 0.22, 0.3, 0.6)
+            header._bg = RoundedRectangle(pos=header.pos,
+                                          size=header.size,
+                                          radius=[20, 20, 20, 20])
+        header.bind(pos=lambda w, v: setattr(header._bg, 'pos', w.pos),
+                    size=lambda w, v: setattr(header._bg, 'size', w.size))
+        header.add_widget(TitleWithShadow())
+        self.add_widget(header)
+
+        # Controls
+        controls = BoxLayout(orientation='vertical', spacing=8, padding=12)
+        with controls.canvas.before:
+            Color(1, 1, 1, 0.08)
+            controls._bg = RoundedRectangle(pos=controls.pos, size=controls.size, radius=[16, 16, 16, 16])
+        controls.bind(pos=lambda w, v: setattr(controls._bg, 'pos', w.pos),
+                      size=lambda w, v: setattr(controls._bg, 'size', w.size))
+
+        # Registration
+        reg_layout = BoxLayout(size_hint_y=None, height=50, spacing=6)
+        self.reg_name = SafeTextInput(hint_text="Name", multiline=False, size_hint_x=0.4)
+        self.reg_mobile = SafeTextInput(hint_text="Mobile", multiline=False, size_hint_x=0.4)
+        reg_btn = Button(text="Register", size_hint_x=0.2)
+        reg_btn.bind(on_press=self.register_client)
+        reg_layout.add_widget(self.reg_name)
+        reg_layout.add_widget(self.reg_mobile)
+        reg_layout.add_widget(reg_btn)
+
+        # Search
+        search_layout = BoxLayout(size_hint_y=None, height=50, spacing=6)
+        self.search_input = SafeTextInput(hint_text="Search by Name or Mobile", multiline=False, size_hint_x=0.8)
+        search_btn = Button(text="Search", size_hint_x=0.2)
+        search_btn.bind(on_press=self.search_client)
+        search_layout.add_widget(self.search_input)
+        search_layout.add_widget(search_btn)
+
+        # Download / Show list buttons
+        download_btn = Button(text="Download Clients List", size_hint_y=None, height=50,
+                              background_color=(0.2, 0.6, 0.2, 1), color=(1, 1, 1, 1))
+        download_btn.bind(on_press=self.download_clients_pdf)
+
+        show_list_btn = Button(text="Show Clients List", size_hint_y=None, height=50,
+                               background_color=(0.2, 0.4, 0.6, 1), color=(1, 1, 1, 1))
+        show_list_btn.bind(on_press=self.toggle_client_list)
+
+        controls.add_widget(reg_layout)
+        controls.add_widget(search_layout)
+        controls.add_widget(download_btn)
+        controls.add_widget(show_list_btn)
+        self.add_widget(controls)
+
+        # Client Table (hidden initially)
+        headers = ["Name", "Mobile"]
+        self.client_table = ScrollableTable(cols=2, headers=headers, size_hint_y=None, height=0)
+        self.add_widget(self.client_table)
+
+    # --- helpers ---
+    def _update_bg(self, *args):
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+
+    def register_client(self, instance):
+        name = self.reg_name.text.strip()
+        mobile = self.reg_mobile.text.strip()
+        if not name or not mobile:
+            print("Name and Mobile required")
+            return
+        if mobile in self.clients:
+            print("Mobile already registered")
+            return
+        self.main_app.store.save_client(mobile, name)
+        print(f"Registered {name} ({mobile})")
+        self.clear_inputs()
+
+    def search_client(self, instance):
+        query = self.search_input.text.strip().lower()
+        results = [(mob, data['name']) for mob, data in self.clients.items()
+                   if query in mob or query in data['name'].lower()]
+
+        if not results:
+            print("No results found")
+            return
+
+        if query.isdigit() and len(results) == 1:
+            mobile, _ = results[0]
+            self.main_app.show_page2(mobile)
+            return
+
+        if len(results) > 1 and not query.isdigit():
+            self.show_selection_list(results)
+            return
+
+        mobile, _ = results[0]
+        self.main_app.show_page2(mobile)
+
+    def show_selection_list(self, results):
+        layout = BoxLayout(orientation="vertical", spacing=5, padding=5)
+        scroll = ScrollView(size_hint=(1, 1))
+        grid = GridLayout(cols=1, spacing=5, size_hint_y=None)
+        grid.bind(minimum_height=grid.setter('height'))
+
+        for mobile, name in results:
+            btn = Button(text=f"{name}  ({mobile})", size_hint_y=None, height=40)
+            btn.bind(on_release=partial(self.open_client_from_list, mobile))
+            grid.add_widget(btn)
+
+        scroll.add_widget(grid)
+        layout.add_widget(scroll)
+
+        close_btn = Button(text="Close", size_hint_y=None, height=40)
+        layout.add_widget(close_btn)
+
+        popup = Popup(title="Select Client", content=layout, size_hint=(0.9, 0.9))
+        close_btn.bind(on_release=popup.dismiss)
+        popup.open()
+        self._popup = popup
+
+    def open_client_from_list(self, mobile, instance):
+        if hasattr(self, "_popup"):
+            self._popup.dismiss()
+        self.main_app.show_page2(mobile)
+
+    def download_clients_pdf(self, instance):
+        if not self.clients:
+            print("No clients registered yet.")
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"Clients_List_{timestamp}.pdf"
+        save_clients_as_pdf(self.clients, filename)
+        print(f"Clients PDF saved as {filename}")
+
+    def toggle_client_list(self, instance):
+        if self.client_table.height == 0:
+            self.refresh_client_table()
+        else:
+            self.client_table.height = 0
+
+    def refresh_client_table(self):
+        self.client_table.layout.clear_widgets()
+        self.client_table.add_row(["Name", "Mobile"])
+        for mobile, data in self.clients.items():
+            self.client_table.add_row([data['name'], mobile])
+        self.client_table.height = sum(child.height for child in self.client_table.layout.children)
+
+    def clear_inputs(self):
+        self.reg_name.text = ""
+        self.reg_mobile.text = ""
+        self.search_input.text = ""
+
+
+# ---------------- Page2 (same as before) ----------------
+class Page2(BoxLayout):
+    def __init__(self, main_app, client_mobile, **kwargs):
+        super().__init__(orientation='vertical', padding=5, spacing=5, **kwargs)
+        self.main_app = main_app
+        self.client_mobile = client_mobile
+        self.clients = main_app.clients
+        client = self.clients[self.client_mobile]
+
+        # --- Background ---
+        with self.canvas.before:
+            Color(0.9, 0.7, 0.9, 0.7)  # light purple
+            self.bg_rect = Rectangle(size=self.size, pos=self.pos)
+        self.bind(size=self._update_bg, pos=self._update_bg)
+
+        # --- Heading ---
+        heading = Label(
+            text=f"{client['name']} ({self.client_mobile})",
+            size_hint_y=None,
+            height=40,
+            bold=True,
+            color=(0.1, 0.1, 0.1, 1)  # dark text for contrast
+        )
+        self.add_widget(heading)
+
+        # --- Entry layout ---
+        entry_layout = GridLayout(cols=4, spacing=5, size_hint_y=None, height=40)
+        self.date_input = SafeTextInput(hint_text="Date", multiline=False)
+        self.detail_input = SafeTextInput(hint_text="Detail", multiline=False)
+        self.amount_hour_input = SafeTextInput(hint_text="Amount/hour", multiline=False)
+        self.amount_deposit_input = SafeTextInput(hint_text="Amount deposited", multiline=False)
+        for inp in [self.date_input, self.detail_input, self.amount_hour_input, self.amount_deposit_input]:
+            inp.size_hint_x = 1
+            entry_layout.add_widget(inp)
+        self.add_widget(entry_layout)
+
+        # --- Add entry button ---
+        add_btn = styled_button("Add Entry")
+        add_btn.bind(on_press=self.add_entry)
+        self.add_widget(add_btn)
+
+        # --- Ledger table ---
+        headers = ["Sr", "Date", "Detail", "Amount/hour", "Amount deposited", "Pending"]
+        # only the rows on screen are widgets, however long the ledger
+        self.table = RecycleTable(cols=6, headers=headers, col_widths=[35, 75, 105, 55, 60, 50])
+        self.table.bind(on_row_press=self._on_row_press)
+        self.add_widget(self.table)
+
+        # --- Buttons layout ---
+        buttons_layout = BoxLayout(size_hint_y=None, height=50, spacing=5)
+        back_btn = styled_button("Back to Page1")
+        back_btn.bind(on_press=lambda x: self.main_app.show_page1())
+        download_btn = styled_button("Download PDF")
+        download_btn.bind(on_press=self.download_pdf)
+        buttons_layout.add_widget(back_btn)
+        buttons_layout.add_widget(download_btn)
+        self.add_widget(buttons_layout)
+
+        # Show existing ledger entries
+        self.show_table()
+
+    # --- Background update ---
+    def _update_bg(self, *args):
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+
+    # --- Add ledger entry ---
+    def add_entry(self, instance):
+        date = self.date_input.text
+        detail = self.detail_input.text
+        try:
+            amount_hour = float(self.amount_hour_input.text)
+        except:
+            amount_hour = 0.0
+        try:
+            amount_deposit = float(self.amount_deposit_input.text)
+        except:
+            amount_deposit = 0.0
+        # the store appends it to the loaded ledger with its SR and pending
+        self.main_app.store.add_entry(self.client_mobile, [date, detail, amount_hour, amount_deposit])
+        self.clear_inputs()
+        self.show_table()
+
+    # --- Show table ---
+    def show_table(self):
+        ledger = self.clients[self.client_mobile]['ledger']
+        total_hour, total_deposit, total_pending = self.main_app.store.totals(self.client_mobile)
+        totals_row = ["", "", "Total", str(total_hour), str(total_deposit), str(total_pending)]
+        # whole ledger in one go: one relayout instead of a widget per cell
+        self.table.set_rows(ledger + [totals_row])
+
+    # --- SR cell touch handler ---
+    def _on_row_press(self, table, row_index, col):
+        if col == 0 and row_index < len(self.clients[self.client_mobile]['ledger']):
+            RemovePopup(self, row_index).open()
+
+    # --- Clear inputs ---
+    def clear_inputs(self):
+        for inp in [self.date_input, self.detail_input, self.amount_hour_input, self.amount_deposit_input]:
+            inp.text = ""
+
+    # --- Download PDF ---
+    def download_pdf(self, instance):
+        client = self.clients[self.client_mobile]
+        ledger = client['ledger']
+        if not ledger:
+            print("No entries to save.")
+            return
+        save_page2_table_as_pdf(client['name'], self.client_mobile, ledger)
+
+
+
+# ---------------- Main App ----------------
+class MainApp(App):
+    def build(self):
+        # ledger_data.db in app storage; an old ledger_data.json there is imported once
+        self.store = open_store(app_private_path())
+        self.clients = self.store.clients
+        self.main_layout = BoxLayout(orientation='vertical', padding=5, spacing=5)
+        self.show_page1()
+        return self.main_layout
+
+    def on_stop(self):
+        self.store.close()
+
+    def show_page1(self):
+        self.main_layout.clear_widgets()
+        self.page1 = Page1(self)
+        self.main_layout.add_widget(self.page1)
+
+    def show_page2(self, client_mobile):
+        self.main_layout.clear_widgets()
+        self.page2 = Page2(self, client_mobile)
+        self.main_layout.add_widget(self.page2)
+
+
+if __name__ == "__main__":
+    MainApp().run()
@@ -0,0 +1,245 @@
+# migrations.py
+"""
+Versioned schema migrations for the models in logic.py.
+
+`logic.init_db()` only creates missing tables; it cannot add an index or a
+column to a table that already exists. Every such change is registered here
+with the next version number and applied once, in order, by `upgrade()`:
+
+    flask --app app db-upgrade      (or: python migrations.py)
+
+Applied versions are recorded in the `schema_version` table. Migrations must be
+safe to run on a database that `create_all` just built from the current models,
+so they check for an object before creating it.
+"""
+from datetime import date, datetime
+from itertools import groupby
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, String, Table, bindparam, inspect, select, text
+
+import logic
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = []
+
+
+def migration(version: int, name: str):
+    """Register `fn(conn)` as schema migration number `version`."""
+    def wrap(fn):
+        if any(v == version for v, _, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return wrap
+
+
+# -------------------- Helpers ---------------------
+def _model_index(table, name: str) -> Index:
+    for ix in table.indexes:
+        if ix.name == name:
+            return ix
+    raise KeyError(f"{table.name} has no index {name}")
+
+
+def _create_index(conn, table, name: str) -> None:
+    """Create one of the indexes declared on a model unless it already exists."""
+    _model_index(table, name).create(conn, checkfirst=True)
+
+
+def _has_column(conn, table_name: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table_name))
+
+
+def _can_drop_column(conn) -> bool:
+    """ALTER TABLE ... DROP COLUMN needs SQLite 3.35+; other backends have it."""
+    if conn.dialect.name != "sqlite":
+        return True
+    return conn.dialect.dbapi.sqlite_version_info >= (3, 35, 0)
+
+
+# -------------------- Migrations ------------------
+@migration(1, "ledger_entries (client_id, id) index")
+def _m0001(conn):
+    _create_index(conn, logic.LedgerEntry.__table__, "ix_ledger_entries_client_id")
+
+
+@migration(2, "ledger_entries (client_id, date) index")
+def _m0002(conn):
+    # Indexed the old text date column; 0010 replaces both with entry_date.
+    if _has_column(conn, "ledger_entries", "date"):
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_ledger_entries_client_date ON ledger_entries (client_id, date)"))
+
+
+@migration(3, "clients (owner_id, name) index")
+def _m0003(conn):
+    _create_index(conn, logic.Client.__table__, "ix_clients_owner_name")
+
+
+@migration(4, "client_balances table")
+def _m0004(conn):
+    # Backfilled by 0005 once the entry amounts are in their final column type.
+    logic.ClientBalance.__table__.create(conn, checkfirst=True)
+
+
+@migration(5, "money columns as integer cents")
+def _m0005(conn):
+    for name in ("amount_per_hour", "deposit", "pending"):
+        cents = f"{name}_cents"
+        if not _has_column(conn, "ledger_entries", cents):
+            conn.execute(text(f"ALTER TABLE ledger_entries ADD COLUMN {cents} BIGINT NOT NULL DEFAULT 0"))
+        if _has_column(conn, "ledger_entries", name):
+            conn.execute(text(
+                f"UPDATE ledger_entries SET {cents} = CAST(ROUND(COALESCE({name}, 0) * 100) AS BIGINT)"
+            ))
+            if _can_drop_column(conn):
+                conn.execute(text(f"ALTER TABLE ledger_entries DROP COLUMN {name}"))
+    # Derived data: rebuild with the new column types from the converted entries.
+    logic.ClientBalance.__table__.drop(conn, checkfirst=True)
+    logic.ClientBalance.__table__.create(conn)
+    logic._recompute_balances(conn)
+
+
+@migration(6, "clients.mobile_rev for mobile suffix search")
+def _m0006(conn):
+    if not _has_column(conn, "clients", "mobile_rev"):
+        conn.execute(text("ALTER TABLE clients ADD COLUMN mobile_rev VARCHAR NOT NULL DEFAULT ''"))
+    rows = conn.execute(text("SELECT id, mobile FROM clients")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE clients SET mobile_rev = :rev WHERE id = :id"),
+            [{"id": cid, "rev": logic._reversed_digits(mobile)} for cid, mobile in rows],
+        )
+    _create_index(conn, logic.Client.__table__, "ix_clients_owner_mobile_rev")
+
+
+@migration(7, "client name/mobile substring search index")
+def _m0007(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_clients_name_trgm ON clients USING gin (name gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_clients_mobile_trgm ON clients USING gin (mobile gin_trgm_ops)"))
+        return
+    if conn.dialect.name != "sqlite" or conn.dialect.dbapi.sqlite_version_info < (3, 34, 0):
+        return  # no trigram tokenizer: search_clients falls back to ILIKE
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5("
+        "name, mobile, content='clients', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN "
+        "INSERT INTO clients_fts(rowid, name, mobile) VALUES (new.id, new.name, new.mobile); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN "
+        "INSERT INTO clients_fts(clients_fts, rowid, name, mobile) VALUES ('delete', old.id, old.name, old.mobile); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE OF name, mobile ON clients BEGIN "
+        "INSERT INTO clients_fts(clients_fts, rowid, name, mobile) VALUES ('delete', old.id, old.name, old.mobile); "
+        "INSERT INTO clients_fts(rowid, name, mobile) VALUES (new.id, new.name, new.mobile); END"
+    ))
+    conn.execute(text("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')"))
+
+
+@migration(8, "users.clients_updated_at")
+def _m0008(conn):
+    if not _has_column(conn, "users", "clients_updated_at"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN clients_updated_at TIMESTAMP"))
+
+
+@migration(9, "export_jobs table")
+def _m0009(conn):
+    logic.ExportJob.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, "ledger_entries.entry_date as DATE")
+def _m0010(conn):
+    """
+    Move the free-form text dates into a DATE column. Anything parse_date
+    cannot read takes the date of the client's previous entry (the Kivy app
+    appended in order), else the next one's, else today.
+    """
+    if not _has_column(conn, "ledger_entries", "entry_date"):
+        conn.execute(text("ALTER TABLE ledger_entries ADD COLUMN entry_date DATE"))
+    if not _has_column(conn, "ledger_entries", "date"):
+        return  # built by create_all from the current models
+    rows = conn.execute(text("SELECT client_id, id, date FROM ledger_entries ORDER BY client_id, id")).all()
+    fixed = []
+    for _, group in groupby(rows, key=lambda r: r[0]):
+        parsed = [(entry_id, logic.parse_date(raw)) for _, entry_id, raw in group]
+        known = [d for _, d in parsed if d is not None]
+        previous = known[0] if known else date.today()
+        for entry_id, d in parsed:
+            previous = d or previous
+            fixed.append({"id": entry_id, "d": previous})
+    set_date = text("UPDATE ledger_entries SET entry_date = :d WHERE id = :id").bindparams(bindparam("d", type_=Date))
+    for i in range(0, len(fixed), 5000):
+        conn.execute(set_date, fixed[i:i + 5000])
+    conn.execute(text("DROP INDEX IF EXISTS ix_ledger_entries_client_date"))
+    if _can_drop_column(conn):
+        conn.execute(text("ALTER TABLE ledger_entries DROP COLUMN date"))
+    _create_index(conn, logic.LedgerEntry.__table__, "ix_ledger_entries_client_date")
+
+
+@migration(11, "client_months rollup table")
+def _m0011(conn):
+    # Derived from the DATE column 0010 created; backfilled in one ordered pass.
+    logic.ClientMonth.__table__.create(conn, checkfirst=True)
+    logic._rebuild_months(conn)
+
+
+@migration(12, "change_log journal and sync_ops")
+def _m0012(conn):
+    if not _has_column(conn, "users", "change_seq"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"))
+    logic.ChangeLog.__table__.create(conn, checkfirst=True)
+    logic.SyncOp.__table__.create(conn, checkfirst=True)
+    # journal what is already there, so a device's first sync (since=0) gets the whole book
+    if not conn.execute(text("SELECT 1 FROM change_log LIMIT 1")).first():
+        logic._seed_journal(conn)
+
+
+# -------------------- Runner ----------------------
+def applied_versions(engine=None) -> List[int]:
+    engine = engine or logic.engine
+    _meta.create_all(engine)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(select(schema_version.c.version).order_by(schema_version.c.version))]
+
+
+def pending_migrations(engine=None) -> List[Tuple[int, str, Callable]]:
+    done = set(applied_versions(engine))
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def upgrade(engine=None, echo=print) -> List[int]:
+    """
+    Create missing tables, then apply every pending migration in its own
+    transaction. Returns the versions applied by this call.
+    """
+    engine = engine or logic.engine
+    logic.Base.metadata.create_all(engine)
+    applied = []
+    for version, name, fn in pending_migrations(engine):
+        echo(f"Applying migration {version:04d}: {name}")
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_version.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append(version)
+    if not applied:
+        echo("Database schema is up to date.")
+    return applied
+
+
+if __name__ == "__main__":
+    upgrade()
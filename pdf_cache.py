@@ -0,0 +1,129 @@
+# pdf_cache.py
+"""
+On-disk cache of rendered PDFs, shared by all gunicorn workers.
+
+A cache key is derived from what the PDF shows (kind, id and the data version
+stamp from logic), so a changed ledger simply gets a new key and stale files
+age out. The key doubles as the ETag. Files are written to a temp name and
+renamed into place, so workers never see half-written PDFs.
+
+Settings (env): PDF_CACHE_DIR, PDF_CACHE_MAX_MB (256), PDF_CACHE_MAX_AGE_HOURS (168).
+"""
+import hashlib
+import os
+import tempfile
+import time
+from typing import Iterable, Iterator, Optional
+
+CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ledger-pdf-cache"))
+MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "256")) * 1024 * 1024
+MAX_AGE = int(os.getenv("PDF_CACHE_MAX_AGE_HOURS", "168")) * 3600
+# Bump when the PDF layout changes so old renders are not served.
+RENDER_VERSION = "2"
+# Hits refresh the file's mtime (its "last used" time) at most this often.
+_TOUCH_INTERVAL = 3600
+
+
+def cache_key(kind: str, obj_id: int, version) -> str:
+    raw = f"{RENDER_VERSION}|{kind}|{obj_id}|{version}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.pdf")
+
+
+def lookup(key: str) -> Optional[str]:
+    """Path of the cached PDF for `key`, or None. Costs one stat() on a hit."""
+    path = _path(key)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    now = time.time()
+    if now - st.st_mtime > MAX_AGE:
+        return None
+    if now - st.st_mtime > _TOUCH_INTERVAL:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return path
+
+
+def store(key: str, data: bytes) -> str:
+    """Write `data` under `key` atomically and return its path."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, _path(key))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    evict()
+    return _path(key)
+
+
+def store_stream(key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Pass `chunks` through while writing them to the cache, so a streamed
+    response fills the cache as it goes. The file only becomes visible once
+    the last chunk has been written; an aborted download leaves nothing behind.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    done = False
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                yield chunk
+        os.replace(tmp, _path(key))
+        done = True
+    finally:
+        if not done and os.path.exists(tmp):
+            os.unlink(tmp)
+    evict()
+
+
+def evict(max_bytes: int = None, max_age: int = None) -> int:
+    """Drop files older than max_age, then least recently used ones until under max_bytes."""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    max_age = MAX_AGE if max_age is None else max_age
+    now = time.time()
+    files, total, removed = [], 0, 0
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        # leftover temp files from a crashed writer count as expired after an hour
+        limit = 3600 if name.endswith(".tmp") else max_age
+        if now - st.st_mtime > limit:
+            removed += _unlink(path)
+            continue
+        if name.endswith(".pdf"):
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        removed += _unlink(path)
+        total -= size
+    return removed
+
+
+def _unlink(path: str) -> int:
+    try:
+        os.unlink(path)
+        return 1
+    except OSError:
+        return 0
@@ -0,0 +1,297 @@
+# pdf_render.py
+"""
+One table layout for every PDF the app makes (ledger statements and client
+lists, web and Kivy), drawn by pluggable backends:
+
+    stream    pdf_stream.StreamingCanvas; pure Python, pages are emitted as drawn
+    canvas    ReportLab pdfgen canvas
+    fpdf      FPDF / fpdf2 (what the Android build ships)
+    platypus  ReportLab platypus Table; kept for comparison, slow on long tables
+
+A document is one or more TableSpec, each starting on a new page. stream,
+canvas and fpdf all go through draw_table, so they produce the same layout;
+platypus lays the same spec out as a gridded Table. `python bench_pdf.py`
+times them; the fastest (stream) is the default, PDF_BACKEND overrides it.
+"""
+import os
+from collections import namedtuple
+from io import BytesIO
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+from pdf_stream import A4, StreamingCanvas, encode, string_width
+
+DEFAULT_BACKEND = os.getenv("PDF_BACKEND", "stream")
+
+# Layout, in points
+MARGIN = 40
+TOP = 50
+BOTTOM = 50
+TITLE_SIZE = 16
+HEAD_SIZE = 10
+BODY_SIZE = 10
+ROW_HEIGHT = 16
+PAD = 3
+
+# align: "left" | "right" | "center"
+Column = namedtuple("Column", "title width align")
+
+LEDGER_COLUMNS = [
+    Column("S#", 35, "right"),
+    Column("Date", 65, "left"),
+    Column("Details", 205, "left"),
+    Column("Amount/hour", 70, "right"),
+    Column("Deposit", 70, "right"),
+    Column("Pending", 70, "right"),
+]
+CLIENT_COLUMNS = [
+    Column("#", 35, "right"),
+    Column("Name", 280, "left"),
+    Column("Mobile", 200, "left"),
+]
+
+
+class TableSpec:
+    """A titled table: `rows` (any iterable, consumed once) of cell values, plus an optional bold totals row."""
+
+    def __init__(self, title: str, columns: List[Column], rows: Iterable[Sequence], totals: Optional[Sequence] = None):
+        self.title = title
+        self.columns = columns
+        self.rows = rows
+        self.totals = totals
+
+
+def _money(value) -> str:
+    return f"{(value or 0):.2f}"
+
+
+def ledger_spec(name: str, mobile: str, entries: Iterable[Sequence], totals: dict,
+                period: Optional[str] = None, opening=None) -> TableSpec:
+    """
+    Statement for one client; entries are (date, details, amount_per_hour,
+    deposit, pending), dates as date or text. With `opening` (the balance
+    before the period) the table starts with a brought-forward row and the
+    totals row ends on the closing balance.
+    """
+    rows = (
+        (str(idx), str(date or "")[:10], details or "", _money(aph), _money(dep), _money(pend))
+        for idx, (date, details, aph, dep, pend) in enumerate(entries, start=1)
+    )
+    label, pending = "TOTAL", totals["pending"]
+    if opening is not None:
+        rows = chain([("", "", "Brought forward", "", "", _money(opening))], rows)
+        label, pending = "CLOSING BALANCE", (pending or 0) + opening
+    total_row = ("", "", label, _money(totals["amount_per_hour"]), _money(totals["deposit"]), _money(pending))
+    title = f"{name} ({mobile})" + (f", {period}" if period else "")
+    return TableSpec(title, LEDGER_COLUMNS, rows, total_row)
+
+
+def clients_spec(clients: Iterable[Sequence]) -> TableSpec:
+    """Client list; clients are (name, mobile)."""
+    rows = ((str(idx), name, mobile) for idx, (name, mobile) in enumerate(clients, start=1))
+    return TableSpec("Registered Clients", CLIENT_COLUMNS, rows)
+
+
+# -------------------- Shared drawing --------------
+def _fit(text: str, width: float, font: str, size: float) -> str:
+    """Cut `text` to fit `width`, ending in an ellipsis when shortened."""
+    # no glyph is wider than 1.015 em, so short strings skip the measuring
+    if len(text) * size * 1.015 <= width or string_width(text, font, size) <= width:
+        return text
+    while text and string_width(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _draw_row(c, columns: List[Column], cells: Sequence, y: float, font: str, size: float) -> None:
+    x = MARGIN
+    for col, value in zip(columns, cells):
+        text = _fit(str(value), col.width - 2 * PAD, font, size)
+        if col.align == "right":
+            c.drawRightString(x + col.width - PAD, y, text)
+        elif col.align == "center":
+            c.drawCentredString(x + col.width / 2, y, text)
+        else:
+            c.drawString(x + PAD, y, text)
+        x += col.width
+
+
+def _draw_head(c, spec: TableSpec, y: float) -> float:
+    right = MARGIN + sum(col.width for col in spec.columns)
+    c.setFont("Helvetica-Bold", HEAD_SIZE)
+    _draw_row(c, spec.columns, [col.title for col in spec.columns], y, "Helvetica-Bold", HEAD_SIZE)
+    c.line(MARGIN, y - 5, right, y - 5)
+    c.setFont("Helvetica", BODY_SIZE)
+    return y - ROW_HEIGHT - 2
+
+
+def _draw_footer(c, page_no: int) -> None:
+    c.setFont("Helvetica", 8)
+    c.drawCentredString(A4[0] / 2, BOTTOM / 2, f"Page {page_no}")
+
+
+def draw_table(c, spec: TableSpec) -> Iterator[None]:
+    """Draw `spec` from the top of a fresh page on canvas-like `c`; yields after every finished page."""
+    width, height = A4
+    page_no = 1
+    c.setFont("Helvetica-Bold", TITLE_SIZE)
+    c.drawCentredString(width / 2, height - TOP, spec.title)
+    y = _draw_head(c, spec, height - TOP - 30)
+    for row in spec.rows:
+        if y < BOTTOM:
+            _draw_footer(c, page_no)
+            c.showPage()
+            yield
+            page_no += 1
+            y = _draw_head(c, spec, height - TOP)
+        _draw_row(c, spec.columns, row, y, "Helvetica", BODY_SIZE)
+        y -= ROW_HEIGHT
+    if spec.totals:
+        if y < BOTTOM:
+            _draw_footer(c, page_no)
+            c.showPage()
+            yield
+            page_no += 1
+            y = _draw_head(c, spec, height - TOP)
+        c.line(MARGIN, y + ROW_HEIGHT - 4, MARGIN + sum(col.width for col in spec.columns), y + ROW_HEIGHT - 4)
+        c.setFont("Helvetica-Bold", BODY_SIZE)
+        _draw_row(c, spec.columns, spec.totals, y, "Helvetica-Bold", BODY_SIZE)
+    _draw_footer(c, page_no)
+    c.showPage()
+    yield
+
+
+# -------------------- Backends --------------------
+def _iter_stream(specs: Iterable[TableSpec]) -> Iterator[bytes]:
+    c = StreamingCanvas(A4)
+    for spec in specs:
+        for _ in draw_table(c, spec):
+            yield c.drain()
+    yield c.finish()
+
+
+def _iter_canvas(specs: Iterable[TableSpec]) -> Iterator[bytes]:
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for spec in specs:
+        for _ in draw_table(c, spec):
+            pass
+    c.save()
+    yield buffer.getvalue()
+
+
+class _FPDFCanvas:
+    """The canvas calls draw_table uses, on top of FPDF (top-left origin, so y is flipped)."""
+
+    def __init__(self):
+        import fpdf
+
+        self._v1 = str(getattr(fpdf, "FPDF_VERSION", "2")).startswith("1.")
+        self.pdf = fpdf.FPDF(unit="pt", format="A4")
+        self.pdf.set_auto_page_break(False)
+        self._open = False
+        self._font, self._size = "Helvetica", 12
+
+    def _page(self) -> None:
+        if not self._open:
+            self.pdf.add_page()
+            self._open = True
+
+    def setFont(self, name: str, size: float) -> None:
+        self._font, self._size = name, size
+        self.pdf.set_font("Helvetica", "B" if name.endswith("Bold") else "", size)
+
+    def drawString(self, x: float, y: float, text: str) -> None:
+        self._page()
+        # core fonts take cp1252 bytes passed through as latin-1 text
+        self.pdf.text(x, A4[1] - y, encode(text).decode("latin-1"))
+
+    def drawRightString(self, x: float, y: float, text: str) -> None:
+        self.drawString(x - string_width(text, self._font, self._size), y, text)
+
+    def drawCentredString(self, x: float, y: float, text: str) -> None:
+        self.drawString(x - string_width(text, self._font, self._size) / 2, y, text)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        self._page()
+        self.pdf.line(x1, A4[1] - y1, x2, A4[1] - y2)
+
+    def showPage(self) -> None:
+        self._page()
+        self._open = False
+
+    def output(self) -> bytes:
+        if self._v1:
+            return self.pdf.output(dest="S").encode("latin-1")
+        return bytes(self.pdf.output())
+
+
+def _iter_fpdf(specs: Iterable[TableSpec]) -> Iterator[bytes]:
+    c = _FPDFCanvas()
+    for spec in specs:
+        for _ in draw_table(c, spec):
+            pass
+    yield c.output()
+
+
+def _iter_platypus(specs: Iterable[TableSpec]) -> Iterator[bytes]:
+    from xml.sax.saxutils import escape
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=MARGIN, rightMargin=MARGIN, topMargin=TOP,
+                            bottomMargin=BOTTOM)
+    story = []
+    for spec in specs:
+        if story:
+            story.append(PageBreak())
+        story.append(Paragraph(escape(spec.title), styles["Title"]))
+        data = [[col.title for col in spec.columns]] + [[str(v) for v in row] for row in spec.rows]
+        style = [
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), BODY_SIZE),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ]
+        for i, col in enumerate(spec.columns):
+            style.append(("ALIGN", (i, 0), (i, -1), col.align.upper()))
+        if spec.totals:
+            data.append([str(v) for v in spec.totals])
+            style.append(("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"))
+        table = Table(data, colWidths=[col.width for col in spec.columns], repeatRows=1)
+        table.setStyle(TableStyle(style))
+        story.append(table)
+    doc.build(story)
+    yield buffer.getvalue()
+
+
+BACKENDS = {
+    "stream": _iter_stream,
+    "canvas": _iter_canvas,
+    "fpdf": _iter_fpdf,
+    "platypus": _iter_platypus,
+}
+
+
+# -------------------- Public API ------------------
+def iter_pdf(specs: Union[TableSpec, Iterable[TableSpec]], backend: Optional[str] = None) -> Iterator[bytes]:
+    """PDF bytes in chunks (one per page for the stream backend, a single chunk otherwise)."""
+    name = backend or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r}; use one of {sorted(BACKENDS)}")
+    return BACKENDS[name]([specs] if isinstance(specs, TableSpec) else specs)
+
+
+def render_pdf(specs: Union[TableSpec, Iterable[TableSpec]], backend: Optional[str] = None) -> bytes:
+    return b"".join(iter_pdf(specs, backend))
+
+
+def write_pdf(path: str, specs: Union[TableSpec, Iterable[TableSpec]], backend: Optional[str] = None) -> str:
+    with open(path, "wb") as fh:
+        for chunk in iter_pdf(specs, backend):
+            fh.write(chunk)
+    return path
@@ -0,0 +1,179 @@
+# pdf_stream.py
+"""
+Minimal PDF writer that emits finished pages as it goes.
+
+ReportLab's canvas keeps the whole document in memory until save(); for a
+ledger with 100k entries that is hundreds of pages plus every row. This
+writer covers the handful of canvas calls pdf_render.draw_table uses (setFont,
+drawString, drawRightString, drawCentredString, line, showPage) and only holds
+the page being drawn. Call drain() after showPage() to take the bytes written
+so far and finish() for the tail (page tree, xref, trailer).
+
+Only Helvetica and Helvetica-Bold are supported (standard fonts, nothing to
+embed); text is WinAnsi encoded and characters outside it become "?". Their
+glyph widths are tabulated below, so the module has no dependencies and runs
+on the Kivy/Android build as well.
+"""
+import zlib
+from typing import Dict, List, Tuple
+
+A4 = (595.2755905511812, 841.8897637795277)
+_CATALOG, _PAGES = 1, 2
+
+# Advance widths (1/1000 em) of WinAnsi codes 32..255, from the Adobe AFM files.
+_WIDTHS = {
+    "Helvetica": (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584, 761,
+        556, 556, 222, 556, 333, 1000, 556, 556, 333, 1000, 667, 333, 1000, 556, 611, 556,
+        556, 222, 222, 333, 333, 350, 556, 1000, 333, 1000, 500, 333, 944, 556, 500, 667,
+        278, 333, 556, 556, 556, 556, 260, 556, 333, 737, 370, 556, 584, 333, 737, 333,
+        400, 584, 333, 333, 333, 556, 537, 278, 333, 333, 365, 556, 834, 834, 834, 611,
+        667, 667, 667, 667, 667, 667, 1000, 722, 667, 667, 667, 667, 278, 278, 278, 278,
+        722, 722, 778, 778, 778, 778, 778, 584, 778, 722, 722, 722, 722, 667, 667, 611,
+        556, 556, 556, 556, 556, 556, 889, 500, 556, 556, 556, 556, 278, 278, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 584, 611, 556, 556, 556, 556, 500, 556, 500,
+    ),
+    "Helvetica-Bold": (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584, 761,
+        556, 611, 278, 556, 500, 1000, 556, 556, 333, 1000, 667, 333, 1000, 611, 611, 611,
+        611, 278, 278, 500, 500, 350, 556, 1000, 333, 1000, 556, 333, 944, 611, 500, 667,
+        278, 333, 556, 556, 556, 556, 280, 556, 333, 737, 370, 556, 584, 333, 737, 333,
+        400, 584, 333, 333, 333, 611, 556, 278, 333, 333, 365, 556, 834, 834, 834, 611,
+        722, 722, 722, 722, 722, 722, 1000, 722, 667, 667, 667, 667, 278, 278, 278, 278,
+        722, 722, 778, 778, 778, 778, 778, 584, 778, 722, 722, 722, 722, 667, 667, 611,
+        556, 556, 556, 556, 556, 556, 889, 556, 556, 556, 556, 556, 278, 278, 278, 278,
+        611, 611, 611, 611, 611, 611, 611, 584, 611, 611, 611, 611, 611, 556, 611, 556,
+    ),
+}
+
+
+_CONTROL_TO_SPACE = bytes(32 if b < 32 else b for b in range(256))
+
+
+def encode(text: str) -> bytes:
+    """Text as it is written to the page: WinAnsi, control characters as spaces."""
+    return str(text).encode("cp1252", "replace").translate(_CONTROL_TO_SPACE)
+
+
+def string_width(text: str, font: str, size: float) -> float:
+    widths = _WIDTHS[font]
+    return sum(widths[b - 32] for b in encode(text)) * size / 1000
+
+
+def _escape(text: str) -> bytes:
+    return encode(text).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _num(v: float) -> str:
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+class StreamingCanvas:
+    def __init__(self, pagesize: Tuple[float, float] = A4, compress: bool = True):
+        self.width, self.height = pagesize
+        self.compress = compress
+        self._out: List[bytes] = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+        self._pos = len(self._out[0])
+        self._offsets: Dict[int, int] = {}
+        self._next_obj = _PAGES + 1
+        self._fonts: Dict[str, Tuple[str, int]] = {}  # base font -> (resource name, obj)
+        self._kids: List[int] = []
+        self._ops: List[bytes] = []
+        self._font = None
+        self._size = 12
+        self.setFont("Helvetica", 12)
+
+    # ---- low level ----
+    def _alloc(self) -> int:
+        n = self._next_obj
+        self._next_obj += 1
+        return n
+
+    def _write(self, data: bytes) -> None:
+        self._out.append(data)
+        self._pos += len(data)
+
+    def _object(self, num: int, body: bytes) -> None:
+        self._offsets[num] = self._pos
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+
+    def _stream(self, num: int, data: bytes) -> None:
+        if self.compress:
+            data = zlib.compress(data)
+            head = b"<< /Length %d /Filter /FlateDecode >>" % len(data)
+        else:
+            head = b"<< /Length %d >>" % len(data)
+        self._object(num, head + b"\nstream\n" + data + b"\nendstream")
+
+    # ---- canvas API ----
+    def setFont(self, name: str, size: float) -> None:
+        if name not in _WIDTHS:
+            raise ValueError(f"Unsupported font {name!r}; use one of {sorted(_WIDTHS)}")
+        if name not in self._fonts:
+            num = self._alloc()
+            self._fonts[name] = (f"F{len(self._fonts) + 1}", num)
+            self._object(num, (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>"
+            ).encode())
+        self._font, self._size = name, size
+
+    def stringWidth(self, text: str) -> float:
+        return string_width(text, self._font, self._size)
+
+    def drawString(self, x: float, y: float, text: str) -> None:
+        res = self._fonts[self._font][0]
+        self._ops.append(
+            b"BT /%s %s Tf %s %s Td (%s) Tj ET\n"
+            % (res.encode(), _num(self._size).encode(), _num(x).encode(), _num(y).encode(), _escape(text))
+        )
+
+    def drawRightString(self, x: float, y: float, text: str) -> None:
+        self.drawString(x - self.stringWidth(text), y, text)
+
+    def drawCentredString(self, x: float, y: float, text: str) -> None:
+        self.drawString(x - self.stringWidth(text) / 2, y, text)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        self._ops.append(("%s %s m %s %s l S\n" % tuple(_num(v) for v in (x1, y1, x2, y2))).encode())
+
+    def showPage(self) -> None:
+        content, page = self._alloc(), self._alloc()
+        self._stream(content, b"".join(self._ops))
+        fonts = " ".join(f"/{res} {num} 0 R" for res, num in self._fonts.values())
+        self._object(page, (
+            f"<< /Type /Page /Parent {_PAGES} 0 R /MediaBox [0 0 {_num(self.width)} {_num(self.height)}] "
+            f"/Resources << /Font << {fonts} >> >> /Contents {content} 0 R >>"
+        ).encode())
+        self._kids.append(page)
+        self._ops = []
+
+    # ---- output ----
+    def drain(self) -> bytes:
+        """Bytes produced since the last drain()."""
+        data = b"".join(self._out)
+        self._out = []
+        return data
+
+    def finish(self) -> bytes:
+        """Close the document (flushing a non-empty current page) and return the remaining bytes."""
+        if self._ops or not self._kids:
+            self.showPage()
+        kids = " ".join(f"{k} 0 R" for k in self._kids)
+        self._object(_PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode())
+        self._object(_CATALOG, f"<< /Type /Catalog /Pages {_PAGES} 0 R >>".encode())
+        xref_at = self._pos
+        lines = [b"xref\n0 %d\n0000000000 65535 f \n" % self._next_obj]
+        lines += [b"%010d 00000 n \n" % self._offsets[n] for n in range(1, self._next_obj)]
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self._next_obj, _CATALOG, xref_at))
+        return self.drain()
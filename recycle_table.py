@@ -0,0 +1,149 @@
+# recycle_table.py
+"""
+RecycleView version of scroll_1.ScrollableTable, for long ledgers.
+
+Same calls (add_row, clear, headers, col_widths) plus set_rows to load a whole
+ledger at once. Rows are kept as plain data; only the rows on screen (and a
+few spare) exist as widgets, and they are reused while scrolling. A row's
+height is measured once, when it is added, through text_measure's cache
+instead of a throwaway Label per cell. Since row widgets are reused, bind
+on_row_press(table, index, col) instead of binding to cells.
+"""
+from kivy.clock import Clock
+from kivy.effects.scroll import ScrollEffect
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+import text_measure
+from scroll_1 import BorderedCell
+
+ROW_HEIGHT = text_measure.ROW_HEIGHT
+SPACING = 2
+
+
+# ---------------- TableRow ----------------
+class TableRow(RecycleDataViewBehavior, BoxLayout):
+    """One on-screen row: a BorderedCell per column, refilled with whichever row scrolls into view."""
+
+    def __init__(self, **kwargs):
+        super().__init__(spacing=SPACING, **kwargs)
+        self.cells = []
+        self.index = None
+        self.table = None
+
+    def refresh_view_attrs(self, rv, index, data):
+        # data is {"texts": [...], "row_size": (None, h)}; the layout applies the size itself
+        self.index = index
+        self.table = rv.parent
+        if not self.cells:
+            for w in rv.col_widths:
+                cell = BorderedCell(col_width=w, size_hint_x=w)
+                cell.size_hint_y = 1
+                self.cells.append(cell)
+                self.add_widget(cell)
+        texts = data["texts"]
+        for i, cell in enumerate(self.cells):
+            cell.text = texts[i] if i < len(texts) else ""
+
+    def on_touch_down(self, touch):
+        if self.table is not None and self.index is not None:
+            for col, cell in enumerate(self.cells):
+                if cell.collide_point(*touch.pos):
+                    self.table.dispatch("on_row_press", self.index, col)
+                    return True
+        return super().on_touch_down(touch)
+
+
+class _TableBody(RecycleView):
+    def __init__(self, col_widths, **kwargs):
+        self.col_widths = col_widths
+        super().__init__(**kwargs)
+        layout = RecycleBoxLayout(
+            orientation="vertical", spacing=SPACING, size_hint_y=None,
+            default_size=(None, ROW_HEIGHT), default_size_hint=(1, None), key_size="row_size",
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+        # viewclass is stored on the layout manager, so it can only be set once there is one
+        self.viewclass = TableRow
+
+
+# ---------------- RecycleTable ----------------
+class RecycleTable(BoxLayout):
+    """
+    Drop-in for ScrollableTable. The header row stays put above the rows;
+    clear() keeps it. add_row calls made in one frame are added to the view
+    together, so filling the table row by row stays linear.
+    """
+    __events__ = ("on_row_press",)
+
+    def __init__(self, cols=6, headers=None, col_widths=None, **kwargs):
+        super().__init__(orientation="vertical", spacing=SPACING, **kwargs)
+        self.cols = cols
+        self.col_widths = list(col_widths) if col_widths else [100] * cols
+        self._pending = []
+        self._flush_trigger = Clock.create_trigger(self._flush)
+
+        if headers:
+            head = BoxLayout(size_hint_y=None, height=ROW_HEIGHT, spacing=SPACING)
+            for i, h in enumerate(headers):
+                w = self.col_widths[i] if i < len(self.col_widths) else 100
+                head.add_widget(BorderedCell(text=h, bold=True, col_width=w, header=True, size_hint_x=w))
+            self.add_widget(head)
+
+        self.body = _TableBody(
+            self.col_widths, do_scroll_x=False, bar_width=10, scroll_type=["bars", "content"], effect_cls=ScrollEffect,
+        )
+        self.add_widget(self.body)
+
+    def row_height(self, texts):
+        """Height that fits the tallest wrapped cell of a row (never below ROW_HEIGHT)."""
+        return text_measure.row_height(texts, self.col_widths)
+
+    def _row_data(self, row_items):
+        texts = [str(item) for item in row_items]
+        return {"texts": texts, "row_size": (None, self.row_height(texts))}
+
+    def add_row(self, row_items):
+        self._pending.append(self._row_data(row_items))
+        self._flush_trigger()
+
+    def _flush(self, *args):
+        if self._pending:
+            self.body.data.extend(self._pending)
+            self._pending = []
+
+    def set_rows(self, rows):
+        """Replace every row at once (one relayout, however many rows)."""
+        self._pending = []
+        self.body.data = [self._row_data(row) for row in rows]
+
+    def clear(self):
+        self._pending = []
+        self.body.data = []
+
+    @property
+    def row_count(self):
+        return len(self.body.data) + len(self._pending)
+
+    def on_row_press(self, index, col):
+        """A cell of row `index` (0-based, headers not counted) was touched."""
+
+
+if __name__ == "__main__":
+    from kivy.app import App
+
+    class _DemoApp(App):
+        def build(self):
+            table = RecycleTable(
+                cols=6, headers=["S#", "Date", "Details", "Amount/hour", "Deposit", "Pending"],
+                col_widths=[50, 100, 200, 90, 90, 90],
+            )
+            table.set_rows(
+                [i + 1, f"2024-01-{i % 28 + 1:02d}", "site visit " * (i % 6), 100, 50, -50] for i in range(2000)
+            )
+            return table
+
+    _DemoApp().run()
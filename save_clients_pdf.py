@@ -1,7 +1,7 @@
 import os
 import sys
 
-from fpdf import FPDF
+import pdf_render
 
 # Determine platform
 def get_platform():
@@ -16,16 +16,6 @@ def get_platform():
 
 platform = get_platform()
 
-# Try to import ReportLab (desktop only)
-HAS_REPORTLAB = False
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-    HAS_REPORTLAB = True
-except Exception:
-    HAS_REPORTLAB = False
-
 # --- Storage helpers ---
 def app_private_path():
     """Return app-private storage path cross-platform."""
@@ -49,55 +39,9 @@ def safe_filename(name: str) -> str:
     """Sanitize filename for filesystem safety."""
     return "".join(c if c.isalnum() or c in "._- " else "_" for c in name)
 
-# --- FPDF implementation ---
-def _save_with_fpdf(clients, out_path):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 10, "Clients List", ln=1, align="C")
-    pdf.ln(5)
-
-    # Table headers
-    headers = ["Sr", "Name", "Mobile"]
-    col_w = [15, 80, 60]
-
-    pdf.set_font("Helvetica", "B", 11)
-    for i, h in enumerate(headers):
-        pdf.cell(col_w[i], 8, h, border=1, align="C")
-    pdf.ln(8)
-
-    # Table rows
-    pdf.set_font("Helvetica", "", 10)
-    for idx, (mobile, data_client) in enumerate(clients.items(), 1):
-        row = [str(idx), data_client.get("name", ""), mobile]
-        for i, c in enumerate(row):
-            pdf.cell(col_w[i], 8, str(c), border=1, align="C")
-        pdf.ln(8)
-
-    pdf.output(out_path)
-
-# --- ReportLab implementation ---
-def _save_with_reportlab(clients, out_path):
-    doc = SimpleDocTemplate(out_path, pagesize=A4)
-    elements = []
-
-    data = [["Sr", "Name", "Mobile"]]
-    for i, (mobile, data_client) in enumerate(clients.items(), 1):
-        data.append([str(i), data_client.get("name", ""), mobile])
-
-    table = Table(data, colWidths=[40, 200, 100])
-    style = TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.darkblue),
-        ('TEXTCOLOR',(0,0),(-1,0),colors.whitesmoke),
-        ('ALIGN',(0,0),(-1,-1),'CENTER'),
-        ('VALIGN',(0,0),(-1,-1),'MIDDLE'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-    ])
-    table.setStyle(style)
-    elements.append(table)
-
-    doc.build(elements)
+# --- Rendering (shared layout, see pdf_render) ---
+def _clients_spec(clients):
+    return pdf_render.clients_spec((data_client.get("name", ""), mobile) for mobile, data_client in clients.items())
 
 # --- Public API ---
 def save_clients_as_pdf(clients, filename="Clients_List.pdf", save_to_downloads=False):
@@ -118,10 +62,7 @@ def save_clients_as_pdf(clients, filename="Clients_List.pdf", save_to_downloads=
         out_path = os.path.join(out_dir, filename)
 
     try:
-        if HAS_REPORTLAB and platform != "android":
-            _save_with_reportlab(clients, out_path)
-        else:
-            _save_with_fpdf(clients, out_path)
+        pdf_render.write_pdf(out_path, _clients_spec(clients))
         print(f"PDF saved successfully: {out_path}")
         return out_path
     except Exception as e:
@@ -6,6 +6,8 @@ from kivy.graphics import Color, Rectangle, Line
 from kivy.properties import NumericProperty
 from kivy.effects.scroll import ScrollEffect
 
+import text_measure
+
 # ---------------- BorderedCell ----------------
 class BorderedCell(Label):
     row_height = NumericProperty(40)
@@ -60,14 +62,8 @@ class ScrollableTable(ScrollView):
                 self.layout.add_widget(BorderedCell(text=h, bold=True, col_width=w, header=True))
 
     def add_row(self, row_items):
-        max_height = 40
-        for i, item in enumerate(row_items):
-            temp_label = Label(text=str(item), text_size=(self.col_widths[i]-10,None),
-                               size_hint_y=None, halign="center", valign="middle")
-            temp_label.texture_update()
-            cell_height = temp_label.texture_size[1]+20
-            if cell_height>max_height:
-                max_height = cell_height
+        # cached per (text, width); numeric cells are not rasterised at all
+        max_height = text_measure.row_height([str(item) for item in row_items], self.col_widths)
         for i, item in enumerate(row_items):
             cell = BorderedCell(text=str(item), col_width=self.col_widths[i], row_height=max_height)
             self.layout.add_widget(cell)
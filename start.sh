@@ -1,3 +1,3 @@
 #!/bin/bash
+flask --app app db-upgrade
 gunicorn app:app --bind 0.0.0.0:$PORT
-
@@ -0,0 +1,157 @@
+# statements.py
+"""
+Month-end statement run: every client's ledger PDF for one owner.
+
+Clients (with their stored totals) and all of their entries are read with
+two set-based queries; the entry query streams in (client_id, date, id) order
+so one client's rows are grouped at a time. A run for a period (from/to)
+reads only the entries dated in it and starts each statement at the balance
+brought forward, taken from the monthly rollups. Statements are rendered in
+export_jobs' process pool (started once per web worker, EXPORT_WORKERS
+processes) with a bounded number in flight and written into a ZIP that is
+streamed as it fills, so neither the rows nor the PDFs pile up in memory.
+
+A merged single PDF is also available; it draws every statement onto one
+streaming PDF in order, which is serial but just as memory-flat.
+"""
+import itertools
+import os
+import re
+import zipfile
+from collections import deque, namedtuple
+from datetime import date
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+import export_jobs
+import logic
+import pdf_render
+from logic import Client, ClientBalance, LedgerEntry
+
+# statements rendering at once in the shared pool; 1 renders them in the request instead
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", "0")) or export_jobs.EXPORT_WORKERS
+FETCH_BATCH = 5000
+
+StatementClient = namedtuple("StatementClient", "id name mobile")
+StatementRow = namedtuple("StatementRow", "date details amount_per_hour deposit pending")
+
+
+# -------------------- Fetching --------------------
+def iter_statements(owner_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Yield (client, totals, rows) for each of an owner's clients, ordered by client id."""
+    period = date_from is not None or date_to is not None
+    openings = logic.get_opening_balances(owner_id, date_from) if date_from is not None else {}
+    db = logic.SessionLocal()
+    try:
+        clients = db.execute(
+            select(
+                Client.id, Client.name, Client.mobile,
+                ClientBalance.amount_per_hour, ClientBalance.deposit, ClientBalance.pending,
+            )
+            .outerjoin(ClientBalance, ClientBalance.client_id == Client.id)
+            .where(Client.owner_id == owner_id)
+            .order_by(Client.id)
+        ).all()
+        entries = (
+            select(
+                LedgerEntry.client_id, LedgerEntry.date, LedgerEntry.details,
+                LedgerEntry.amount_per_hour, LedgerEntry.deposit, LedgerEntry.pending,
+            )
+            .join(Client, Client.id == LedgerEntry.client_id)
+            .where(Client.owner_id == owner_id)
+            .order_by(LedgerEntry.client_id, LedgerEntry.date, LedgerEntry.id)
+        )
+        entries = db.execute(logic._in_period(entries, date_from, date_to).execution_options(yield_per=FETCH_BATCH))
+        groups = itertools.groupby(entries, key=lambda r: r[0])
+        group = next(groups, None)
+        for cid, name, mobile, aph, dep, pend in clients:
+            rows: List[StatementRow] = []
+            if group is not None and group[0] == cid:
+                rows = [StatementRow(*r[1:]) for r in group[1]]
+                group = next(groups, None)
+            if period:
+                totals = logic.compute_totals(rows)
+                if date_from is not None:
+                    totals["opening"] = openings.get(cid, 0)
+            elif aph is None:  # no balance row yet
+                totals = logic.compute_totals(rows)
+            else:
+                totals = {"amount_per_hour": aph, "deposit": dep, "pending": pend}
+            yield StatementClient(cid, name, mobile), totals, rows
+    finally:
+        db.close()
+
+
+# -------------------- Rendering -------------------
+def render_statement(client: StatementClient, totals: dict, rows: List[StatementRow],
+                     date_from: Optional[date] = None, date_to: Optional[date] = None) -> bytes:
+    """One client's statement as PDF bytes; runs in a pool process."""
+    return b"".join(logic.stream_ledger_pdf(client, totals, rows, date_from, date_to))
+
+
+def statement_filename(client: StatementClient) -> str:
+    name = re.sub(r"[^\w.-]+", "_", client.name).strip("_") or "client"
+    return f"{client.id:05d}_{name}.pdf"
+
+
+class _ZipSink:
+    """Write-only file object that hands back what zipfile wrote since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _rendered(owner_id: int, workers: int, date_from: Optional[date] = None,
+              date_to: Optional[date] = None) -> Iterator[tuple]:
+    """(client, pdf_bytes) in client order, rendering up to a few statements per worker ahead."""
+    statements = iter_statements(owner_id, date_from, date_to)
+    if workers <= 1:
+        for client, totals, rows in statements:
+            yield client, render_statement(client, totals, rows, date_from, date_to)
+        return
+    # the export jobs' pool lives as long as the web worker, so a run does not start processes of its own
+    pool = export_jobs._pool()
+    in_flight = deque()
+    for client, totals, rows in statements:
+        in_flight.append((client, pool.submit(render_statement, client, totals, rows, date_from, date_to)))
+        if len(in_flight) >= workers * 4:
+            done_client, future = in_flight.popleft()
+            yield done_client, future.result()
+    while in_flight:
+        done_client, future = in_flight.popleft()
+        yield done_client, future.result()
+
+
+def zip_chunks(owner_id: int, workers: Optional[int] = None, date_from: Optional[date] = None,
+               date_to: Optional[date] = None) -> Iterator[bytes]:
+    """Stream a ZIP with one statement PDF per client."""
+    sink = _ZipSink()
+    # PDF content streams are already deflated: store them as they are
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for client, pdf in _rendered(owner_id, workers or STATEMENT_WORKERS, date_from, date_to):
+            zf.writestr(statement_filename(client), pdf)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def merged_chunks(owner_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Iterator[bytes]:
+    """Stream one PDF holding every client's statement, each starting on a new page."""
+    period = logic.period_label(date_from, date_to)
+    specs = (
+        logic.ledger_pdf_spec(client, rows, totals, period)
+        for client, totals, rows in iter_statements(owner_id, date_from, date_to)
+    )
+    return pdf_render.iter_pdf(specs, backend="stream")
@@ -35,3 +35,62 @@ document.addEventListener('DOMContentLoaded', () => {
         banner.classList.toggle('blink', glow);
     }, 1200); // blink every 1.2 seconds
 });
+
+// === CLIENT TYPE-AHEAD (dashboard search) ===
+document.addEventListener('DOMContentLoaded', () => {
+    const input = document.querySelector('input[data-suggest]');
+    if (!input) return;
+    const list = input.closest('form').querySelector('.suggest');
+    let timer = null;
+    let seq = 0;
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        const q = input.value.trim();
+        if (!q) { list.hidden = true; return; }
+        timer = setTimeout(async () => {
+            const mine = ++seq;
+            const res = await fetch(`${input.dataset.suggest}?q=${encodeURIComponent(q)}&limit=8`);
+            if (!res.ok || mine !== seq) return;  // drop stale responses
+            const items = await res.json();
+            list.innerHTML = '';
+            items.forEach(c => {
+                const li = document.createElement('li');
+                const a = document.createElement('a');
+                a.href = `/ledger/${c.id}`;
+                a.textContent = `${c.name} (${c.mobile})`;
+                li.appendChild(a);
+                list.appendChild(li);
+            });
+            list.hidden = items.length === 0;
+        }, 150);
+    });
+});
+
+// === BACKGROUND PDF EXPORT ("Prepare PDF") ===
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('button[data-prepare-pdf]').forEach(btn => {
+        const label = btn.textContent;
+        btn.addEventListener('click', async () => {
+            btn.disabled = true;
+            btn.textContent = 'Preparing…';
+            try {
+                let res = await fetch(btn.dataset.preparePdf, { method: 'POST' });
+                let job = await res.json();
+                while (job.status === 'queued' || job.status === 'running') {
+                    await new Promise(r => setTimeout(r, 1000));
+                    job = await (await fetch(job.status_url)).json();
+                }
+                if (job.download_url) {
+                    location.href = job.download_url;
+                    btn.textContent = label;
+                } else {
+                    btn.textContent = `Failed: ${job.error || 'try again'}`;
+                }
+            } catch (err) {
+                btn.textContent = 'Failed: try again';
+            }
+            btn.disabled = false;
+        });
+    });
+});
@@ -0,0 +1,50 @@
+# tests/conftest.py
+"""
+Shared fixtures. logic.py builds its engine from DATABASE_URL at import
+time, so the test database is chosen here before anything imports it:
+a scratch SQLite file, migrated once per run. Tests do not clean up after
+themselves; each gets its own owner (and clients) instead.
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ledger-tests-"), "ledger.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logic  # noqa: E402
+import migrations  # noqa: E402
+
+_seq = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrations.upgrade(echo=lambda _: None)
+
+
+@pytest.fixture
+def owner():
+    n = next(_seq)
+    return logic.create_user(f"Owner {n}", f"0300{n:07d}", f"owner{n}@example.com", "x").id
+
+
+@pytest.fixture
+def client_id(owner):
+    return logic.create_client(owner, "Client", f"0311{next(_seq):07d}").id
+
+
+@pytest.fixture
+def web(owner):
+    """Flask test client logged in as `owner`."""
+    import app
+
+    app.app.config["TESTING"] = True
+    c = app.app.test_client()
+    with c.session_transaction() as s:
+        s["user_id"] = owner
+        s["user_name"] = "Owner"
+    return c
@@ -0,0 +1,116 @@
+"""The JSON API: compact rows, signed cursors, gzip, and the step-up password on entry edits/deletes."""
+import gzip
+import itertools
+from decimal import Decimal
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app
+import logic
+
+_seq = itertools.count(1)
+
+
+CHEAP = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Test client logged in through POST /api/v1/login, with the user's id."""
+    monkeypatch.setattr(app, "PASSWORD_HASH_METHOD", CHEAP)
+    monkeypatch.setattr(app, "_hash_params", {})
+    n = next(_seq)
+    email = f"api{n}@example.com"
+    user = logic.create_user(f"Api {n}", f"0388{n:07d}", email, generate_password_hash("pw", method=CHEAP))
+    app.app.config["TESTING"] = True
+    c = app.app.test_client()
+    resp = c.post("/api/v1/login", json={"email": email, "password": "pw"})
+    assert resp.get_json()["user"]["id"] == user.id
+    c.user_id = user.id
+    return c
+
+
+def test_login_and_auth_errors():
+    c = app.app.test_client()
+    assert c.get("/api/v1/clients").status_code == 401
+    resp = c.post("/api/v1/login", json={"email": "nobody@example.com", "password": "x"})
+    assert resp.status_code == 401 and resp.get_json() == {"error": "Invalid email or password."}
+
+
+def test_clients_pages_with_cursors(api):
+    names = [f"Client {i:02d}" for i in range(5)]
+    ids = [logic.create_client(api.user_id, name, f"0377{api.user_id:04d}{i:03d}").id for i, name in enumerate(names)]
+    seen, cursor = [], None
+    while True:
+        body = api.get("/api/v1/clients", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})}).get_json()
+        assert body["fields"] == ["id", "name", "mobile"]
+        seen += body["rows"]
+        cursor = body["next"]
+        if cursor is None:
+            break
+    assert [r[:2] for r in seen] == [[i, n] for i, n in zip(ids, names)]
+    assert api.get("/api/v1/clients", query_string={"cursor": "forged"}).status_code == 400
+
+    found = api.get("/api/v1/clients", query_string={"q": "client 03"}).get_json()
+    assert [r[1] for r in found["rows"]] == ["Client 03"] and found["next"] is None
+
+
+def test_entries_page_forward_and_back(api):
+    cid = logic.create_client(api.user_id, "Ann", f"0366{api.user_id:07d}").id
+    for day in range(1, 6):
+        logic.add_ledger_entry(cid, f"2024-01-0{day}", f"e{day}", "1", "0")
+    url = f"/api/v1/clients/{cid}/entries"
+
+    first = api.get(url, query_string={"limit": 2}).get_json()
+    assert first["fields"] == ["id", "date", "details", "amount_per_hour", "deposit", "pending", "balance"]
+    assert [r[2] for r in first["rows"]] == ["e1", "e2"] and first["prev"] is None
+    assert first["rows"][1][3:] == ["1.00", "0.00", "-1.00", "-2.00"]
+    second = api.get(url, query_string={"limit": 2, "cursor": first["next"]}).get_json()
+    assert [r[2] for r in second["rows"]] == ["e3", "e4"]
+    assert (second["start"], second["opening"], second["rows"][-1][-1]) == (3, "-2.00", "-4.00")
+    back = api.get(url, query_string={"limit": 2, "cursor": second["prev"]}).get_json()
+    assert back["rows"] == first["rows"]
+
+    last = api.get(url, query_string={"limit": 2, "page": "last"}).get_json()
+    assert [r[2] for r in last["rows"]] == ["e4", "e5"] and last["next"] is None
+    assert (last["start"], last["opening"], last["closing"]) == (4, "-3.00", "-5.00")
+
+
+def test_large_bodies_are_gzipped(api, monkeypatch):
+    cid = logic.create_client(api.user_id, "Ann", f"0355{api.user_id:07d}").id
+    for day in range(1, 29):
+        logic.add_ledger_entry(cid, f"2024-02-{day:02d}", "x" * 40, "1", "0")
+    url = f"/api/v1/clients/{cid}/entries"
+
+    small = api.get(f"/api/v1/clients/{cid}/totals", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    plain = api.get(url)
+    assert "Content-Encoding" not in plain.headers and len(plain.data) >= app.API_GZIP_MIN_BYTES
+    zipped = api.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in zipped.headers["Vary"]
+    assert gzip.decompress(zipped.data) == plain.data
+
+    monkeypatch.setattr(app, "API_GZIP_MIN_BYTES", len(plain.data) + 1)
+    assert "Content-Encoding" not in api.get(url, headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_add_update_delete_entry(api):
+    cid = logic.create_client(api.user_id, "Ann", f"0344{api.user_id:07d}").id
+    added = api.post(f"/api/v1/clients/{cid}/entries", json={"date": "2024-03-01", "details": "a",
+                                                            "amount_per_hour": "10", "deposit": "2.5"})
+    assert added.status_code == 201
+    eid = added.get_json()["entry"][0]
+    assert added.get_json()["totals"]["pending"] == "-7.50"
+    assert api.post(f"/api/v1/clients/{cid}/entries", json={"date": "01/03/2024"}).status_code == 400
+    url = f"/api/v1/clients/{cid}/entries/{eid}"
+
+    assert api.patch(url, json={"deposit": "10"}).status_code == 403
+    assert api.patch(url, json={"deposit": "10", "current_password": "nope"}).status_code == 403
+    assert logic.get_ledger_entry(eid).deposit == Decimal("2.5")
+    updated = api.patch(url, json={"deposit": "10", "current_password": "pw"}).get_json()
+    assert updated["entry"][1:] == ["2024-03-01", "a", "10.00", "10.00", "0.00"]
+
+    # the confirmation above opened the re-auth window for the delete
+    assert api.delete(url).get_json()["totals"]["entry_count"] == 0
+    assert api.delete(url).status_code == 404
@@ -0,0 +1,43 @@
+"""client_balances kept up by the entry mutators, and the drift check behind `balances-verify`."""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import update
+
+import logic
+
+
+def _drift(client_id):
+    return [d for d in logic.verify_client_balances() if d["client_id"] == client_id]
+
+
+def test_mutations_keep_balances_in_step(client_id):
+    e = logic.add_ledger_entry(client_id, "2024-01-01", "a", "10.10", "0")
+    logic.add_ledger_entry(client_id, "2024-01-02", "b", "0", "4.05")
+    logic.add_ledger_entries_bulk(client_id, [
+        {"date": date(2024, 2, 1), "details": "bulk", "amount_per_hour": Decimal("1.01"), "deposit": Decimal(0)},
+    ] * 3)
+    logic.update_ledger_entry(e.id, "2024-01-01", "a", "20", "1")
+    assert _drift(client_id) == []
+    totals = logic.get_client_totals(client_id)
+    assert (totals["amount_per_hour"], totals["deposit"], totals["entry_count"]) == (
+        Decimal("23.03"), Decimal("5.05"), 5)
+    assert totals["pending"] == totals["deposit"] - totals["amount_per_hour"]
+
+    logic.delete_ledger_entry(e.id)
+    assert _drift(client_id) == []
+
+
+def test_drift_is_reported_and_recomputed(client_id):
+    logic.add_ledger_entry(client_id, "2024-01-01", "a", "10", "2")
+    with logic.SessionLocal() as db:
+        db.execute(update(logic.ClientBalance).where(logic.ClientBalance.client_id == client_id)
+                   .values(pending=Decimal(99), entry_count=7))
+        db.commit()
+
+    [drift] = _drift(client_id)
+    assert drift["stored"][2:] == (Decimal(99), 7)
+    assert drift["actual"] == (Decimal(10), Decimal(2), Decimal(-8), 1)
+
+    assert logic.recompute_client_balances([client_id]) == 1
+    assert _drift(client_id) == []
@@ -0,0 +1,53 @@
+"""Conditional GETs of the ledger and client list: 304 while the data is unchanged, a full page after any change."""
+import logic
+
+
+def _revalidate(web, url, resp):
+    return web.get(url, headers={"If-None-Match": resp.headers["ETag"]})
+
+
+def test_ledger_etag_follows_its_entries(web, owner, client_id):
+    url = f"/ledger/{client_id}"
+    e = logic.add_ledger_entry(client_id, "2024-01-01", "a", "1", "0")
+    first = web.get(url)
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+    assert _revalidate(web, url, first).status_code == 304
+    assert web.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+    logic.update_ledger_entry(e.id, "2024-01-01", "b", "1", "0")
+    changed = _revalidate(web, url, first)
+    assert changed.status_code == 200 and b">b<" in changed.data
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+    # another client's entry leaves this ledger's ETag alone
+    other = logic.create_client(owner, "Other", f"0319{owner:07d}").id
+    logic.add_ledger_entry(other, "2024-01-01", "x", "1", "0")
+    assert _revalidate(web, url, changed).status_code == 304
+
+
+def test_etag_covers_url_and_user(web, owner, client_id):
+    url = f"/ledger/{client_id}"
+    first = web.get(url)
+    assert _revalidate(web, url + "?page=last", first).status_code == 200
+    with web.session_transaction() as s:
+        s["user_id"] = logic.create_user("Two", f"0396{owner:07d}", f"two{owner}@example.com", "x").id
+    assert _revalidate(web, url, first).status_code == 302  # not their client: no 304 for it
+
+
+def test_flash_messages_always_render(web, client_id):
+    url = f"/ledger/{client_id}"
+    first = web.get(url)
+    with web.session_transaction() as s:
+        s["_flashes"] = [("success", "Entry updated.")]
+    resp = _revalidate(web, url, first)
+    assert resp.status_code == 200 and b"Entry updated." in resp.data
+
+
+def test_client_list_etag_follows_the_owner_clients(web, owner):
+    c = logic.create_client(owner, "Ann", f"0318{owner:07d}")
+    first = web.get("/clients")
+    assert _revalidate(web, "/clients", first).status_code == 304
+    logic.add_ledger_entry(c.id, "2024-01-01", "entries do not show in the list", "1", "0")
+    assert _revalidate(web, "/clients", first).status_code == 304
+    logic.update_client(owner, c.id, "Annie", c.mobile)
+    assert _revalidate(web, "/clients", first).status_code == 200
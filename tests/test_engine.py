@@ -0,0 +1,40 @@
+"""Engine setup: DATABASE_URL spellings and the per-connection SQLite pragmas."""
+import pytest
+from sqlalchemy import text
+
+import logic
+
+
+def test_postgres_urls_are_normalized():
+    assert logic._normalize_url("postgres://u:p@h/db") == "postgresql://u:p@h/db"
+    assert logic._normalize_url("postgresql://u:p@h/db") == "postgresql://u:p@h/db"
+    assert logic._normalize_url("sqlite:///x.db") == "sqlite:///x.db"
+
+
+def test_sqlite_connections_are_tuned(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "1234")
+    monkeypatch.setenv("SQLITE_CACHE_KB", "4000")
+    engine = logic.make_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    try:
+        with engine.connect() as conn:
+            pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == 1234
+            assert pragma("cache_size") == -4000
+            assert pragma("temp_store") == 2  # MEMORY
+    finally:
+        engine.dispose()
+
+
+def test_server_pool_settings_come_from_the_environment(monkeypatch):
+    pytest.importorskip("psycopg2")
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "4")
+    engine = logic.make_engine("postgres://u:p@localhost/none")
+    assert engine.url.drivername.startswith("postgresql")
+    assert (engine.pool.size(), engine.pool._max_overflow, engine.pool._pre_ping) == (3, 4, True)
+
+
+def test_tests_run_on_the_database_url():
+    assert str(logic.engine.url).endswith("ledger.db") and "ledger-tests-" in str(logic.engine.url)
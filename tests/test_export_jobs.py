@@ -0,0 +1,72 @@
+"""Background PDF exports in inline mode: prepare, poll, download, and the failure paths."""
+import os
+
+import pytest
+
+import export_jobs
+import logic
+import pdf_cache
+
+
+@pytest.fixture(autouse=True)
+def inline(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_jobs, "INLINE", True)
+    monkeypatch.setattr(pdf_cache, "CACHE_DIR", str(tmp_path))
+
+
+def test_prepare_poll_download(web, client_id):
+    logic.add_ledger_entry(client_id, "2024-01-01", "a", "1", "0")
+    resp = web.post(f"/ledger/{client_id}/pdf/prepare")
+    assert resp.status_code == 202
+    job = resp.get_json()
+    assert job["status"] == "done" and resp.headers["Location"] == job["status_url"]
+
+    polled = web.get(job["status_url"]).get_json()
+    assert polled["status"] == "done" and polled["finished_at"]
+    pdf = web.get(polled["download_url"])
+    assert pdf.status_code == 200 and pdf.data.startswith(b"%PDF")
+    assert "ledger_Client.pdf" in pdf.headers["Content-Disposition"]
+    # the job's cache entry is the one the direct download route uses
+    assert web.get(f"/ledger/{client_id}/pdf").headers["ETag"] == pdf.headers["ETag"]
+
+
+def test_clients_export(web):
+    job = web.post("/clients/pdf/prepare").get_json()
+    assert web.get(job["download_url"]).data.startswith(b"%PDF")
+
+
+def test_queued_job_is_not_downloadable_and_times_out(web, owner, monkeypatch):
+    job = logic.create_export_job(owner, "clients", None, "clients.pdf")
+    assert web.get(f"/exports/{job.id}").get_json()["status"] == "queued"
+    assert web.get(f"/exports/{job.id}/download").status_code == 409
+
+    monkeypatch.setattr(export_jobs, "JOB_TIMEOUT", -1)
+    polled = web.get(f"/exports/{job.id}").get_json()
+    assert (polled["status"], polled["error"]) == ("failed", "Timed out")
+    assert "download_url" not in polled
+
+
+def test_failed_render_is_reported(web, owner, client_id, monkeypatch):
+    def boom(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(export_jobs, "render_to_cache", boom)
+    job = web.post(f"/ledger/{client_id}/pdf/prepare").get_json()
+    assert (job["status"], job["error"]) == ("failed", "disk full")
+    assert export_jobs.status(owner, job["id"])["status"] == "failed"
+
+
+def test_download_after_eviction_is_gone(web, tmp_path):
+    job = web.post("/clients/pdf/prepare").get_json()
+    for name in os.listdir(tmp_path):
+        os.unlink(tmp_path / name)
+    assert web.get(job["download_url"]).status_code == 410
+
+
+def test_jobs_belong_to_their_owner(web, owner, client_id):
+    job = web.post(f"/ledger/{client_id}/pdf/prepare").get_json()
+    assert export_jobs.status(owner + 10_000, job["id"]) is None
+    assert web.post(f"/ledger/{client_id + 10_000}/pdf/prepare").status_code == 404
+    assert web.get("/exports/nope").status_code == 404
+    with pytest.raises(ValueError):
+        export_jobs.submit(owner, "bogus")
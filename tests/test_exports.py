@@ -0,0 +1,56 @@
+"""Streamed CSV/NDJSON exports of one client's ledger or a whole book."""
+import csv
+import io
+import json
+
+import pytest
+
+import ledger_io
+import logic
+
+
+@pytest.fixture
+def book(owner):
+    ann = logic.create_client(owner, "Ann", f"0312{owner:07d}").id
+    bob = logic.create_client(owner, "Bob", f"0313{owner:07d}").id
+    logic.add_ledger_entry(ann, "2024-01-02", "second", "0.10", "0")
+    logic.add_ledger_entry(ann, "2024-01-01", "first, with comma", "10", "0.20")
+    logic.add_ledger_entry(bob, "2024-01-01", "bob", "1", "1")
+    return ann, bob
+
+
+def test_csv_chunks_start_with_the_header_and_batch_rows():
+    rows = [(1, "A", "1", i, "2024-01-01", "d", 1, 0, -1) for i in range(5)]
+    chunks = list(ledger_io.csv_chunks(iter(rows), rows_per_chunk=2))
+    assert chunks[0] == ",".join(ledger_io.EXPORT_FIELDS) + "\r\n"
+    assert [c.count("\n") for c in chunks[1:]] == [2, 2, 1]
+    assert list(ledger_io.ndjson_chunks(iter([]))) == []
+
+
+def test_book_csv_in_client_then_ledger_order(web, book):
+    ann, bob = book
+    resp = web.get("/clients/export.csv")
+    assert resp.mimetype == "text/csv" and 'filename="ledger_book.csv"' in resp.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [(int(r["client_id"]), r["details"]) for r in rows] == [
+        (ann, "first, with comma"), (ann, "second"), (bob, "bob")]
+    assert (rows[0]["amount_per_hour"], rows[0]["deposit"], rows[0]["pending"]) == ("10.00", "0.20", "-9.80")
+
+
+def test_client_ndjson_keeps_cents_exact(web, book):
+    ann, _ = book
+    resp = web.get(f"/ledger/{ann}/export.ndjson")
+    assert resp.mimetype == "application/x-ndjson"
+    recs = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r["details"] for r in recs] == ["first, with comma", "second"]
+    assert recs[1]["amount_per_hour"] == "0.10" and recs[1]["pending"] == "-0.10"
+    assert {r["client_name"] for r in recs} == {"Ann"}
+
+
+def test_exports_stay_inside_the_owner_book(web, book, owner):
+    other = logic.create_user("Other", f"0398{owner:07d}", f"other{owner}@example.com", "x").id
+    assert list(ledger_io.iter_export_rows(other)) == []
+    assert web.get(f"/ledger/{book[0] + 10_000}/export.csv").location.endswith("/dashboard")
+    with web.session_transaction() as s:
+        s.clear()
+    assert web.get("/clients/export.csv").status_code == 302
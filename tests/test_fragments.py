@@ -0,0 +1,72 @@
+"""Cached table bodies: a repeat view reuses the rendered rows, any change renders them again."""
+import pytest
+
+import app
+import logic
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Templates rendered through the fragment cache, by name."""
+    calls = []
+    real = app._render_fragment
+    monkeypatch.setattr(app, "_render_fragment", lambda template, **ctx: calls.append(template) or real(template, **ctx))
+    return calls
+
+
+def test_ledger_rows_are_reused_until_an_entry_changes(web, client_id, builds):
+    e = logic.add_ledger_entry(client_id, "2024-01-01", "first version", "1", "0")
+    assert b"first version" in web.get(f"/ledger/{client_id}").data
+    assert b"first version" in web.get(f"/ledger/{client_id}").data
+    assert builds == ["_ledger_rows.html"]
+
+    logic.update_ledger_entry(e.id, "2024-01-01", "second version", "1", "0")
+    page = web.get(f"/ledger/{client_id}").data
+    assert b"second version" in page and b"first version" not in page
+    assert builds == ["_ledger_rows.html"] * 2
+
+    logic.add_ledger_entry(client_id, "2024-01-02", "another", "1", "0")
+    assert b"another" in web.get(f"/ledger/{client_id}").data
+    logic.delete_ledger_entry(e.id)
+    assert b"second version" not in web.get(f"/ledger/{client_id}").data
+    assert builds == ["_ledger_rows.html"] * 4
+
+
+def test_edit_form_shares_the_ledger_rows(web, client_id, builds):
+    e = logic.add_ledger_entry(client_id, "2024-01-01", "a", "1", "0")
+    web.get(f"/ledger/{client_id}")
+    assert web.get(f"/ledger/{client_id}/entry/{e.id}/edit").status_code == 200
+    assert builds == ["_ledger_rows.html"]
+
+
+def test_periods_and_pages_are_cached_apart(web, client_id, builds):
+    logic.add_ledger_entry(client_id, "2024-01-01", "january", "1", "0")
+    logic.add_ledger_entry(client_id, "2024-02-01", "february", "1", "0")
+    feb = web.get(f"/ledger/{client_id}?from=2024-02-01").data
+    assert b"february" in feb and b"january" not in feb and b"Brought forward" in feb
+    assert b"january" in web.get(f"/ledger/{client_id}").data
+    assert len(builds) == 2
+
+
+def test_client_rows_are_reused_until_the_list_changes(web, owner, builds):
+    logic.create_client(owner, "Ann", f"0322{owner:07d}")
+    web.get("/clients")
+    web.get("/clients")
+    assert builds == ["_client_rows.html"]
+    c = logic.create_client(owner, "Bob", f"0323{owner:07d}")
+    assert b"Bob" in web.get("/clients").data
+    logic.update_client(owner, c.id, "Robert", c.mobile)
+    page = web.get("/clients").data
+    assert b"Robert" in page and b"Bob" not in page
+    assert builds == ["_client_rows.html"] * 3
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(app, "FRAGMENT_CACHE_SIZE", 2)
+    monkeypatch.setattr(app, "_fragments", type(app._fragments)())
+    for key in "abc":
+        app._cached_fragment(key, lambda key=key: key.upper())
+    assert list(app._fragments) == ["b", "c"]
+    assert app._cached_fragment("b", lambda: pytest.fail("rebuilt a cached fragment")) == "B"
+    app._cached_fragment("d", lambda: "D")
+    assert list(app._fragments) == ["b", "d"]
@@ -0,0 +1,100 @@
+"""Bulk import: CSV, NDJSON and the legacy Kivy JSON, bad rows reported by line, balances kept exact."""
+import io
+import json
+from datetime import date
+from decimal import Decimal
+
+import logic
+import ledger_io
+
+
+def _rows(client_id):
+    return [(e.date, e.details, e.amount_per_hour, e.deposit, e.pending) for e in logic.get_ledger_entries(client_id)]
+
+
+def _drift(client_id):
+    return [d for d in logic.verify_client_balances() if d["client_id"] == client_id]
+
+
+def test_csv_with_aliases_and_bad_rows(client_id):
+    data = (
+        "Date,Detail,Amount/Hour,Amount Deposited\n"
+        "2024-01-02,first,10.005,0\n"
+        "31/13/2024,bad date,1,1\n"
+        "03-01-2024,second,0,4\n"
+        "2024-01-04,bad amount,abc,0\n"
+        ",no date,1,0\n"
+    ).encode()
+    report = ledger_io.import_file(client_id, io.BytesIO(data), ledger_io.detect_format("book.csv"))
+    assert (report.inserted, report.failed) == (3, 2)
+    assert [line for line, _ in report.errors] == [3, 5]
+    assert "Unrecognised date" in report.errors[0][1] and "numbers" in report.errors[1][1]
+    rows = _rows(client_id)
+    assert rows[:2] == [
+        (date(2024, 1, 2), "first", Decimal("10.01"), Decimal(0), Decimal("-10.01")),
+        (date(2024, 1, 3), "second", Decimal(0), Decimal(4), Decimal(4)),
+    ]
+    assert rows[2][:2] == (date.today(), "no date")
+    assert _drift(client_id) == []
+
+
+def test_ndjson_reports_bad_lines_and_skips_blanks(client_id):
+    data = "\n".join([
+        json.dumps({"date": "2024-02-01", "details": "a", "amount_per_hour": "2.50", "deposit": "1"}),
+        "",
+        "{not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"date": "2024-02-02", "detail": "b", "amount_hour": 1, "amount_deposit": 0}),
+    ])
+    report = ledger_io.import_file(client_id, io.BytesIO(data.encode()), ledger_io.detect_format("x", "jsonl"))
+    assert report.to_dict()["errors"] == [
+        {"line": 3, "error": report.errors[0][1]},
+        {"line": 4, "error": "Expected a JSON object"},
+    ]
+    assert report.errors[0][1].startswith("Invalid JSON")
+    assert [r[1] for r in _rows(client_id)] == ["a", "b"]
+    assert logic.get_client_totals(client_id)["pending"] == Decimal("-2.50")
+
+
+def test_batches_commit_as_they_fill(client_id, monkeypatch):
+    calls = []
+    real = logic.add_ledger_entries_bulk
+    monkeypatch.setattr(logic, "add_ledger_entries_bulk", lambda cid, rows: calls.append(len(rows)) or real(cid, rows))
+    records = enumerate(({"date": "2024-03-01", "details": str(i), "deposit": 1} for i in range(7)), start=2)
+    report = ledger_io.import_records(client_id, records, batch_size=3)
+    assert calls == [3, 3, 1] and report.inserted == 7
+    assert logic.get_client_totals(client_id)["entry_count"] == 7
+    assert _drift(client_id) == []
+
+
+def test_legacy_json_creates_clients_and_accepts_list_rows(owner):
+    existing = logic.create_client(owner, "Known", f"0355{owner:07d}")
+    new_mobile = f"0366{owner:07d}"
+    data = {
+        existing.mobile: {"name": "Known", "ledger": [
+            {"date": "05/01/2024", "detail": "kivy dict", "amount_hour": "3", "amount_deposit": "1", "pending": "99"},
+            {"date": "whenever", "detail": "lenient date", "amount_hour": "1", "amount_deposit": "0"},
+            {"date": "2024-01-06", "detail": "bad", "amount_hour": "x", "amount_deposit": "0"},
+        ]},
+        new_mobile: {"name": "Fresh", "ledger": [[1, "2024-01-07", "kivy list", "2", "5", "3"]]},
+    }
+    report = ledger_io.import_legacy_file(owner, io.BytesIO(json.dumps(data).encode()))
+    assert (report.inserted, report.failed, report.clients_created) == (3, 1, 1)
+    assert report.errors == [(3, f"{existing.mobile}: Amounts must be numbers.")]
+
+    rows = _rows(existing.id)
+    assert rows[0] == (date(2024, 1, 5), "kivy dict", Decimal(3), Decimal(1), Decimal(-2))
+    assert rows[1][:2] == (date.today(), "lenient date")
+    fresh = next(c for c in logic.get_all_clients(owner) if c.mobile == new_mobile)
+    assert fresh.name == "Fresh"
+    assert _rows(fresh.id) == [(date(2024, 1, 7), "kivy list", Decimal(2), Decimal(5), Decimal(3))]
+    assert _drift(existing.id) == _drift(fresh.id) == []
+
+
+def test_export_round_trips_an_import(owner, client_id):
+    logic.add_ledger_entry(client_id, "2024-04-01", "x, \"quoted\"", "1.10", "0")
+    csv_text = "".join(ledger_io.export_chunks(owner, "csv", client_id))
+    other = logic.create_client(owner, "Copy", f"0377{owner:07d}").id
+    report = ledger_io.import_file(other, io.StringIO(csv_text), "csv")
+    assert (report.inserted, report.failed) == (1, 0)
+    assert [r[1:] for r in _rows(other)] == [r[1:] for r in _rows(client_id)]
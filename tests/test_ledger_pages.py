@@ -0,0 +1,63 @@
+"""Keyset ledger pages: running balances and serial numbers agree walking either way."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import logic
+
+N, LIMIT = 23, 5
+
+
+@pytest.fixture
+def expected(client_id):
+    """[(entry id, serial, balance)] for the whole ledger, entered out of date order."""
+    day = date(2024, 1, 1)
+    for i in range(N):
+        # dates out of entry order, several entries per date
+        d = day + timedelta(days=(i * 7) % 11)
+        logic.add_ledger_entry(client_id, d.isoformat(), f"e{i}", str(10 + i), str(i % 4 * 5))
+    entries = sorted(logic.get_ledger_entries(client_id), key=logic.entry_key)
+    out, balance = [], Decimal(0)
+    for n, e in enumerate(entries, start=1):
+        balance += e.pending
+        out.append((e.id, n, balance))
+    return out
+
+
+def _flat(page):
+    return [(e.id, page["start"] + i, balance) for i, (e, balance) in enumerate(page["rows"])]
+
+
+def test_forward_pages(client_id, expected):
+    seen, page = [], logic.get_ledger_page(client_id, limit=LIMIT)
+    while True:
+        seen += _flat(page)
+        if not page["has_next"]:
+            break
+        page = logic.get_ledger_page(client_id, after=page["last_key"], opening=page["closing"],
+                                     start=page["start"] + len(page["rows"]), limit=LIMIT)
+    assert seen == expected
+
+
+@pytest.mark.parametrize("carry", [True, False], ids=["carried", "recomputed"])
+def test_backward_pages(client_id, expected, carry):
+    pages, page = [], logic.get_ledger_page(client_id, last=True, limit=LIMIT)
+    while True:
+        pages.insert(0, _flat(page))
+        assert page["closing"] == pages[0][-1][2]
+        if not page["has_prev"]:
+            break
+        extra = {"opening": page["opening"], "start": page["start"]} if carry else {}
+        page = logic.get_ledger_page(client_id, before=page["first_key"], limit=LIMIT, **extra)
+    assert [row for p in pages for row in p] == expected
+    assert pages[-1][-1][2] == logic.get_client_totals(client_id)["pending"]
+
+
+def test_period_page_opens_with_brought_forward_balance(client_id, expected):
+    date_from = date(2024, 1, 6)
+    page = logic.get_ledger_page(client_id, limit=N, date_from=date_from)
+    in_period = [e for e in sorted(logic.get_ledger_entries(client_id), key=logic.entry_key) if e.date >= date_from]
+    first = next(i for i, row in enumerate(expected) if row[0] == in_period[0].id)
+    assert _flat(page) == expected[first:]
+    assert page["opening"] == (expected[first - 1][2] if first else 0)
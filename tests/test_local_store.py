@@ -0,0 +1,102 @@
+"""The Kivy app's SQLite store: the one-time JSON import, lazy ledgers, and SR numbering."""
+import json
+
+import pytest
+
+import local_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = local_store.open_store(str(tmp_path))
+    yield s
+    s.close()
+
+
+def _write_book(tmp_path, book):
+    (tmp_path / local_store.JSON_NAME).write_text(json.dumps(book), encoding="utf-8")
+
+
+def test_import_json_takes_dict_and_list_rows(tmp_path):
+    _write_book(tmp_path, {
+        "0300": {"name": "Ann", "ledger": [
+            {"date": "01-01-2024", "detail": "dict", "amount_hour": "10", "amount_deposit": "4", "pending": "6"},
+            ["7", "02-01-2024", "list", 1.5, 2],
+            ["03-01-2024", "no sr", "x", 3],
+        ]},
+        "0301": {"name": "Bob", "ledger": []},
+    })
+    store = local_store.open_store(str(tmp_path))
+    try:
+        assert not (tmp_path / local_store.JSON_NAME).exists()
+        assert (tmp_path / (local_store.JSON_NAME + ".migrated")).exists()
+        assert list(store.clients) == ["0300", "0301"]
+        assert store.clients["0300"]["ledger"] == [
+            ["1", "01-01-2024", "dict", 10.0, 4.0, -6.0],  # pending is deposit - hour, whatever the file said
+            ["2", "02-01-2024", "list", 1.5, 2.0, 0.5],
+            ["3", "03-01-2024", "no sr", 0.0, 3.0, 3.0],
+        ]
+        assert store.totals("0300") == (11.5, 9.0, -2.5)
+        assert store.import_json(str(tmp_path / local_store.JSON_NAME)) == 0
+    finally:
+        store.close()
+
+    # reopening reads names only; the book was imported once
+    store = local_store.open_store(str(tmp_path))
+    try:
+        assert [store.clients[m]["name"] for m in store.clients] == ["Ann", "Bob"]
+        assert len(store.clients["0300"]["ledger"]) == 3
+    finally:
+        store.close()
+
+
+def test_ledgers_load_on_first_use(store, monkeypatch):
+    store.save_client("0300", "Ann", [["01-01-2024", "a", 1, 0]])
+    reopened = local_store.LocalStore(store.path)
+    try:
+        calls = []
+        real = reopened._load_ledger
+        monkeypatch.setattr(reopened, "_load_ledger", lambda mobile: calls.append(mobile) or real(mobile))
+        client = reopened.clients["0300"]
+        assert not client.loaded and client["name"] == "Ann"
+        assert client.get("ledger")[0][2] == "a"
+        assert client["ledger"] is client.get("ledger")
+        assert calls == ["0300"] and client.loaded
+        with pytest.raises(KeyError):
+            client["missing"]
+    finally:
+        reopened.close()
+
+
+def test_add_update_remove_renumber(store):
+    store.save_client("0300", "Ann")
+    for detail in "abcd":
+        store.add_entry("0300", ["01-01-2024", detail, 1, 0])
+    assert store.update_entry("0300", 1, ["02-01-2024", "B", 2, 5]) == ["2", "02-01-2024", "B", 2.0, 5.0, 3.0]
+    assert store.remove_entry("0300", 0)[2] == "a"
+    assert store.remove_entry("0300", 9) is None
+    ledger = store.clients["0300"]["ledger"]
+    assert [(r[0], r[2]) for r in ledger] == [("1", "B"), ("2", "c"), ("3", "d")]
+    assert store.add_entry("0300", ["03-01-2024", "e", 0, 1])[0] == "4"
+
+    reopened = local_store.LocalStore(store.path)
+    try:
+        assert reopened.clients["0300"]["ledger"] == ledger
+    finally:
+        reopened.close()
+
+
+def test_save_client_renames_replaces_and_deletes(store):
+    clients = store.clients
+    clients["0300"] = {"name": "Ann", "ledger": [["01-01-2024", "a", 1, 0]]}
+    assert clients["0300"]["ledger"][0][2] == "a"
+    store.save_client("0300", "Annie")
+    assert clients["0300"]["name"] == "Annie" and len(clients["0300"]["ledger"]) == 1
+    store.save_client("0300", "Annie", [["02-01-2024", "x", 0, 2], ["03-01-2024", "y", 0, 3]])
+    assert [r[2] for r in clients["0300"]["ledger"]] == ["x", "y"]
+    assert store.totals("0300") == (0, 5, 5)
+
+    del clients["0300"]
+    assert "0300" not in clients and store.totals("0300") == (0, 0, 0)
+    with pytest.raises(KeyError):
+        del clients["0300"]
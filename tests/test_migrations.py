@@ -0,0 +1,105 @@
+"""Migrations applied to a database in the original (pre-migration) schema."""
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect, text
+
+import logic
+import migrations
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, phone VARCHAR NOT NULL UNIQUE,
+        email VARCHAR NOT NULL UNIQUE, password_hash VARCHAR NOT NULL, email_verified BOOLEAN,
+        otp_code VARCHAR, otp_expires INTEGER
+    )""",
+    """CREATE TABLE clients (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, mobile VARCHAR NOT NULL,
+        owner_id INTEGER NOT NULL REFERENCES users (id), CONSTRAINT uq_owner_mobile UNIQUE (owner_id, mobile)
+    )""",
+    """CREATE TABLE ledger_entries (
+        id INTEGER NOT NULL PRIMARY KEY, client_id INTEGER NOT NULL REFERENCES clients (id), date VARCHAR,
+        details VARCHAR, amount_per_hour FLOAT, deposit FLOAT, pending FLOAT
+    )""",
+]
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    """Engine on an old-schema database; call it with [(client_id, date, amount_per_hour, deposit)] rows."""
+    engine = logic.make_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+
+    def build(entries):
+        with engine.begin() as conn:
+            for ddl in LEGACY_SCHEMA:
+                conn.execute(text(ddl))
+            conn.execute(text("INSERT INTO users (id, name, phone, email, password_hash) VALUES (1, 'o', '1', 'o@x', 'x')"))
+            for cid in sorted({e[0] for e in entries}):
+                conn.execute(text("INSERT INTO clients (id, name, mobile, owner_id) VALUES (:c, 'c', :c, 1)"), {"c": cid})
+            conn.execute(
+                text("INSERT INTO ledger_entries (client_id, date, details, amount_per_hour, deposit, pending) "
+                     "VALUES (:c, :d, '', :a, :p, :pending)"),
+                [{"c": c, "d": d, "a": a, "p": p, "pending": (p or 0) - (a or 0)} for c, d, a, p in entries],
+            )
+        migrations.upgrade(engine, echo=lambda _: None)
+        return engine
+
+    yield build
+    engine.dispose()
+
+
+def _column(engine, sql):
+    with engine.connect() as conn:
+        return [r[0] for r in conn.execute(text(sql))]
+
+
+def test_runner_applies_each_version_once_in_order(legacy):
+    engine = legacy([(1, "2024-01-01", 1, 0)])
+    versions = [v for v, _, _ in migrations.MIGRATIONS]
+    assert versions == sorted(versions)
+    assert migrations.applied_versions(engine) == versions
+    assert migrations.pending_migrations(engine) == []
+    messages = []
+    assert migrations.upgrade(engine, echo=messages.append) == []
+    assert messages == ["Database schema is up to date."]
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("ledger_entries")}
+    assert "ix_ledger_entries_client_id" in indexes
+    assert "ix_clients_owner_name" in {ix["name"] for ix in inspect(engine).get_indexes("clients")}
+
+
+def test_versions_are_unique():
+    with pytest.raises(ValueError):
+        migrations.migration(migrations.MIGRATIONS[0][0], "again")(lambda conn: None)
+
+
+def test_0005_rounds_float_amounts_to_cents(legacy):
+    # 19.99 * 100 and 0.1 + 0.2 are not whole numbers as floats; NULL means nothing
+    engine = legacy([
+        (1, "2024-01-01", 19.99, 0.1 + 0.2),
+        (1, "2024-01-02", None, 4.35),
+        (1, "2024-01-03", 12345678.91, None),
+    ])
+    assert _column(engine, "SELECT amount_per_hour_cents FROM ledger_entries ORDER BY id") == [1999, 0, 1234567891]
+    assert _column(engine, "SELECT deposit_cents FROM ledger_entries ORDER BY id") == [30, 435, 0]
+    assert _column(engine, "SELECT pending_cents FROM ledger_entries ORDER BY id") == [-1969, 435, -1234567891]
+    assert _column(engine, "SELECT pending_cents FROM client_balances") == [30 + 435 - 1999 - 1234567891]
+
+
+def test_0010_unreadable_dates_fall_back_to_neighbours(legacy):
+    engine = legacy([
+        (1, "", 1, 0),  # nothing before it: the next readable date
+        (1, "2024-01-05", 1, 0),
+        (1, "not a date", 1, 0),  # the previous entry's date
+        (1, "07/02/2024", 1, 0),  # DD/MM/YYYY
+        (1, "2024-02-30", 1, 0),
+        (2, "?", 1, 0),  # no readable date at all: today
+        (2, None, 1, 0),
+    ])
+    today = date.today().isoformat()
+    assert _column(engine, "SELECT entry_date FROM ledger_entries ORDER BY id") == [
+        "2024-01-05", "2024-01-05", "2024-01-05", "2024-02-07", "2024-02-07", today, today,
+    ]
+    # client_months (0011) is built from the fixed dates
+    assert _column(engine, "SELECT month FROM client_months WHERE client_id = 1 ORDER BY month") == [
+        "2024-01-01", "2024-02-01",
+    ]
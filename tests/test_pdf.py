@@ -0,0 +1,88 @@
+"""The streaming PDF writer: output parses, pages break, and awkward names survive."""
+import io
+import re
+
+import pytest
+
+import pdf_render
+from pdf_stream import StreamingCanvas
+
+pypdf = pytest.importorskip("pypdf")
+
+TOTALS = {"amount_per_hour": 10, "deposit": 4, "pending": 6}
+
+
+def _pages(data):
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [page.extract_text() for page in reader.pages]
+
+
+def _entries(n):
+    return [("2024-01-%02d" % (i % 28 + 1), f"row {i}", 1, 0, 1) for i in range(1, n + 1)]
+
+
+def test_short_statement_is_one_page_with_opening_and_closing_rows():
+    spec = pdf_render.ledger_spec("Ann", "0300", _entries(3), TOTALS, period="2024-01", opening=5)
+    pages = _pages(pdf_render.render_pdf(spec, backend="stream"))
+    assert len(pages) == 1
+    text = pages[0]
+    assert "Ann (0300), 2024-01" in text
+    assert "Brought forward" in text and "5.00" in text
+    assert "CLOSING BALANCE" in text and "11.00" in text
+    assert "row 3" in text and "Page 1" in text
+
+
+def test_long_statement_breaks_pages_and_repeats_the_header():
+    spec = pdf_render.ledger_spec("Ann", "0300", _entries(120), TOTALS)
+    chunks = list(pdf_render.iter_pdf(spec, backend="stream"))
+    pages = _pages(b"".join(chunks))
+    assert len(pages) > 2
+    assert len(chunks) == len(pages) + 1  # one chunk per page, then the trailer
+    assert all("Details" in text for text in pages)
+    assert [f"Page {n}" in text for n, text in enumerate(pages, start=1)] == [True] * len(pages)
+    body = "\n".join(pages)
+    assert [n for n in range(1, 121) if not re.search(rf"\brow {n}\b", body)] == []
+    assert "TOTAL" in pages[-1] and "TOTAL" not in pages[0]
+
+
+def test_several_specs_each_start_a_page():
+    specs = [pdf_render.ledger_spec(name, "1", _entries(2), TOTALS) for name in ("Ann", "Bob")]
+    specs.append(pdf_render.clients_spec([("Ann", "1"), ("Bob", "2")]))
+    pages = _pages(pdf_render.render_pdf(specs, backend="stream"))
+    assert [p.splitlines()[0] for p in pages] == ["Ann (1)", "Bob (1)", "Registered Clients"]
+
+
+@pytest.mark.parametrize("name", ["O'Brien (old)", "back\\slash", "a)b(c", "Zoë Ångström – €5"])
+def test_names_are_escaped(name):
+    spec = pdf_render.clients_spec([(name, "0300")])
+    pages = _pages(pdf_render.render_pdf(spec, backend="stream"))
+    assert name in pages[0]
+
+
+def test_unencodable_text_becomes_question_marks():
+    c = StreamingCanvas(compress=False)
+    c.drawString(10, 10, "Ali علی")
+    data = c.finish()
+    assert b"(Ali ???) Tj" in data
+    assert "Ali ???" in _pages(data)[0]
+
+
+@pytest.mark.parametrize("backend", ["stream", "canvas", "fpdf"])
+def test_backends_draw_the_same_rows_and_totals(backend):
+    if backend == "canvas":
+        pytest.importorskip("reportlab")
+    elif backend == "fpdf":
+        pytest.importorskip("fpdf")
+    spec = lambda: pdf_render.ledger_spec("Ann", "0300", _entries(70), TOTALS, opening=5)
+    expected = _pages(pdf_render.render_pdf(spec(), backend="stream"))
+    pages = _pages(pdf_render.render_pdf(spec(), backend=backend))
+    assert len(pages) == len(expected) == 2
+    words = lambda texts: sorted(" ".join(texts).split())
+    assert words(pages) == words(expected)
+    assert "Brought forward" in pages[0] and "CLOSING BALANCE" in pages[-1] and "11.00" in pages[-1]
+
+
+def test_default_backend_is_stream():
+    assert pdf_render.DEFAULT_BACKEND == "stream"
+    with pytest.raises(ValueError):
+        pdf_render.render_pdf(pdf_render.clients_spec([]), backend="nope")
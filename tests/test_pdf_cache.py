@@ -0,0 +1,91 @@
+"""The on-disk PDF cache: age and size eviction, atomic writes, and the ETag / 304 path of the PDF routes."""
+import os
+import time
+
+import pytest
+
+import logic
+import pdf_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_lookup_misses_expired_files_and_evict_removes_them(cache_dir, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "MAX_AGE", 100)
+    old, new = pdf_cache.store("old", b"a"), pdf_cache.store("new", b"b")
+    _age(old, 101)
+    stale_tmp = cache_dir / "crashed.tmp"
+    stale_tmp.write_bytes(b"x")
+    _age(stale_tmp, 3601)
+    assert pdf_cache.lookup("old") is None and pdf_cache.lookup("new") == new
+    assert pdf_cache.evict() == 2
+    assert sorted(os.listdir(cache_dir)) == ["new.pdf"]
+
+
+def test_evict_drops_least_recently_used_until_under_the_cap(cache_dir, monkeypatch):
+    for n, key in enumerate(("a", "b", "c")):
+        _age(pdf_cache.store(key, b"x" * 10), 300 - n * 100)
+    # a hit older than the touch interval counts as a fresh use
+    monkeypatch.setattr(pdf_cache, "_TOUCH_INTERVAL", 0)
+    pdf_cache.lookup("a")
+    assert pdf_cache.evict(max_bytes=20) == 1
+    assert sorted(os.listdir(cache_dir)) == ["a.pdf", "c.pdf"]
+
+
+def test_store_evicts_over_the_size_cap(cache_dir, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "MAX_BYTES", 15)
+    _age(pdf_cache.store("a", b"x" * 10), 10)
+    pdf_cache.store("b", b"x" * 10)
+    assert os.listdir(cache_dir) == ["b.pdf"]
+
+
+def test_aborted_stream_leaves_nothing_behind(cache_dir):
+    def chunks():
+        yield b"%PDF"
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError):
+        list(pdf_cache.store_stream("k", chunks()))
+    assert os.listdir(cache_dir) == []
+    assert b"".join(pdf_cache.store_stream("k", iter([b"a", b"b"]))) == b"ab"
+    assert os.listdir(cache_dir) == ["k.pdf"]
+
+
+def test_clients_pdf_is_cached_and_revalidated(web, owner, cache_dir):
+    logic.create_client(owner, "Ann", f"0344{owner:07d}")
+    first = web.get("/clients/pdf")
+    assert first.status_code == 200 and first.data.startswith(b"%PDF")
+    etag = first.headers["ETag"].strip('"')
+    assert os.listdir(cache_dir) == [f"{etag}.pdf"]
+
+    assert web.get("/clients/pdf", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+    assert web.get("/clients/pdf").data == first.data
+
+    logic.create_client(owner, "Bob", f"0345{owner:07d}")
+    changed = web.get("/clients/pdf", headers={"If-None-Match": f'"{etag}"'})
+    assert changed.status_code == 200 and changed.headers["ETag"].strip('"') != etag
+
+
+def test_ledger_pdf_revalidates_until_an_entry_changes(web, client_id):
+    logic.add_ledger_entry(client_id, "2024-01-01", "a", "1", "0")
+    etag = web.get(f"/ledger/{client_id}/pdf").headers["ETag"]
+    assert web.get(f"/ledger/{client_id}/pdf", headers={"If-None-Match": etag}).status_code == 304
+    logic.add_ledger_entry(client_id, "2024-01-02", "b", "1", "0")
+    assert web.get(f"/ledger/{client_id}/pdf", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_pdf_routes_need_a_login(web, client_id):
+    with web.session_transaction() as s:
+        s.clear()
+    for url in ("/clients/pdf", f"/ledger/{client_id}/pdf"):
+        resp = web.get(url)
+        assert resp.status_code == 302 and not resp.data.startswith(b"%PDF")
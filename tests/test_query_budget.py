@@ -0,0 +1,56 @@
+"""SQL statement counts of the ledger page stay flat as the ledger grows."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import app
+import logic
+
+PAGE_BUDGET = 9  # what a full render of any ledger page runs today
+REVALIDATE_BUDGET = 2  # a 304 only reads the client and its balance row
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setitem(app.app.config, "QUERY_BUDGET", PAGE_BUDGET)
+
+
+def _fill(client_id, n):
+    logic.add_ledger_entries_bulk(client_id, [
+        {"date": date(2024, 1 + i % 12, 1 + i % 28), "details": f"row {i}", "amount_per_hour": Decimal(i),
+         "deposit": Decimal(1)}
+        for i in range(n)
+    ])
+
+
+def _count(resp):
+    assert resp.status_code in (200, 304)
+    return int(resp.headers["X-Query-Count"])
+
+
+@pytest.mark.parametrize("query", ["", "?page=last", "?from=2024-03-01&to=2024-05-31"])
+def test_ledger_page_queries_do_not_grow(web, owner, budget, query):
+    counts = []
+    for n in (3, 3 * logic.LEDGER_PAGE_SIZE):
+        client_id = logic.create_client(owner, f"Client {n}", f"0322{n:07d}").id
+        _fill(client_id, n)
+        counts.append(_count(web.get(f"/ledger/{client_id}{query}")))
+    assert counts[0] == counts[1] <= PAGE_BUDGET
+
+
+def test_unchanged_ledger_revalidates_cheaply(web, client_id, budget):
+    _fill(client_id, 50)
+    first = web.get(f"/ledger/{client_id}?from=2024-02-01")
+    again = web.get(f"/ledger/{client_id}?from=2024-02-01", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert _count(again) <= REVALIDATE_BUDGET
+
+
+def test_query_budget_helper(client_id):
+    with logic.query_budget(1) as counter:
+        logic.get_client_totals(client_id)
+    assert counter[0] == 1
+    with pytest.raises(AssertionError, match="budget was 0"):
+        with logic.query_budget(0):
+            logic.get_client_totals(client_id)
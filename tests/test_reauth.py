@@ -0,0 +1,96 @@
+"""Step-up password for entry edits/deletes: the re-auth window, its binding to the login, and hash upgrades."""
+import itertools
+import time
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import app
+import logic
+
+CHEAP = "pbkdf2:sha256:1000"
+_seq = itertools.count(1)
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(app, "PASSWORD_HASH_METHOD", CHEAP)
+    monkeypatch.setattr(app, "_hash_params", {})
+
+
+@pytest.fixture
+def user():
+    n = next(_seq)
+    return logic.create_user(f"Re {n}", f"0399{n:07d}", f"reauth{n}@example.com",
+                             generate_password_hash("pw", method=CHEAP))
+
+
+@pytest.fixture
+def entry(web, user):
+    with web.session_transaction() as s:
+        s["user_id"] = user.id
+    cid = logic.create_client(user.id, "Client", f"0398{user.id:07d}").id
+    return cid, logic.add_ledger_entry(cid, "2024-01-01", "a", "1", "0").id
+
+
+def _edit(web, cid, eid, details, **form):
+    return web.post(f"/ledger/{cid}/entry/{eid}/edit", data={
+        "date": "2024-01-01", "details": details, "amount_per_hour": "1", "deposit": "0", **form})
+
+
+def _details(eid):
+    return logic.get_ledger_entry(eid).details
+
+
+def test_password_opens_a_window_that_expires(web, entry):
+    cid, eid = entry
+    _edit(web, cid, eid, "no password")
+    assert _details(eid) == "a"
+    _edit(web, cid, eid, "wrong", current_password="nope")
+    assert _details(eid) == "a"
+
+    _edit(web, cid, eid, "b", current_password="pw")
+    assert _details(eid) == "b"
+    _edit(web, cid, eid, "c")  # inside the window
+    assert _details(eid) == "c"
+
+    with web.session_transaction() as s:
+        s["reauth_until"] = time.time() - 1
+    _edit(web, cid, eid, "d")
+    assert _details(eid) == "c"
+    web.post(f"/ledger/{cid}/entry/{eid}/delete")
+    assert logic.get_ledger_entry(eid) is not None
+    web.post(f"/ledger/{cid}/entry/{eid}/delete", data={"current_password": "pw"})
+    assert logic.get_ledger_entry(eid) is None
+
+
+def test_window_is_bound_to_the_login_that_opened_it(web, entry, owner):
+    cid, eid = entry
+    _edit(web, cid, eid, "b", current_password="pw")
+    other_cid = logic.create_client(owner, "Other", f"0397{owner:07d}").id
+    other_eid = logic.add_ledger_entry(other_cid, "2024-01-01", "x", "1", "0").id
+    with web.session_transaction() as s:
+        s["user_id"] = owner  # another account in the same browser session
+    _edit(web, other_cid, other_eid, "y")
+    assert _details(other_eid) == "x"
+
+
+def test_login_closes_the_window(web, entry, user):
+    cid, eid = entry
+    _edit(web, cid, eid, "b", current_password="pw")
+    web.post("/login", data={"email": user.email, "password": "pw"})
+    _edit(web, cid, eid, "c")
+    assert _details(eid) == "b"
+
+
+def test_login_rehashes_when_the_method_changes(web, user, monkeypatch):
+    web.post("/login", data={"email": user.email, "password": "pw"})
+    assert logic.get_user_by_id(user.id).password_hash == user.password_hash
+
+    monkeypatch.setattr(app, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:2000")
+    monkeypatch.setattr(app, "_hash_params", {})
+    web.post("/login", data={"email": user.email, "password": "wrong"})
+    assert logic.get_user_by_id(user.id).password_hash == user.password_hash
+    web.post("/login", data={"email": user.email, "password": "pw"})
+    stored = logic.get_user_by_id(user.id).password_hash
+    assert stored.startswith("pbkdf2:sha256:2000$") and check_password_hash(stored, "pw")
@@ -0,0 +1,65 @@
+"""The receivables dashboard: sorting, paging, debtors and the grand total, read from client_balances."""
+from decimal import Decimal
+
+import pytest
+
+import app
+import logic
+
+
+@pytest.fixture
+def book(owner):
+    """{name: id}; Cy has no entries, so no balance row."""
+    ids = {name: logic.create_client(owner, name, f"03{i}{owner:08d}").id for i, name in enumerate("Ann Bob Cy Dee".split())}
+    logic.add_ledger_entry(ids["Ann"], "2024-01-01", "a", "100", "10")  # -90
+    logic.add_ledger_entry(ids["Bob"], "2024-01-01", "b", "5", "20")    # +15
+    logic.add_ledger_entry(ids["Bob"], "2024-01-02", "b", "0", "5")     # +20
+    logic.add_ledger_entry(ids["Dee"], "2024-01-01", "d", "30", "0")    # -30
+    return ids
+
+
+def _names(owner, sort, descending=False, **page):
+    return [r[1] for r in logic.get_receivables(owner, sort, descending, **page)["rows"]]
+
+
+def test_sorts(owner, book):
+    assert _names(owner, "pending") == ["Ann", "Dee", "Cy", "Bob"]
+    assert _names(owner, "pending", True) == ["Bob", "Cy", "Dee", "Ann"]
+    assert _names(owner, "name", True) == ["Dee", "Cy", "Bob", "Ann"]
+    assert _names(owner, "entries", True)[0] == "Bob"
+    assert _names(owner, "deposit", True)[:2] == ["Bob", "Ann"]
+    with pytest.raises(ValueError):
+        logic.get_receivables(owner, "bogus")
+
+
+def test_pages_debtors_and_grand_total(owner, book):
+    assert _names(owner, "name", offset=0, limit=3) == ["Ann", "Bob", "Cy"]
+    assert _names(owner, "name", offset=3, limit=3) == ["Dee"]
+    data = logic.get_receivables(owner, "name", limit=1)
+    assert data["rows"] == [(book["Ann"], "Ann", data["rows"][0][2], Decimal(100), Decimal(10), Decimal(-90), 1)]
+    assert [r[1] for r in data["debtors"]] == ["Ann", "Dee"]
+    assert data["client_count"] == 4
+    assert data["grand"] == {"amount_per_hour": Decimal(135), "deposit": Decimal(35), "pending": Decimal(-100),
+                             "entry_count": 4}
+
+
+def test_page_links(web, owner, book, monkeypatch):
+    monkeypatch.setattr(app, "RECEIVABLES_PAGE_SIZE", 3)
+    first = web.get("/receivables?sort=name").get_data(as_text=True)
+    dee = f'<a href="/ledger/{book["Dee"]}">Dee</a>'  # the sorted table's link (debtors are listed apart)
+    assert "Page 1 of 2" in first and "page=2" in first and dee not in first
+    second = web.get("/receivables?sort=name&page=2").get_data(as_text=True)
+    assert "Page 2 of 2" in second and "Previous" in second and dee in second
+    assert "<td>4</td>" in second  # serials continue from page 1
+    # an unknown sort falls back to pending
+    assert web.get("/receivables?sort=bogus&page=0").status_code == 200
+
+
+def test_api_rows_follow_the_same_arguments(web, book):
+    body = web.get("/api/v1/receivables?sort=pending&dir=desc&limit=2").get_json()
+    assert body["fields"] == ["id", "name", "mobile", "amount_per_hour", "deposit", "pending", "entries"]
+    assert [r[1] for r in body["rows"]] == ["Bob", "Cy"]
+    assert body["rows"][0][3:] == ["5.00", "25.00", "20.00", 2]
+    assert body["grand"]["pending"] == "-100.00" and body["client_count"] == 4
+    second = web.get("/api/v1/receivables?sort=pending&dir=desc&limit=2&page=2").get_json()
+    assert [r[1] for r in second["rows"]] == ["Dee", "Ann"]
@@ -0,0 +1,60 @@
+"""The RecycleView ledger table: batched add_row, set_rows/clear, measured row sizes and row presses."""
+import os
+
+import pytest
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+pytest.importorskip("kivy")
+
+import text_measure  # noqa: E402
+from recycle_table import RecycleTable, TableRow  # noqa: E402
+
+HEADERS = ["S#", "Date", "Details", "Amount/hour", "Deposit", "Pending"]
+WIDTHS = [50, 100, 200, 90, 90, 90]
+
+
+@pytest.fixture
+def table():
+    return RecycleTable(cols=6, headers=HEADERS, col_widths=WIDTHS)
+
+
+def test_add_row_is_flushed_once_per_frame(table):
+    for i in range(3):
+        table.add_row([i + 1, "2024-01-01", "visit", 10, 0, -10])
+    assert table.row_count == 3 and table.body.data == []
+    table._flush()
+    assert [d["texts"][0] for d in table.body.data] == ["1", "2", "3"]
+    assert table.body.data[0]["row_size"] == (None, text_measure.ROW_HEIGHT)
+
+
+def test_set_rows_and_clear_keep_the_header(table):
+    table.add_row([1, "", "", 0, 0, 0])
+    table.set_rows([i, "", "site visit " * (i * 10), 0, 0, 0] for i in range(3))
+    assert table.row_count == 3
+    heights = [d["row_size"][1] for d in table.body.data]
+    assert heights[0] == text_measure.ROW_HEIGHT < heights[1] < heights[2]
+    assert heights[2] == table.row_height(table.body.data[2]["texts"])
+    header = table.children[-1]
+    table.clear()
+    assert table.row_count == 0 and table.children[-1] is header and len(table.children) == 2
+    assert [c.text for c in reversed(header.children)] == HEADERS
+
+
+def test_rows_are_reused_views_that_report_presses(table):
+    assert table.body.viewclass is TableRow
+    pressed = []
+    table.bind(on_row_press=lambda t, index, col: pressed.append((index, col)))
+    row = TableRow()
+    row.refresh_view_attrs(table.body, 4, {"texts": ["5", "2024-01-05", "a"]})
+    assert [c.text for c in row.cells] == ["5", "2024-01-05", "a", "", "", ""]
+    row.refresh_view_attrs(table.body, 7, {"texts": ["8"] * 6})
+    assert len(row.cells) == 6 and row.index == 7 and row.table is table
+    row.size = (sum(WIDTHS), text_measure.ROW_HEIGHT)
+    row.do_layout()
+
+    class Touch:
+        pos = row.cells[2].center
+
+    assert row.on_touch_down(Touch())
+    assert pressed == [(7, 2)]
@@ -0,0 +1,52 @@
+"""client_months kept up by the entry mutators must equal a rebuild from the entries."""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+
+import logic
+
+
+def _months(client_id):
+    with logic.SessionLocal() as db:
+        rows = db.execute(
+            select(logic.ClientMonth.month, logic.ClientMonth.amount_per_hour, logic.ClientMonth.deposit,
+                   logic.ClientMonth.pending, logic.ClientMonth.entry_count, logic.ClientMonth.closing)
+            .where(logic.ClientMonth.client_id == client_id)
+            .order_by(logic.ClientMonth.month)
+        ).all()
+    return [tuple(r) for r in rows]
+
+
+def _assert_matches_rebuild(client_id):
+    incremental = _months(client_id)
+    logic.rebuild_monthly_rollups([client_id])
+    assert incremental == _months(client_id)
+    return incremental
+
+
+def test_add_move_delete_match_rebuild(client_id):
+    jan = logic.add_ledger_entry(client_id, "2024-01-10", "jan", "100", "20")
+    logic.add_ledger_entry(client_id, "2024-03-05", "mar", "50", "0")
+    feb = logic.add_ledger_entry(client_id, "2024-02-01", "feb", "10.25", "30")
+    months = _assert_matches_rebuild(client_id)
+    assert [m[0].month for m in months] == [1, 2, 3]
+
+    # moving February's only entry into April empties February
+    logic.update_ledger_entry(feb.id, "2024-04-15", "feb", "10.25", "30")
+    months = _assert_matches_rebuild(client_id)
+    assert [m[0].month for m in months] == [1, 3, 4]
+
+    # and deleting January's only entry drops January
+    logic.delete_ledger_entry(jan.id)
+    months = _assert_matches_rebuild(client_id)
+    assert [m[0].month for m in months] == [3, 4]
+    assert months[-1][-1] == logic.get_client_totals(client_id)["pending"]
+
+
+def test_bulk_insert_matches_rebuild(client_id):
+    rows = [{"date": date(2023, 12 - i % 3, 1 + i), "details": str(i), "amount_per_hour": Decimal(i),
+             "deposit": Decimal("1.50")} for i in range(9)]
+    assert logic.add_ledger_entries_bulk(client_id, rows) == 9
+    logic.add_ledger_entry(client_id, "2023-09-30", "earlier", "5", "5")
+    assert len(_assert_matches_rebuild(client_id)) == 4
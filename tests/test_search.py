@@ -0,0 +1,82 @@
+"""Client search: mobile suffixes, trigram FTS substrings, and the ILIKE fallback."""
+import pytest
+from sqlalchemy import text
+
+import logic
+
+
+@pytest.fixture
+def book(owner):
+    """{name: id} for an owner's clients."""
+    rows = [
+        ("Ann Smith", "0300-1234599"),
+        ("Bob Jones", "0301 7654321"),
+        ("Cyril Ansari", "+92 302 1239999"),
+        ("Dee", "0303 0000599"),
+    ]
+    return {name: logic.create_client(owner, name, mobile).id for name, mobile in rows}
+
+
+def _names(owner, query, **kw):
+    return [c.name for c in logic.search_clients(owner, query, **kw)]
+
+
+def test_prefix_upper_bound():
+    assert logic._prefix_upper_bound("12") == "13"
+    assert logic._prefix_upper_bound("129") == "13"
+    assert logic._prefix_upper_bound("1899") == "19"
+    assert logic._prefix_upper_bound("999") is None
+    assert logic._prefix_upper_bound("") is None
+
+
+def test_mobile_rev_tracks_the_mobile(owner, book):
+    with logic.SessionLocal() as db:
+        assert db.get(logic.Client, book["Ann Smith"]).mobile_rev == "99543210030"
+    logic.update_client(owner, book["Ann Smith"], "Ann Smith", "0399 1112222")
+    with logic.SessionLocal() as db:
+        assert db.get(logic.Client, book["Ann Smith"]).mobile_rev == "22221119930"
+
+
+def test_digit_queries_match_the_end_of_the_mobile_first(owner, book):
+    assert _names(owner, "4599") == ["Ann Smith"]
+    # the suffix hits (ordered by reversed mobile) lead, then substring hits by name
+    assert _names(owner, "99") == ["Dee", "Ann Smith", "Cyril Ansari"]
+    assert _names(owner, "599") == ["Dee", "Ann Smith"]
+    assert _names(owner, "999") == ["Cyril Ansari"]
+    assert _names(owner, "123") == ["Ann Smith", "Cyril Ansari"]
+    assert _names(owner, "54-3 21") == ["Bob Jones"]
+    assert _names(owner, "99", limit=1) == ["Dee"]
+
+
+def test_fts_matches_substrings_case_insensitively(owner, book):
+    with logic.SessionLocal() as db:
+        assert logic._client_fts_enabled(db)
+    assert _names(owner, "ANS") == ["Cyril Ansari"]
+    assert _names(owner, "mith") == ["Ann Smith"]
+    assert _names(owner, 'on"es') == []
+    assert _names(owner, "one OR ann") == []  # FTS syntax is quoted away
+    # other owners' clients never show up
+    assert _names(owner + 10_000, "Smith") == []
+
+
+def test_short_queries_use_ilike(owner, book, monkeypatch):
+    monkeypatch.setattr(logic, "text", lambda *a: pytest.fail("FTS used for a short query"))
+    assert _names(owner, "an") == ["Ann Smith", "Cyril Ansari"]
+    assert _names(owner, "ee") == ["Dee"]
+
+
+def test_ilike_fallback_without_the_index(owner, book, monkeypatch):
+    monkeypatch.setattr(logic, "_client_fts_enabled", lambda db: False)
+    assert _names(owner, "smi") == ["Ann Smith"]
+    assert _names(owner, "an") == ["Ann Smith", "Cyril Ansari"]
+
+
+def test_triggers_keep_the_index_current(owner, book):
+    logic.update_client(owner, book["Bob Jones"], "Robert Keane", "0301 7654321")
+    assert _names(owner, "Jones") == []
+    assert _names(owner, "keane") == ["Robert Keane"]
+    logic.delete_client(owner, book["Bob Jones"])
+    assert _names(owner, "keane") == []
+    with logic.SessionLocal() as db:
+        rows = db.execute(text("SELECT count(*) FROM clients_fts WHERE clients_fts MATCH '\"keane\"'")).scalar()
+    assert rows == 0
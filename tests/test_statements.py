@@ -0,0 +1,57 @@
+"""Statement runs: each client gets exactly its own rows, and a period starts from its opening balance."""
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import logic
+import statements
+
+
+@pytest.fixture
+def book(owner):
+    """Three clients in id order; the middle one has no entries."""
+    ids = [logic.create_client(owner, name, f"0333{owner:04d}{i}").id for i, name in enumerate(("Ann", "Bob", "Cy"))]
+    logic.add_ledger_entry(ids[0], "2024-01-10", "ann jan", "100", "0")
+    logic.add_ledger_entry(ids[0], "2024-02-10", "ann feb", "10", "50")
+    logic.add_ledger_entry(ids[2], "2024-02-01", "cy feb", "7", "0")
+    logic.add_ledger_entry(ids[2], "2024-01-15", "cy jan", "3", "1")
+    return ids
+
+
+def _details(owner, **period):
+    return {c.id: [r.details for r in rows] for c, _, rows in statements.iter_statements(owner, **period)}
+
+
+def test_each_client_gets_its_own_rows(owner, book):
+    ann, bob, cy = book
+    assert _details(owner) == {ann: ["ann jan", "ann feb"], bob: [], cy: ["cy jan", "cy feb"]}
+    totals = {c.id: t for c, t, _ in statements.iter_statements(owner)}
+    assert totals[ann]["pending"] == Decimal(-60)
+    assert totals[cy]["pending"] == Decimal(-9)
+
+
+def test_period_statements_open_at_the_balance_brought_forward(owner, book):
+    ann, bob, cy = book
+    run = {c.id: (t, rows) for c, t, rows in statements.iter_statements(owner, date_from=date(2024, 2, 1))}
+    assert {cid: [r.details for r in rows] for cid, (_, rows) in run.items()} == {
+        ann: ["ann feb"], bob: [], cy: ["cy feb"],
+    }
+    assert run[ann][0]["opening"] == Decimal(-100)
+    assert run[bob][0]["opening"] == 0
+    assert run[cy][0]["opening"] == Decimal(-2)
+    assert run[ann][0]["pending"] == Decimal(40)
+
+    to_jan = _details(owner, date_from=date(2024, 1, 1), date_to=date(2024, 1, 31))
+    assert to_jan == {ann: ["ann jan"], bob: [], cy: ["cy jan"]}
+
+
+@pytest.mark.parametrize("workers", [1, 2], ids=["inline", "pool"])
+def test_zip_has_one_statement_per_client(owner, book, workers):
+    data = b"".join(statements.zip_chunks(owner, workers=workers))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        names = zf.namelist()
+        assert all(zf.read(n).startswith(b"%PDF") for n in names)
+    assert names == [f"{cid:05d}_{name}.pdf" for cid, name in zip(book, ("Ann", "Bob", "Cy"))]
@@ -0,0 +1,65 @@
+"""POST /api/v1/sync: op_id dedupe and per-op validation."""
+from decimal import Decimal
+
+import pytest
+
+import logic
+
+
+def _sync(web, *ops):
+    resp = web.post("/api/v1/sync", json={"ops": list(ops)})
+    assert resp.status_code == 200
+    return resp.get_json()["results"]
+
+
+def test_retried_ops_are_not_applied_twice(web, owner):
+    batch = [
+        {"op_id": "c1", "op": "client.add", "name": "Offline", "mobile": "0399"},
+        {"op_id": "e1", "op": "entry.add", "client_op": "c1", "date": "2024-05-01", "amount_per_hour": "12.5"},
+    ]
+    first = _sync(web, *batch)
+    assert [r["status"] for r in first] == ["ok", "ok"]
+    client_id, entry_id = first[0]["id"], first[1]["id"]
+
+    again = _sync(web, *batch, batch[1])
+    assert [(r["status"], r["id"]) for r in again] == [
+        ("duplicate", client_id), ("duplicate", entry_id), ("duplicate", entry_id),
+    ]
+    totals = logic.get_client_totals(client_id)
+    assert totals["entry_count"] == 1
+    assert totals["amount_per_hour"] == Decimal("12.5")
+
+
+def test_duplicate_op_id_rolls_back(client_id, owner):
+    logic.add_ledger_entry(client_id, "2024-05-01", "first", "10", "0", op_id="same")
+    with pytest.raises(logic.DuplicateOpError):
+        logic.add_ledger_entry(client_id, "2024-05-02", "second", "10", "0", op_id="same")
+    assert logic.get_client_totals(client_id)["entry_count"] == 1
+    assert logic.get_sync_op(owner, "same").entity_id is not None
+
+
+def test_update_and_delete_need_an_integer_id(web, owner, client_id):
+    results = _sync(
+        web,
+        {"op_id": "u1", "op": "client.update", "id": str(client_id), "name": "X", "mobile": "0398"},
+        {"op_id": "d1", "op": "client.delete", "id": True},
+        {"op_id": "u2", "op": "client.update", "id": client_id, "name": "X", "mobile": "0398"},
+        {"op": "client.add", "name": "no op id"},
+    )
+    assert [r["status"] for r in results] == ["invalid", "invalid", "ok", "invalid"]
+    assert logic.get_client(owner, client_id).name == "X"
+
+
+def test_same_value_client_save_changes_nothing(owner, client_id):
+    c = logic.get_client(owner, client_id)
+    cursor = logic.get_changes(owner, 0)["cursor"]
+    version = logic.get_owner_clients_version(owner)
+
+    assert logic.update_client(owner, client_id, c.name, c.mobile, op_id="noop")
+    assert logic.get_changes(owner, cursor)["cursor"] == cursor
+    assert logic.get_owner_clients_version(owner) == version
+    assert logic.get_sync_op(owner, "noop").entity_id == client_id
+
+    assert logic.update_client(owner, client_id, "Renamed", c.mobile)
+    assert logic.get_changes(owner, cursor)["clients"][0][1] == "Renamed"
+    assert logic.get_owner_clients_version(owner) != version
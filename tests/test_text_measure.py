@@ -0,0 +1,48 @@
+"""Kivy row sizing: cached wrapped-text heights and the numeric fast path."""
+import os
+
+import pytest
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+pytest.importorskip("kivy")
+
+import text_measure  # noqa: E402
+from text_measure import TextMeasurer  # noqa: E402
+
+
+def test_numeric_cells_use_the_line_height():
+    m = TextMeasurer()
+    line = m.line_height()
+    assert line > 0
+    assert [m.height(t, 100) for t in ("12", "-1,234.50", "2024-01-05")] == [line] * 3
+    assert m.stats()["fast"] == 3 and m.stats()["misses"] == 0
+    # too wide for the column: measured for real, and wraps
+    assert m.height("1234567890" * 3, 40) > line and m.stats()["misses"] == 1
+
+
+def test_heights_are_cached_per_text_width_and_font():
+    m = TextMeasurer(maxsize=2)
+    h = m.height("site visit", 200)
+    assert m.height("site visit", 200) == h
+    assert m.height("site visit", 200, bold=True) > 0
+    assert (m.hits, m.misses) == (1, 2)
+    m.height("other", 200)
+    assert m.stats()["size"] == 2 and ("site visit", 200, text_measure.FONT_NAME, text_measure.FONT_SIZE, False) \
+        not in m._cache
+    assert m.height("", 200) == 0
+    m.clear()
+    assert m.stats() == {"hits": 0, "misses": 0, "fast": 0, "size": 0, "hit_rate": 0.0}
+
+
+def test_long_text_wraps_taller():
+    m = TextMeasurer()
+    assert m.height("site visit " * 20, 80) > m.height("site visit " * 20, 800) > 0
+
+
+def test_row_height_fits_the_tallest_cell():
+    widths = [50, 200, 90]
+    assert text_measure.row_height(["1", "short", "10.00"], widths) == text_measure.ROW_HEIGHT
+    tall = text_measure.row_height(["1", "site visit " * 30, "10.00"], widths)
+    assert tall == text_measure.text_height("site visit " * 30, 200 - text_measure.TEXT_INSET) + \
+        text_measure.CELL_PADDING > text_measure.ROW_HEIGHT
@@ -0,0 +1,110 @@
+# text_measure.py
+"""
+Cached wrapped-text heights for the Kivy tables' row sizing.
+
+Measuring a cell used to mean a throwaway Label and texture_update() per
+cell, i.e. rasterising every amount and date just to learn its height. Here
+one core label per font does the rasterising, results are kept in a bounded LRU keyed
+by (text, width, font, size, bold), and single-line numeric cells (amounts,
+SR numbers, numeric dates) skip rasterising: their height is the font's line
+height, measured once per font.
+
+    row_height(["12", "Site visit ...", "100.0"], [50, 200, 90])   # what add_row needs
+    measurer.stats()                                                # hits / misses / fast / hit_rate
+"""
+import re
+from collections import OrderedDict
+
+from kivy.core.text import Label as CoreLabel
+from kivy.metrics import sp
+
+CACHE_SIZE = 4096
+FONT_NAME = "Roboto"  # Kivy's default Label font
+FONT_SIZE = 15  # in sp: Kivy's default Label font_size is "15sp"
+ROW_HEIGHT = 40  # minimum row height, as in ScrollableTable
+CELL_PADDING = 20  # added to the wrapped text height
+TEXT_INSET = 10  # text_size is the column width minus this
+
+# digits with optional sign, separators and decimal point, or a numeric date
+_NUMERIC = re.compile(r"[-+]?[\d.,:/ -]+")
+# no Roboto digit, sign or separator is wider than this many ems
+_NUMERIC_EM = 0.6
+
+
+# ---------------- TextMeasurer ----------------
+class TextMeasurer:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._line_heights = {}
+        self._labels = {}  # one core label per font, reused for every measurement
+        self.hits = self.misses = self.fast = 0
+
+    def _rasterise(self, text, width, font_name, font_size, bold):
+        label = self._labels.get((font_name, font_size, bold))
+        if label is None:
+            label = self._labels[(font_name, font_size, bold)] = CoreLabel(
+                font_name=font_name, font_size=font_size, bold=bold, halign="center", valign="middle",
+            )
+        label.text = text
+        label.text_size = (width, None)
+        label.refresh()
+        return label.texture.size[1] if label.texture is not None else 0
+
+    def line_height(self, font_name=FONT_NAME, font_size=FONT_SIZE, bold=False):
+        key = (font_name, font_size, bold)
+        if key not in self._line_heights:
+            self._line_heights[key] = self._rasterise("0", None, font_name, sp(font_size), bold)
+        return self._line_heights[key]
+
+    def height(self, text, width, font_name=FONT_NAME, font_size=FONT_SIZE, bold=False):
+        """Height of `text` wrapped to `width` pixels (0 for empty text), as Label.texture_size[1] would report."""
+        text = str(text)
+        if not text:
+            return 0
+        size = sp(font_size)
+        if len(text) * size * _NUMERIC_EM <= width and _NUMERIC.fullmatch(text):
+            self.fast += 1
+            return self.line_height(font_name, font_size, bold)
+        key = (text, width, font_name, font_size, bold)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+        self.misses += 1
+        h = self._rasterise(text, width, font_name, size, bold)
+        self._cache[key] = h
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return h
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.fast
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fast": self.fast,
+            "size": len(self._cache),
+            "hit_rate": (self.hits + self.fast) / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._cache.clear()
+        self._line_heights.clear()
+        self.hits = self.misses = self.fast = 0
+
+
+measurer = TextMeasurer()
+
+
+def text_height(text, width, **font):
+    return measurer.height(text, width, **font)
+
+
+def row_height(texts, col_widths, min_height=ROW_HEIGHT, **font):
+    """Height of a table row: its tallest cell wrapped to (column width - inset) plus padding, at least min_height."""
+    height = min_height
+    for text, w in zip(texts, col_widths):
+        height = max(height, measurer.height(text, w - TEXT_INSET, **font) + CELL_PADDING)
+    return height